@@ -442,19 +442,16 @@ export const owlApiService = {
    */
   async updateEnvVars(variables: EnvVar[]): Promise<any[]> {
     try {
-      // Send each variable to the API
-      const results = [];
-      for (const v of variables) {
-        if (v.key && v.value !== undefined) {
-          const response = await api.post('/env/set', {
-            key: v.key,
-            value: v.value
-          });
-          results.push(response.data);
-        }
+      // Send all variables in one request; the backend rewrites .env once
+      const operations = variables
+        .filter(v => v.key && v.value !== undefined)
+        .map(v => ({ key: v.key, value: v.value, action: 'set' }));
+      if (operations.length === 0) {
+        return [];
       }
       
-      return results;
+      const response = await api.post('/env/batch', { operations });
+      return [response.data];
     } catch (error) {
       console.error('Error updating environment variables:', error);
       throw error;
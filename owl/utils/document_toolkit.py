@@ -18,6 +18,7 @@ from camel.toolkits import ImageAnalysisToolkit, ExcelToolkit
 from camel.utils import retry_on_error
 from camel.logger import get_logger
 from camel.models import BaseModelBackend
+from .extraction_cache import ExtractionCache
 from docx2markdown._docx_to_markdown import docx_to_markdown
 from chunkr_ai import Chunkr
 import requests
@@ -39,10 +40,28 @@ class DocumentProcessingToolkit(BaseToolkit):
     r"""A class representing a toolkit for processing document and return the content of the document.
 
     This class provides method for processing docx, pdf, pptx, etc. It cannot process excel files.
+
+    Successful extractions are stored in an :class:`ExtractionCache` under
+    ``cache_dir/extractions``, so asking for the same document again does
+    not repeat downloads, Chunkr uploads or Firecrawl crawls.
+
+    Args:
+        cache_dir (Optional[str]): Directory for downloads and cached
+            extractions. (default: :obj:`"tmp/"`)
+        model (Optional[BaseModelBackend]): Model used to caption images.
+            (default: :obj:`None`)
+        use_cache (bool): Whether to cache extraction results.
+            (default: :obj:`True`)
+        cache_max_size_mb (float): Maximum size of the extraction cache.
+            (default: :obj:`256`)
     """
 
     def __init__(
-        self, cache_dir: Optional[str] = None, model: Optional[BaseModelBackend] = None
+        self,
+        cache_dir: Optional[str] = None,
+        model: Optional[BaseModelBackend] = None,
+        use_cache: bool = True,
+        cache_max_size_mb: float = 256,
     ):
         self.image_tool = ImageAnalysisToolkit(model=model)
         # self.audio_tool = AudioAnalysisToolkit()
@@ -52,7 +71,13 @@ class DocumentProcessingToolkit(BaseToolkit):
         if cache_dir:
             self.cache_dir = cache_dir
 
-    @retry_on_error()
+        self.extraction_cache: Optional[ExtractionCache] = None
+        if use_cache:
+            self.extraction_cache = ExtractionCache(
+                os.path.join(self.cache_dir, "extractions"),
+                max_size_mb=cache_max_size_mb,
+            )
+
     def extract_document_content(self, document_path: str) -> Tuple[bool, str]:
         r"""Extract the content of a given document (or url) and return the processed text.
         It may filter out some information, resulting in inaccurate content.
@@ -63,6 +88,34 @@ class DocumentProcessingToolkit(BaseToolkit):
         Returns:
             Tuple[bool, str]: A tuple containing a boolean indicating whether the document was processed successfully, and the content of the document (if success).
         """
+        # Zip results are paths into cache_dir, which may have been cleaned up
+        if self.extraction_cache is None or document_path.endswith("zip"):
+            return self._extract_document_content(document_path)
+
+        cache_key = self.extraction_cache.source_key(document_path)
+        if cache_key is None:
+            return self._extract_document_content(document_path)
+
+        key, expires = cache_key
+        found, content = self.extraction_cache.get(key)
+        if found:
+            logger.debug(f"Extraction cache hit for `{document_path}`")
+            return True, content
+
+        success, content = self._extract_document_content(document_path)
+        # Chunkr and Firecrawl failures come back as successful error messages
+        if success and not (isinstance(content, str) and content.startswith("Error while")):
+            self.extraction_cache.put(key, document_path, content, expires=expires)
+        return success, content
+
+    def cache_stats(self) -> dict:
+        r"""Return the extraction cache's hit/miss counters and size."""
+        if self.extraction_cache is None:
+            return {}
+        return self.extraction_cache.stats()
+
+    @retry_on_error()
+    def _extract_document_content(self, document_path: str) -> Tuple[bool, str]:
         import asyncio
 
         logger.debug(
@@ -12,7 +12,9 @@
 # limitations under the License.
 # ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
 
-from typing import Dict, List, Optional, Tuple
+import inspect
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
 from camel.agents import ChatAgent
@@ -359,14 +361,47 @@ class OwlGAIARolePlaying(OwlRolePlaying):
     ) -> Tuple[ChatAgentResponse, ChatAgentResponse]:
         user_response = self.user_agent.step(assistant_msg)
         if user_response.terminated or user_response.msgs is None:
-            return (
-                ChatAgentResponse(msgs=[], terminated=False, info={}),
-                ChatAgentResponse(
-                    msgs=[],
-                    terminated=user_response.terminated,
-                    info=user_response.info,
-                ),
-            )
+            return self._user_terminated(user_response)
+        user_msg, modified_user_msg = self._prepare_user_msg(user_response)
+
+        # process assistant's response
+        assistant_response = self.assistant_agent.step(modified_user_msg)
+        return self._step_responses(
+            user_response, user_msg, modified_user_msg, assistant_response
+        )
+
+    async def astep(
+        self, assistant_msg: BaseMessage
+    ) -> Tuple[ChatAgentResponse, ChatAgentResponse]:
+        user_response = await self.user_agent.astep(assistant_msg)
+        if user_response.terminated or user_response.msgs is None:
+            return self._user_terminated(user_response)
+        user_msg, modified_user_msg = self._prepare_user_msg(user_response)
+
+        # process assistant's response
+        assistant_response = await self.assistant_agent.astep(modified_user_msg)
+        return self._step_responses(
+            user_response, user_msg, modified_user_msg, assistant_response
+        )
+
+    def _user_terminated(
+        self, user_response: ChatAgentResponse
+    ) -> Tuple[ChatAgentResponse, ChatAgentResponse]:
+        return (
+            ChatAgentResponse(msgs=[], terminated=False, info={}),
+            ChatAgentResponse(
+                msgs=[],
+                terminated=user_response.terminated,
+                info=user_response.info,
+            ),
+        )
+
+    def _prepare_user_msg(
+        self, user_response: ChatAgentResponse
+    ) -> Tuple[BaseMessage, BaseMessage]:
+        r"""Pick the user's message and add the task context, or the GAIA
+        answer format once the task is done, to the copy sent to the
+        assistant."""
         user_msg = self._reduce_message_options(user_response.msgs)
 
         modified_user_msg = deepcopy(user_msg)
@@ -398,8 +433,16 @@ class OwlGAIARolePlaying(OwlRolePlaying):
             </hint>
             """
 
-        # process assistant's response
-        assistant_response = self.assistant_agent.step(modified_user_msg)
+        return user_msg, modified_user_msg
+
+    def _step_responses(
+        self,
+        user_response: ChatAgentResponse,
+        user_msg: BaseMessage,
+        modified_user_msg: BaseMessage,
+        assistant_response: ChatAgentResponse,
+    ) -> Tuple[ChatAgentResponse, ChatAgentResponse]:
+        r"""Build the step's responses from the assistant's reply."""
         if assistant_response.terminated or assistant_response.msgs is None:
             return (
                 ChatAgentResponse(
@@ -437,10 +480,111 @@ class OwlGAIARolePlaying(OwlRolePlaying):
         )
 
 
+# Called with the round index and the round's {"user", "assistant", "tool_calls"}
+# record, plus the models that produced it and the round's token usage
+RoundCallback = Callable[[int, dict], Any]
+
+
+def _model_name(agent) -> str:
+    model_type = getattr(getattr(agent, "model_backend", None), "model_type", None)
+    return str(getattr(model_type, "value", model_type) or "")
+
+
+def _round_details(society: OwlRolePlaying, assistant_response, user_response) -> dict:
+    r"""Models and token usage of one round, for round callbacks only."""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    for response in (assistant_response, user_response):
+        response_usage = response.info.get("usage") or {}
+        for key in usage:
+            usage[key] += response_usage.get(key, 0) or 0
+    return {
+        "user_model": _model_name(getattr(society, "user_agent", None)),
+        "assistant_model": _model_name(getattr(society, "assistant_agent", None)),
+        "usage": usage,
+    }
+
+
+class TaskCancelled(Exception):
+    r"""Raised by :func:`run_society` when its cancel token is set."""
+
+
+def _is_cancelled(cancel_token) -> bool:
+    return cancel_token is not None and cancel_token.is_set()
+
+
+def _check_cancelled(cancel_token, where: str):
+    if _is_cancelled(cancel_token):
+        raise TaskCancelled(f"Task cancelled {where}")
+
+
+@contextmanager
+def _guard_tools(society: OwlRolePlaying, cancel_token):
+    r"""Make the society's tools refuse to run once the token is set.
+
+    Tool calls happen inside ``ChatAgent.step``; wrapping each tool's
+    function stops the remaining calls of a round instead of waiting for
+    the round to finish. The original functions are restored on exit.
+    """
+    if cancel_token is None:
+        yield
+        return
+    wrapped = []
+    for agent in (society.assistant_agent, society.user_agent):
+        for tool in list(getattr(agent, "tool_dict", {}).values()):
+            func = getattr(tool, "func", None)
+            if func is None or getattr(func, "_owl_cancel_guard", False):
+                continue
+
+            def guarded(*args, _func=func, **kwargs):
+                _check_cancelled(cancel_token, f"before tool call {getattr(_func, '__name__', 'tool')}")
+                return _func(*args, **kwargs)
+
+            guarded._owl_cancel_guard = True
+            tool.func = guarded
+            wrapped.append((tool, func))
+    try:
+        yield
+    finally:
+        for tool, func in wrapped:
+            tool.func = func
+
+
+def _notify_round(on_round: Optional[RoundCallback], round_index: int, data: dict):
+    if on_round is None:
+        return None
+    try:
+        return on_round(round_index, data)
+    except Exception as e:
+        logger.warning(f"Round callback failed for round #{round_index}: {e}")
+        return None
+
+
 def run_society(
     society: OwlRolePlaying,
     round_limit: int = 15,
+    on_round: Optional[RoundCallback] = None,
+    cancel_token: Optional[Any] = None,
 ) -> Tuple[str, List[dict], dict]:
+    r"""Run a society until the task is done or the round limit is reached.
+
+    Args:
+        society (OwlRolePlaying): The society to run.
+        round_limit (int): Maximum number of rounds. (default: :obj:`15`)
+        on_round (Optional[RoundCallback]): Called after each round with the
+            round index and its record, so callers can stream progress
+            instead of waiting for the final answer. (default: :obj:`None`)
+        cancel_token (Optional[Any]): A :obj:`threading.Event` or
+            :obj:`multiprocessing.Event`; once set, the society stops before
+            its next round or tool call and :obj:`TaskCancelled` is raised.
+            (default: :obj:`None`)
+
+    Returns:
+        Tuple[str, List[dict], dict]: The answer, the chat history and the
+            token counts.
+
+    Raises:
+        TaskCancelled: If the cancel token was set.
+    """
     overall_completion_token_count = 0
     overall_prompt_token_count = 0
 
@@ -449,49 +593,62 @@ def run_society(
     Now please give me instructions to solve over overall task step by step. If the task requires some specific knowledge, please instruct me to use tools to complete the task.
         """
     input_msg = society.init_chat(init_prompt)
-    for _round in range(round_limit):
-        assistant_response, user_response = society.step(input_msg)
-        # Check if usage info is available before accessing it
-        if assistant_response.info.get("usage") and user_response.info.get("usage"):
-            overall_completion_token_count += assistant_response.info["usage"].get(
-                "completion_tokens", 0
-            ) + user_response.info["usage"].get("completion_tokens", 0)
-            overall_prompt_token_count += assistant_response.info["usage"].get(
-                "prompt_tokens", 0
-            ) + user_response.info["usage"].get("prompt_tokens", 0)
-
-        # convert tool call to dict
-        tool_call_records: List[dict] = []
-        if assistant_response.info.get("tool_calls"):
-            for tool_call in assistant_response.info["tool_calls"]:
-                tool_call_records.append(tool_call.as_dict())
-
-        _data = {
-            "user": user_response.msg.content
-            if hasattr(user_response, "msg") and user_response.msg
-            else "",
-            "assistant": assistant_response.msg.content
-            if hasattr(assistant_response, "msg") and assistant_response.msg
-            else "",
-            "tool_calls": tool_call_records,
-        }
-
-        chat_history.append(_data)
-        logger.info(
-            f"Round #{_round} user_response:\n {user_response.msgs[0].content if user_response.msgs and len(user_response.msgs) > 0 else ''}"
-        )
-        logger.info(
-            f"Round #{_round} assistant_response:\n {assistant_response.msgs[0].content if assistant_response.msgs and len(assistant_response.msgs) > 0 else ''}"
-        )
+    with _guard_tools(society, cancel_token):
+        for _round in range(round_limit):
+            _check_cancelled(cancel_token, f"before round #{_round}")
+            try:
+                assistant_response, user_response = society.step(input_msg)
+            except Exception as e:
+                # camel may wrap the guard's exception in its own
+                if _is_cancelled(cancel_token) and not isinstance(e, TaskCancelled):
+                    raise TaskCancelled(f"Task cancelled during round #{_round}") from e
+                raise
+            # Check if usage info is available before accessing it
+            if assistant_response.info.get("usage") and user_response.info.get("usage"):
+                overall_completion_token_count += assistant_response.info["usage"].get(
+                    "completion_tokens", 0
+                ) + user_response.info["usage"].get("completion_tokens", 0)
+                overall_prompt_token_count += assistant_response.info["usage"].get(
+                    "prompt_tokens", 0
+                ) + user_response.info["usage"].get("prompt_tokens", 0)
+
+            # convert tool call to dict
+            tool_call_records: List[dict] = []
+            if assistant_response.info.get("tool_calls"):
+                for tool_call in assistant_response.info["tool_calls"]:
+                    tool_call_records.append(tool_call.as_dict())
+
+            _data = {
+                "user": user_response.msg.content
+                if hasattr(user_response, "msg") and user_response.msg
+                else "",
+                "assistant": assistant_response.msg.content
+                if hasattr(assistant_response, "msg") and assistant_response.msg
+                else "",
+                "tool_calls": tool_call_records,
+            }
+
+            chat_history.append(_data)
+            _notify_round(
+                on_round,
+                _round,
+                {**_data, **_round_details(society, assistant_response, user_response)},
+            )
+            logger.info(
+                f"Round #{_round} user_response:\n {user_response.msgs[0].content if user_response.msgs and len(user_response.msgs) > 0 else ''}"
+            )
+            logger.info(
+                f"Round #{_round} assistant_response:\n {assistant_response.msgs[0].content if assistant_response.msgs and len(assistant_response.msgs) > 0 else ''}"
+            )
 
-        if (
-            assistant_response.terminated
-            or user_response.terminated
-            or "TASK_DONE" in user_response.msg.content
-        ):
-            break
+            if (
+                assistant_response.terminated
+                or user_response.terminated
+                or "TASK_DONE" in user_response.msg.content
+            ):
+                break
 
-        input_msg = assistant_response.msg
+            input_msg = assistant_response.msg
 
     answer = chat_history[-1]["assistant"]
     token_info = {
@@ -505,7 +662,28 @@ def run_society(
 async def arun_society(
     society: OwlRolePlaying,
     round_limit: int = 15,
+    on_round: Optional[RoundCallback] = None,
+    cancel_token: Optional[Any] = None,
 ) -> Tuple[str, List[dict], dict]:
+    r"""Asynchronous version of :func:`run_society`.
+
+    Args:
+        society (OwlRolePlaying): The society to run.
+        round_limit (int): Maximum number of rounds. (default: :obj:`15`)
+        on_round (Optional[RoundCallback]): Called after each round with the
+            round index and its record; may be a coroutine function.
+            (default: :obj:`None`)
+        cancel_token (Optional[Any]): Stops the society before its next
+            round or tool call once set, see :func:`run_society`.
+            (default: :obj:`None`)
+
+    Returns:
+        Tuple[str, List[dict], dict]: The answer, the chat history and the
+            token counts.
+
+    Raises:
+        TaskCancelled: If the cancel token was set.
+    """
     overall_completion_token_count = 0
     overall_prompt_token_count = 0
 
@@ -514,51 +692,69 @@ async def arun_society(
     Now please give me instructions to solve over overall task step by step. If the task requires some specific knowledge, please instruct me to use tools to complete the task.
         """
     input_msg = society.init_chat(init_prompt)
-    for _round in range(round_limit):
-        assistant_response, user_response = await society.astep(input_msg)
-        # Check if usage info is available before accessing it
-        if assistant_response.info.get("usage") and user_response.info.get("usage"):
-            overall_prompt_token_count += assistant_response.info["usage"].get(
-                "completion_tokens", 0
+    with _guard_tools(society, cancel_token):
+        for _round in range(round_limit):
+            _check_cancelled(cancel_token, f"before round #{_round}")
+            try:
+                assistant_response, user_response = await society.astep(input_msg)
+            except Exception as e:
+                # camel may wrap the guard's exception in its own
+                if _is_cancelled(cancel_token) and not isinstance(e, TaskCancelled):
+                    raise TaskCancelled(f"Task cancelled during round #{_round}") from e
+                raise
+            # Check if usage info is available before accessing it
+            if assistant_response.info.get("usage") and user_response.info.get("usage"):
+                overall_completion_token_count += assistant_response.info["usage"].get(
+                    "completion_tokens", 0
+                ) + user_response.info["usage"].get("completion_tokens", 0)
+                overall_prompt_token_count += assistant_response.info["usage"].get(
+                    "prompt_tokens", 0
+                ) + user_response.info["usage"].get("prompt_tokens", 0)
+
+            # convert tool call to dict
+            tool_call_records: List[dict] = []
+            if assistant_response.info.get("tool_calls"):
+                for tool_call in assistant_response.info["tool_calls"]:
+                    tool_call_records.append(tool_call.as_dict())
+
+            _data = {
+                "user": user_response.msg.content
+                if hasattr(user_response, "msg") and user_response.msg
+                else "",
+                "assistant": assistant_response.msg.content
+                if hasattr(assistant_response, "msg") and assistant_response.msg
+                else "",
+                "tool_calls": tool_call_records,
+            }
+
+            chat_history.append(_data)
+            result = _notify_round(
+                on_round,
+                _round,
+                {**_data, **_round_details(society, assistant_response, user_response)},
+            )
+            if inspect.isawaitable(result):
+                try:
+                    await result
+                except Exception as e:
+                    logger.warning(f"Round callback failed for round #{_round}: {e}")
+            logger.info(
+                f"Round #{_round} user_response:\n {user_response.msgs[0].content if user_response.msgs and len(user_response.msgs) > 0 else ''}"
+            )
+            logger.info(
+                f"Round #{_round} assistant_response:\n {assistant_response.msgs[0].content if assistant_response.msgs and len(assistant_response.msgs) > 0 else ''}"
             )
-            overall_prompt_token_count += assistant_response.info["usage"].get(
-                "prompt_tokens", 0
-            ) + user_response.info["usage"].get("prompt_tokens", 0)
-
-        # convert tool call to dict
-        tool_call_records: List[dict] = []
-        if assistant_response.info.get("tool_calls"):
-            for tool_call in assistant_response.info["tool_calls"]:
-                tool_call_records.append(tool_call.as_dict())
-
-        _data = {
-            "user": user_response.msg.content
-            if hasattr(user_response, "msg") and user_response.msg
-            else "",
-            "assistant": assistant_response.msg.content
-            if hasattr(assistant_response, "msg") and assistant_response.msg
-            else "",
-            "tool_calls": tool_call_records,
-        }
-
-        chat_history.append(_data)
-        logger.info(
-            f"Round #{_round} user_response:\n {user_response.msgs[0].content if user_response.msgs and len(user_response.msgs) > 0 else ''}"
-        )
-        logger.info(
-            f"Round #{_round} assistant_response:\n {assistant_response.msgs[0].content if assistant_response.msgs and len(assistant_response.msgs) > 0 else ''}"
-        )
 
-        # Check other termination conditions
-        if (
-            assistant_response.terminated
-            or user_response.terminated
-            or "TASK_DONE" in user_response.msg.content
-            or "任务已完成" in user_response.msg.content
-        ):
-            break
+            # Check other termination conditions
+            if (
+                assistant_response.terminated
+                or user_response.terminated
+                or "TASK_DONE" in user_response.msg.content
+                or "任务已完成" in user_response.msg.content
+            ):
+                break
 
-        input_msg = assistant_response.msg
+            input_msg = assistant_response.msg
 
     answer = chat_history[-1]["assistant"]
     token_info = {
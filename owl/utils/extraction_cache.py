@@ -0,0 +1,248 @@
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from camel.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bump when extraction output changes so old entries are no longer used
+CACHE_FORMAT_VERSION = 1
+
+
+class ExtractionCache:
+    r"""A persistent, size-bounded LRU cache of document extraction results.
+
+    Local files are keyed by a SHA-256 of their content, so a renamed or
+    copied file still hits and an edited file misses. Remote documents are
+    keyed by URL plus their ``ETag``/``Last-Modified`` headers; URLs that
+    send neither are cached for ``url_ttl`` seconds. Each entry is one JSON
+    file named after its key, written atomically, so several worker
+    processes can share a cache directory. Least recently used entries are
+    evicted once the directory grows past ``max_size_mb``.
+
+    Args:
+        cache_dir (str): Directory to store entries in.
+        max_size_mb (float, optional): Maximum total size of the entries.
+            (default: :obj:`256`)
+        url_ttl (float, optional): Seconds to keep results for URLs without
+            validators. (default: :obj:`3600`)
+    """
+
+    def __init__(
+        self, cache_dir: str, max_size_mb: float = 256, url_ttl: float = 3600
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.url_ttl = url_ttl
+        self._lock = threading.Lock()
+        # key -> entry size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        # (path, size, mtime_ns) -> content hash, so unchanged files are hashed once
+        self._file_hashes: Dict[Tuple[str, int, int], str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+        # Entry mtimes are bumped on every hit, so they record LRU order
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _hash_file(self, path: str) -> str:
+        stat = os.stat(path)
+        stat_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._file_hashes.get(stat_key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._file_hashes[stat_key] = digest
+        return digest
+
+    def source_key(self, document_path: str) -> Optional[Tuple[str, bool]]:
+        r"""Build the cache key for a document.
+
+        Args:
+            document_path (str): Local path or URL of the document.
+
+        Returns:
+            Optional[Tuple[str, bool]]: The key and whether the entry should
+                expire after ``url_ttl``, or None if the document cannot be
+                identified (a missing file or an unreachable URL).
+        """
+        parsed_url = urlparse(document_path)
+        if parsed_url.scheme and parsed_url.netloc:
+            try:
+                response = requests.head(document_path, allow_redirects=True, timeout=10)
+            except requests.exceptions.RequestException as e:
+                logger.debug(f"Not caching {document_path}: {e}")
+                return None
+            etag = response.headers.get("ETag", "")
+            last_modified = response.headers.get("Last-Modified", "")
+            source = f"url\0{document_path}\0{etag}\0{last_modified}"
+            expires = not (etag or last_modified)
+        elif os.path.isfile(document_path):
+            # The extension picks the extractor, so it is part of the key
+            extension = os.path.splitext(document_path)[1].lower()
+            source = f"file\0{self._hash_file(document_path)}\0{extension}"
+            expires = False
+        else:
+            return None
+
+        key = hashlib.sha256(
+            f"{CACHE_FORMAT_VERSION}\0{source}".encode("utf-8")
+        ).hexdigest()
+        return key, expires
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        r"""Look up an extraction result.
+
+        Args:
+            key (str): Key from :meth:`source_key`.
+
+        Returns:
+            Tuple[bool, Any]: Whether the key was found, and the cached content.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return False, None
+
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and expires_at < time.time():
+            self._remove(key)
+            with self._lock:
+                self.misses += 1
+            return False, None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                # Written by another process sharing the directory
+                size = os.path.getsize(path)
+                self._entries[key] = size
+                self._total_bytes += size
+        return True, entry["content"]
+
+    def put(self, key: str, document_path: str, content: Any, expires: bool = False):
+        r"""Store an extraction result, evicting old entries if needed.
+
+        Args:
+            key (str): Key from :meth:`source_key`.
+            document_path (str): The document the content was extracted from.
+            content (Any): The extracted content; must be JSON serializable.
+            expires (bool, optional): Whether the entry expires after
+                ``url_ttl``. (default: :obj:`False`)
+        """
+        entry = {
+            "document_path": document_path,
+            "created_at": time.time(),
+            "expires_at": time.time() + self.url_ttl if expires else None,
+            "content": content,
+        }
+        try:
+            data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Not caching {document_path}: {e}")
+            return
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # A full disk or unwritable cache directory must not fail the extraction
+            logger.warning(f"Could not cache {document_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            evicted = []
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def _remove(self, key: str):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        r"""Return hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -19,8 +19,10 @@ import json
 import random
 import re
 import string
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Union, Tuple
+from typing import Any, Callable, Dict, List, Literal, Optional, Union, Tuple
 
 from tqdm import tqdm
 from camel.benchmarks import BaseBenchmark
@@ -28,7 +30,7 @@ from camel.tasks import Task
 from camel.logger import get_logger
 
 from .common import extract_pattern
-from .enhanced_role_playing import run_society, OwlGAIARolePlaying
+from .enhanced_role_playing import run_society, OwlGAIARolePlaying, TaskCancelled
 
 logger = get_logger(__name__)
 
@@ -38,10 +40,15 @@ class GAIABenchmark(BaseBenchmark):
     Assistants"
     <https://huggingface.co/datasets/gaia-benchmark/GAIA>`_.
 
+    Results are appended to a JSON lines log next to ``save_to`` (same
+    name, ``.jsonl`` suffix) as each task finishes. ``save_to`` and a
+    ``*_summary.json`` file without chat histories are written at the end
+    of a run.
+
     Args:
         data_dir (str): The directory to save the data.
         save_to (str): The file to save the results.
-        processes (int, optional): The number of processes to use.
+        processes (int, optional): The number of tasks to run concurrently.
             (default: :obj:`1`)
     """
 
@@ -56,10 +63,17 @@ class GAIABenchmark(BaseBenchmark):
         Args:
             data_dir (str): The directory to save the data.
             save_to (str): The file to save the results.
-            processes (int, optional): The number of processes to use for
-                parallel processing. (default: :obj:`1`)
+            processes (int, optional): The number of tasks to run
+                concurrently when :meth:`run` is not given a concurrency.
+                (default: :obj:`1`)
         """
         super().__init__("gaia", data_dir, save_to, processes)
+        save_path = Path(save_to)
+        self.results_log = save_path.with_suffix(".jsonl")
+        if self.results_log == save_path:
+            self.results_log = save_path.with_name(f"{save_path.stem}_log.jsonl")
+        self.summary_path = save_path.with_name(f"{save_path.stem}_summary.json")
+        self._result_index: Dict[str, int] = {}
 
     def download(self):
         r"""Download the GAIA dataset."""
@@ -73,10 +87,65 @@ class GAIABenchmark(BaseBenchmark):
         )
 
     def _check_task_completed(self, task_id: str) -> bool:
-        for data in self._results:
-            if data["task_id"] == task_id:
-                return True
-        return False
+        return task_id in self._result_index
+
+    def _reset_results(self, results: List[Dict[str, Any]]):
+        r"""Replace the results, keeping the last result of each task."""
+        self._results = []
+        self._result_index = {}
+        for result in results:
+            self._index_result(result)
+
+    def _index_result(self, result: Dict[str, Any]):
+        position = self._result_index.get(result["task_id"])
+        if position is None:
+            self._result_index[result["task_id"]] = len(self._results)
+            self._results.append(result)
+        else:
+            self._results[position] = result
+
+    def _load_results(self):
+        r"""Load previous results from the results log, or from ``save_to``
+        for runs made before the log existed."""
+        results = []
+        if self.results_log.exists():
+            with open(self.results_log, "rb+") as f:
+                content = f.read()
+                # A run killed mid-write leaves a partial last line; drop it
+                # so the next append starts on a fresh line
+                complete = content.rfind(b"\n") + 1
+                if complete < len(content):
+                    logger.warning(f"Dropping partial result at end of {self.results_log}")
+                    f.truncate(complete)
+            for line_number, line in enumerate(content[:complete].splitlines(), 1):
+                if not line.strip():
+                    continue
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Skipping unreadable result at {self.results_log}:{line_number}"
+                    )
+        elif Path(self.save_to).exists():
+            try:
+                with open(self.save_to, "r", encoding="utf-8") as f:
+                    results = json.load(f)
+            except Exception as e:
+                logger.warning(e)
+            if results:
+                Path(self.results_log).parent.mkdir(parents=True, exist_ok=True)
+                with open(self.results_log, "w", encoding="utf-8") as f:
+                    for result in results:
+                        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._reset_results(results)
+
+    def _record_result(self, result: Dict[str, Any], save_result: bool):
+        r"""Add a finished task's result and append it to the results log."""
+        self._index_result(result)
+        if save_result:
+            Path(self.results_log).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.results_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
 
     def dump_tasks(self, save_path: str, datas):
         constructed_data = []
@@ -148,12 +217,43 @@ class GAIABenchmark(BaseBenchmark):
         subset: Optional[int] = None,
         idx: Optional[List[int]] = None,
         save_result: bool = False,
+        concurrency: Optional[int] = None,
+        task_timeout: Optional[float] = None,
+        agent_kwargs_factory: Optional[Callable[[], Tuple[dict, dict]]] = None,
     ) -> Dict[str, Any]:
+        r"""Run the benchmark.
+
+        With a concurrency above 1, tasks run on a pool of threads, each
+        running its own society with :func:`run_society`, so a blocking
+        tool call only holds up its own task; otherwise they run one after
+        another. Completed tasks are saved as they finish when
+        ``save_result`` is set, so an interrupted run resumes where it
+        stopped. Results are always returned in dataset order.
+
+        Args:
+            concurrency (Optional[int]): Number of tasks to run at once.
+                Defaults to ``processes``. (default: :obj:`None`)
+            task_timeout (Optional[float]): Seconds after which a task is
+                cancelled at its next round or tool call; cancelled tasks
+                are not recorded and are retried on the next run.
+                (default: :obj:`None`)
+            agent_kwargs_factory (Optional[Callable[[], Tuple[dict, dict]]]):
+                Builds fresh ``(user_agent_kwargs, assistant_agent_kwargs)``
+                for each task, used instead of the fixed ones. Required with
+                a concurrency above 1, as concurrent societies must not
+                share model or toolkit instances. (default: :obj:`None`)
+        """
         # Validate inputs
         if on not in ["valid", "test"]:
             raise ValueError(
                 f"Invalid value for `on`: {on}, expected 'valid' or 'test'."
             )
+        concurrency = max(1, concurrency or self.processes)
+        if concurrency > 1 and agent_kwargs_factory is None:
+            raise ValueError(
+                "Running tasks concurrently requires `agent_kwargs_factory`, "
+                "so each society gets its own models and toolkits."
+            )
 
         levels = (
             [1, 2, 3]
@@ -181,87 +281,204 @@ class GAIABenchmark(BaseBenchmark):
 
         logger.info(f"Number of tasks: {len(datas)}")
 
-        self._results = []
+        self._reset_results([])
 
         if save_result:
-            try:
-                with open(self.save_to, "r", encoding="utf-8") as f:
-                    self._results = json.load(f)
-                f.close()
-            except Exception as e:
-                logger.warning(e)
-                # raise FileNotFoundError(f"{self.save_to} does not exist.")
+            self._load_results()
         datas = [
             data for data in datas if not self._check_task_completed(data["task_id"])
         ]
         logger.info(f"Number of tasks to be processed: {len(datas)}")
-        # Process tasks
-        for task in tqdm(datas, desc="Running"):
-            if_prepared_task, info = self._prepare_task(task)
-            if not if_prepared_task:
-                _result_info = {
-                    "task_id": task["task_id"],
-                    "question": task["Question"],
-                    "level": task["Level"],
-                    "model_answer": None,
-                    "ground_truth": None,
-                    "score": 0,
-                    "history": None,
-                }
-                self._results.append(_result_info)
-                continue
-            try:
-                logger.info(f"Task Question: {task['Question']}")
-                logger.info(f"Required tools: {task['Annotator Metadata']['Tools']}")
 
-                task_kwargs = {
-                    "task_prompt": task["Question"],
-                    "with_task_specify": False,
-                }
+        society_kwargs = {
+            "user_role_name": user_role_name,
+            "user_agent_kwargs": user_agent_kwargs,
+            "assistant_role_name": assistant_role_name,
+            "assistant_agent_kwargs": assistant_agent_kwargs,
+        }
+        previous_results = list(self._results)
 
-                society = OwlGAIARolePlaying(
-                    **task_kwargs,
-                    user_role_name=user_role_name,
-                    user_agent_kwargs=user_agent_kwargs,
-                    assistant_role_name=assistant_role_name,
-                    assistant_agent_kwargs=assistant_agent_kwargs,
+        # Process tasks
+        if concurrency > 1:
+            logger.info(f"Running up to {concurrency} tasks concurrently.")
+            new_results = self._run_tasks_concurrently(
+                datas,
+                society_kwargs,
+                agent_kwargs_factory,
+                concurrency,
+                task_timeout,
+                save_result,
+            )
+            # Checkpoints are written in completion order; return dataset order
+            self._reset_results(previous_results + new_results)
+        else:
+            for task in tqdm(datas, desc="Running"):
+                result = self._run_task(
+                    task, society_kwargs, agent_kwargs_factory, task_timeout
                 )
+                if result is not None:
+                    self._record_result(result, save_result)
 
-                raw_answer, chat_history, token_info = run_society(society)
-                try:
-                    answer = extract_pattern(raw_answer, "final_answer")
-                except Exception as e:
-                    logger.error(
-                        f"Error in extracting final answer from text {raw_answer}: {e}"
-                    )
-                    answer = None
+        if save_result:
+            self._save_results()
+        return self._generate_summary()
 
-                logger.info(
-                    f"Model answer: {answer}, Ground truth: {task['Final answer']}"
-                )
+    def _create_society(
+        self, task: Dict[str, Any], society_kwargs: Dict[str, Any]
+    ) -> OwlGAIARolePlaying:
+        r"""Create the role-playing society for a prepared task."""
+        logger.info(f"Task Question: {task['Question']}")
+        logger.info(f"Required tools: {task['Annotator Metadata']['Tools']}")
 
-                _result_info = {
-                    "task_id": task["task_id"],
-                    "question": task["Question"]
-                    + "Please decompose the task into several sub-tasks and find the answer step-by-step.",
-                    "level": task["Level"],
-                    "model_answer": answer,
-                    "ground_truth": task["Final answer"],
-                    "score": self.question_scorer(answer, task["Final answer"]),
-                    "token_info": token_info,
-                    "history": chat_history,
-                }
-                self._results.append(_result_info)
+        task_kwargs = {
+            "task_prompt": task["Question"],
+            "with_task_specify": False,
+        }
 
-            except Exception as e:
-                logger.error(f"Error in processing task: {e}")
+        return OwlGAIARolePlaying(**task_kwargs, **society_kwargs)
 
-            if save_result:
-                with open(self.save_to, "w") as f:
-                    json.dump(self._results, f, indent=4, ensure_ascii=False)
-                f.close()
+    def _skipped_result(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        r"""Result of a task that could not be prepared."""
+        return {
+            "task_id": task["task_id"],
+            "question": task["Question"],
+            "level": task["Level"],
+            "model_answer": None,
+            "ground_truth": None,
+            "score": 0,
+            "history": None,
+        }
 
-        return self._generate_summary()
+    def _build_result(
+        self,
+        task: Dict[str, Any],
+        raw_answer: str,
+        chat_history: List[dict],
+        token_info: dict,
+    ) -> Dict[str, Any]:
+        r"""Extract and score the answer of a finished society."""
+        try:
+            answer = extract_pattern(raw_answer, "final_answer")
+        except Exception as e:
+            logger.error(
+                f"Error in extracting final answer from text {raw_answer}: {e}"
+            )
+            answer = None
+
+        logger.info(f"Model answer: {answer}, Ground truth: {task['Final answer']}")
+
+        return {
+            "task_id": task["task_id"],
+            "question": task["Question"]
+            + "Please decompose the task into several sub-tasks and find the answer step-by-step.",
+            "level": task["Level"],
+            "model_answer": answer,
+            "ground_truth": task["Final answer"],
+            "score": self.question_scorer(answer, task["Final answer"]),
+            "token_info": token_info,
+            "history": chat_history,
+        }
+
+    def _run_task(
+        self,
+        task: Dict[str, Any],
+        society_kwargs: Dict[str, Any],
+        agent_kwargs_factory: Optional[Callable[[], Tuple[dict, dict]]] = None,
+        task_timeout: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        r"""Run a single task on the calling thread.
+
+        Returns:
+            Optional[Dict[str, Any]]: The task result, or :obj:`None` if the
+                task failed or timed out and should be retried on the next
+                run.
+        """
+        if_prepared_task, info = self._prepare_task(task)
+        if not if_prepared_task:
+            return self._skipped_result(task)
+
+        cancel_token = threading.Event()
+        timer = None
+        if task_timeout is not None:
+            timer = threading.Timer(task_timeout, cancel_token.set)
+            timer.daemon = True
+            timer.start()
+        try:
+            if agent_kwargs_factory is not None:
+                user_agent_kwargs, assistant_agent_kwargs = agent_kwargs_factory()
+                society_kwargs = {
+                    **society_kwargs,
+                    "user_agent_kwargs": user_agent_kwargs,
+                    "assistant_agent_kwargs": assistant_agent_kwargs,
+                }
+            society = self._create_society(task, society_kwargs)
+            raw_answer, chat_history, token_info = run_society(
+                society, cancel_token=cancel_token
+            )
+            return self._build_result(task, raw_answer, chat_history, token_info)
+        except TaskCancelled:
+            logger.error(f"Task {task['task_id']} timed out after {task_timeout}s")
+            return None
+        except Exception as e:
+            logger.error(f"Error in processing task {task['task_id']}: {e}")
+            return None
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def _run_tasks_concurrently(
+        self,
+        datas: List[Dict[str, Any]],
+        society_kwargs: Dict[str, Any],
+        agent_kwargs_factory: Callable[[], Tuple[dict, dict]],
+        concurrency: int,
+        task_timeout: Optional[float],
+        save_result: bool,
+    ) -> List[Dict[str, Any]]:
+        r"""Run tasks on a pool of at most ``concurrency`` threads.
+
+        Returns:
+            List[Dict[str, Any]]: Results of the tasks that finished, in the
+                order of ``datas``.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(datas)
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="gaia-task"
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self._run_task,
+                    task,
+                    society_kwargs,
+                    agent_kwargs_factory,
+                    task_timeout,
+                ): position
+                for position, task in enumerate(datas)
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Running"):
+                result = future.result()
+                if result is not None:
+                    # Checkpoint immediately so an interrupted run can resume
+                    self._record_result(result, save_result)
+                    results[futures[future]] = result
+        return [result for result in results if result is not None]
+
+    def _save_results(self):
+        r"""Write the full results to ``save_to`` and a compact summary
+        without chat histories next to it."""
+        with open(self.save_to, "w") as f:
+            json.dump(self._results, f, indent=4, ensure_ascii=False)
+
+        summary = self._generate_summary()
+        summary["results"] = [
+            {
+                key: result.get(key)
+                for key in ("task_id", "level", "model_answer", "ground_truth", "score")
+            }
+            for result in self._results
+        ]
+        with open(self.summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
 
     def _prepare_task(self, task: Dict[str, Any]) -> Tuple[bool, str]:
         r"""Prepare the task by validating and enriching its data."""
@@ -19,6 +19,7 @@ from fastapi.responses import JSONResponse
 import logging
 import time
 import sys
+import asyncio
 import os
 import pathlib
 
@@ -26,18 +27,20 @@ import pathlib
 sys.path.append(str(pathlib.Path(__file__).parent.parent))
 
 # Import routers
-from owl_api.routers import chat, env, modules, logs
+from owl_api.routers import chat, env, modules, logs, system
 from owl_api.services.process_pool import get_process_pool, get_browser_process_pool, _cleanup
+from owl_api.services.log_manager import setup_logging
+from owl_api.services.structured_logging import stop_log_listener
+from owl_api.services.log_search import get_log_search_index
+from owl_api.services.module_manager import get_module_catalog
+from owl_api.services.capabilities import init_capabilities
+from owl_api.services.admission import get_admission_controller
+from owl_api.services.result_collector import get_result_collector
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(f"owl_api_{time.strftime('%Y-%m-%d')}.log")
-    ]
-)
+# Set up structured logging; spawned workers re-import this module and log through the listener instead
+import multiprocessing
+if multiprocessing.parent_process() is None:
+    setup_logging()
 
 logger = logging.getLogger("owl_api")
 
@@ -47,6 +50,12 @@ from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    # Probe browsers and display once, before workers start reading the result
+    init_capabilities()
+    
+    # Worker results and pool timers are handled on this event loop from now on
+    get_result_collector().attach(asyncio.get_running_loop())
+    
     logger.info("Initializing process pools...")
     try:
         # Initialize regular process pool
@@ -61,6 +70,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error initializing process pools: {str(e)}")
     
+    # Keep the log search index current as logs are written
+    get_log_search_index().start()
+    
+    # Parse the example modules once; later changes are picked up by mtime
+    get_module_catalog().refresh(force=True)
+    
+    # Learn per-module token estimates from the recovered tasks before admitting any
+    get_admission_controller()
+    
     yield
     
     # Shutdown
@@ -71,9 +89,11 @@ async def lifespan(app: FastAPI):
         logger.info("Process pools shut down")
     except Exception as e:
         logger.error(f"Error shutting down process pools: {str(e)}")
+    get_result_collector().detach()
+    get_log_search_index().stop()
+    stop_log_listener()
 
 # Fix for multiprocessing resource leaks
-import multiprocessing
 # Set spawn method to avoid issues with forking
 # This is especially important for macOS where fork can cause issues
 if hasattr(multiprocessing, 'set_start_method'):
@@ -133,6 +153,7 @@ app.include_router(chat.router, prefix="/api")
 app.include_router(env.router, prefix="/api")
 app.include_router(modules.router, prefix="/api")
 app.include_router(logs.router, prefix="/api")
+app.include_router(system.router, prefix="/api")
 
 # Start server with uvicorn when script is run directly
 if __name__ == "__main__":
@@ -17,15 +17,21 @@ import logging
 import uuid
 import asyncio
 from typing import Dict, Any, Optional, List
-from fastapi import APIRouter, BackgroundTasks, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query, Request
 
 from pydantic import BaseModel
 
-from owl_api.services.owl_runner import run_owl_query, TASK_REGISTRY
+from owl_api.services.owl_runner import run_owl_query, cancel_owl_task, uses_browser_pool
+from owl_api.services.process_pool import get_process_pool, get_browser_process_pool
+from owl_api.services.task_store import get_task_store
+from owl_api.services.admission import get_admission_controller, AdmissionRejected
+from owl_api.services.scheduler import PRIORITY_WEIGHTS, DEFAULT_PRIORITY
 from owl_api.ws.chat import handle_websocket
 
 logger = logging.getLogger(__name__)
 
+task_store = get_task_store()
+
 router = APIRouter(prefix="/run", tags=["chat"])
 
 # Models for API requests and responses
@@ -33,6 +39,7 @@ class QueryRequest(BaseModel):
     """Query request model"""
     query: str
     module: str = "run"
+    priority: str = DEFAULT_PRIORITY  # "interactive" or "batch"
 
 class QueryResponse(BaseModel):
     """Query response model"""
@@ -49,28 +56,61 @@ class TaskStatusResponse(BaseModel):
 
 # API Endpoints
 @router.post("/async")
-async def start_query(query_request: QueryRequest, background_tasks: BackgroundTasks):
+async def start_query(query_request: QueryRequest, request: Request):
     """Start an asynchronous query
     
+    The query starts once it fits the admission budgets; until then its
+    task reports process_status "waiting_for_capacity". Workers are shared
+    fairly between clients, with "interactive" queries weighted above
+    "batch" ones.
+    
     Args:
-        query_request: Query request containing query and module
-        background_tasks: FastAPI background tasks
+        query_request: Query request containing query, module and priority
+        request: Incoming request; its client address is charged for the query
         
     Returns:
         Task ID and status
     """
+    if query_request.priority not in PRIORITY_WEIGHTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid priority {query_request.priority!r}, expected one of {', '.join(PRIORITY_WEIGHTS)}"
+        )
+    
+    # Apply back-pressure from the pool run_owl_query will use, before the task is created or admitted
+    browser = uses_browser_pool(query_request.module)
+    pool = get_browser_process_pool() if browser else get_process_pool()
+    if pool.is_saturated():
+        raise HTTPException(
+            status_code=429,
+            detail={"message": f"Too many {'browser ' if browser else ''}tasks queued, please retry later",
+                    "pool": "browser" if browser else "process", **pool.stats()},
+            headers={"Retry-After": "10"}
+        )
+    
     task_id = str(uuid.uuid4())
     
-    # Start query in background task
-    background_tasks.add_task(
-        run_owl_query,
-        task_id=task_id,
-        question=query_request.query,
-        module_name=query_request.module,
-        task_registry=TASK_REGISTRY
-    )
+    client = f"http:{request.client.host if request.client else 'unknown'}"
     
-    logger.info(f"Started async query task {task_id}: {query_request.query[:100]}...")
+    # Register the task now so it can be polled before it is admitted
+    task_store.create(task_id, query_request.query, query_request.module,
+                      priority=query_request.priority, requester=client)
+    
+    loop = asyncio.get_running_loop()
+    def start():
+        loop.run_in_executor(None, run_owl_query, task_id, query_request.query, query_request.module)
+    
+    try:
+        started = get_admission_controller().admit(task_id, client, query_request.module, start)
+    except AdmissionRejected as e:
+        task_store.update(task_id, {"status": "error", "error": str(e), "process_status": "rejected"})
+        raise HTTPException(
+            status_code=429,
+            detail={"message": str(e), "task_id": task_id},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    logger.info(f"{'Started' if started else 'Queued'} async query task {task_id}: {query_request.query[:100]}...")
     
     return {
         "task_id": task_id,
@@ -87,11 +127,10 @@ async def get_task_status(task_id: str):
     Returns:
         Task status and result if available
     """
-    if task_id not in TASK_REGISTRY:
+    task_info = task_store.get(task_id)
+    if task_info is None:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
-    task_info = TASK_REGISTRY[task_id]
-    
     return task_info
 
 @router.delete("/task/{task_id}")
@@ -104,11 +143,16 @@ async def cancel_task(task_id: str):
     Returns:
         Success status
     """
-    if task_id not in TASK_REGISTRY:
+    status = task_store.get_status(task_id)
+    if status is None:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
-    # Mark task as cancelled
-    TASK_REGISTRY[task_id]["status"] = "cancelled"
+    # Mark task as cancelled unless it has already finished, and stop its society
+    if not cancel_owl_task(task_id, "cancelled by API request"):
+        return {
+            "status": "success",
+            "message": f"Task {task_id} already {task_store.get_status(task_id)}"
+        }
     logger.info(f"Task {task_id} cancelled by API request")
     
     return {
@@ -132,13 +176,9 @@ async def list_tasks(
     """
     tasks = []
     
-    for task_id, task_info in list(TASK_REGISTRY.items())[-limit:]:
-        # Filter by status if specified
-        if status and task_info.get("status") != status:
-            continue
-            
+    for task_info in task_store.list(limit=limit, status=status):
         tasks.append({
-            "task_id": task_id,
+            "task_id": task_info["task_id"],
             "query": task_info.get("query", "")[:100] + "..." if len(task_info.get("query", "")) > 100 else task_info.get("query", ""),
             "module": task_info.get("module", ""),
             "status": task_info.get("status", "unknown")
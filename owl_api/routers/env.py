@@ -23,6 +23,8 @@ from owl_api.services.env_manager import (
     get_env_vars, 
     set_env_var, 
     delete_env_var, 
+    apply_env_batch,
+    get_env_version,
     get_api_related_vars,
     is_api_related,
     get_api_guide,
@@ -39,6 +41,16 @@ class EnvVarRequest(BaseModel):
     key: str
     value: str
 
+class EnvBatchOperation(BaseModel):
+    """One operation of a batch update"""
+    key: str
+    value: Optional[str] = None
+    action: str = "set"
+
+class EnvBatchRequest(BaseModel):
+    """Batch update request model"""
+    operations: List[EnvBatchOperation]
+
 class EnvVarResponse(BaseModel):
     """Environment variable response model"""
     success: bool
@@ -112,6 +124,32 @@ async def update_env_var(env_var: EnvVarRequest):
         "message": message
     }
 
+@router.post("/batch")
+async def update_env_vars_batch(batch: EnvBatchRequest):
+    """Set and delete many environment variables at once
+    
+    All operations are validated first and written to .env in one atomic
+    rewrite; if any operation is invalid nothing is changed.
+    
+    Args:
+        batch: Operations to apply, each with key, action ("set" or "delete") and value
+        
+    Returns:
+        Dict: Success status, message and the new environment version
+    """
+    success, message = apply_env_batch([operation.dict() for operation in batch.operations])
+    
+    if not success:
+        raise HTTPException(status_code=400, detail=message)
+        
+    logger.info(f"Environment batch of {len(batch.operations)} operations applied")
+    
+    return {
+        "success": success,
+        "message": message,
+        "version": get_env_version()
+    }
+
 @router.delete("/delete/{key}")
 async def remove_env_var(key: str):
     """Delete an environment variable
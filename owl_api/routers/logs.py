@@ -13,11 +13,19 @@
 # limitations under the License.
 # ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
 from typing import Dict, List, Any, Optional
+import asyncio
+import datetime
 import logging
+import os
 
-from owl_api.services.log_manager import get_log_entries, get_log_files, clear_log_file, get_conversation_history
+from owl_api.services.log_manager import (
+    get_log_entries, get_log_files, clear_log_file, get_current_log_file
+)
+from owl_api.services.conversation_store import get_conversation_store
+from owl_api.services.log_tail import LogFilter, get_log_tailer, SOURCE_TYPES
+from owl_api.services.log_search import get_log_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -27,25 +35,67 @@ router = APIRouter(prefix="/logs", tags=["logs"])
 async def get_logs(
     max_entries: Optional[int] = Query(100, description="Maximum number of log entries to return"),
     filter_text: Optional[str] = Query(None, description="Text to filter logs by"),
-    log_file: Optional[str] = Query(None, description="Specific log file to read from")
+    log_file: Optional[str] = Query(None, description="Specific log file to read from"),
+    level: Optional[str] = Query(None, description="Only return entries with this level")
 ) -> List[Dict[str, Any]]:
-    """Get log entries from the system
+    """Get log entries from the system, newest first
     
     Args:
         max_entries: Maximum number of log entries to return
         filter_text: Text to filter logs by
         log_file: Specific log file to read from
+        level: Only return entries with this level
         
     Returns:
         List[Dict[str, Any]]: List of log entries
     """
     try:
-        logs = get_log_entries(max_entries, filter_text, log_file)
+        # Off the event loop: reading a log index or the search database does file and SQLite I/O
+        logs = await asyncio.to_thread(get_log_entries, max_entries, filter_text, log_file, level)
         return logs
     except Exception as e:
         logger.error(f"Error retrieving logs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving logs: {str(e)}")
 
+@router.get("/search", summary="Search all log files")
+async def search_logs(
+    q: Optional[str] = Query(None, description="Text the entry must contain"),
+    level: Optional[str] = Query(None, description="Only return entries with this level"),
+    source: Optional[str] = Query(None, description="Comma-separated sources: api, process_pool, browser"),
+    log_file: Optional[str] = Query(None, description="Only search this log file"),
+    start: Optional[datetime.datetime] = Query(None, description="Only return entries at or after this time"),
+    end: Optional[datetime.datetime] = Query(None, description="Only return entries at or before this time"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    offset: int = Query(0, ge=0, description="Number of matching entries to skip")
+) -> Dict[str, Any]:
+    """Search entries of every log file, including rotated ones, newest first
+    
+    Args:
+        q: Text the entry must contain
+        level: Only return entries with this level
+        source: Comma-separated sources to include
+        log_file: Only search this log file
+        start: Only return entries at or after this time
+        end: Only return entries at or before this time
+        limit: Page size
+        offset: Number of matching entries to skip
+        
+    Returns:
+        Dict[str, Any]: Matching entries, the page and whether more entries match
+    """
+    try:
+        sources = [part.strip() for part in source.split(",") if part.strip()] if source else None
+        return await asyncio.to_thread(
+            get_log_search_index().search,
+            text=q, level=level, sources=sources, log_file=log_file,
+            start=start.timestamp() if start else None,
+            end=end.timestamp() if end else None,
+            limit=limit, offset=offset
+        )
+    except Exception as e:
+        logger.error(f"Error searching logs: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error searching logs: {str(e)}")
+
 @router.get("/files", summary="Get available log files")
 async def list_log_files(
     include_browser_logs: Optional[bool] = Query(True, description="Whether to include browser process logs")
@@ -82,28 +132,32 @@ async def get_browser_logs(
         Dict[str, Any]: Log entries and file information
     """
     try:
-        # Get list of browser log files
+        # Worker records are in the structured log, tagged with their source
+        entries = await asyncio.to_thread(get_log_entries, max_entries=max_entries,
+                                          filter_text=filter_text,
+                                          sources=["browser", "process_pool"])
+        
+        # Per-process text logs written before structured logging
         all_files = get_log_files(include_browser_logs=True)
         browser_files = [f for f in all_files if f["type"] in ["browser", "process_pool"]]
+        current_file = next((f for f in all_files if f["is_current"]), None)
         
-        if not browser_files:
+        if not entries and browser_files:
+            current_file = browser_files[0]
+            entries = await asyncio.to_thread(get_log_entries, max_entries=max_entries,
+                                              filter_text=filter_text,
+                                              log_file=current_file["path"])
+        
+        if not entries:
             return {
-                "files": [],
+                "files": browser_files[:5],
                 "entries": [],
-                "message": "No browser log files found. Browser operations may not have been used yet."
+                "message": "No browser log entries found. Browser operations may not have been used yet."
             }
         
-        # Get the most recent browser log file
-        most_recent_file = browser_files[0]
-        
-        # Get log entries from the most recent file
-        entries = get_log_entries(max_entries=max_entries, 
-                                 filter_text=filter_text, 
-                                 log_file=most_recent_file["path"])
-        
         return {
             "files": browser_files[:5],  # Return up to 5 most recent files
-            "current_file": most_recent_file,
+            "current_file": current_file,
             "entries": entries,
             "total_files": len(browser_files)
         }
@@ -112,21 +166,105 @@ async def get_browser_logs(
         logger.error(f"Error retrieving browser logs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving browser logs: {str(e)}")
 
+@router.websocket("/tail")
+async def tail_logs(
+    websocket: WebSocket,
+    level: Optional[str] = Query(None, description="Comma-separated levels to include"),
+    module: Optional[str] = Query(None, description="Logger name prefix to include"),
+    filter_text: Optional[str] = Query(None, description="Text to filter logs by"),
+    types: Optional[str] = Query(None, description="Comma-separated log types: regular, browser, process_pool"),
+    backlog: int = Query(0, description="Number of recent entries from the current log to send first")
+):
+    """Stream new log entries as they are written
+    
+    Follows the API log and the browser/process pool logs. Each entry is sent
+    as {"type": "log", "entry": {...}}. Clients may send
+    {"type": "filter", "level": ..., "module": ..., "filter_text": ..., "types": ...}
+    to change the filter without reconnecting.
+    
+    Args:
+        websocket: WebSocket connection
+        level: Comma-separated levels to include
+        module: Logger name prefix to include
+        filter_text: Text to filter logs by
+        types: Comma-separated log types to include
+        backlog: Number of recent entries from the current log to send first
+    """
+    await websocket.accept()
+    log_filter = LogFilter.from_params(level, module, filter_text, types)
+    tailer = get_log_tailer()
+    subscriber = tailer.subscribe(log_filter)
+    
+    async def receive_filters():
+        while True:
+            message = await websocket.receive_json()
+            if message.get("type") == "filter":
+                subscriber.filter = LogFilter.from_params(
+                    message.get("level"), message.get("module"),
+                    message.get("filter_text"), message.get("types")
+                )
+    
+    receiver = asyncio.create_task(receive_filters())
+    try:
+        if backlog > 0:
+            single_level = next(iter(log_filter.levels)) if len(log_filter.levels) == 1 else None
+            current_file = os.path.basename(get_current_log_file())
+            # Read in a thread so a client connecting does not stall every other stream
+            entries = await asyncio.to_thread(get_log_entries, backlog, filter_text, None, single_level)
+            for entry in reversed(entries):
+                entry.update({"file": current_file, "type": SOURCE_TYPES.get(entry.get("source"), "regular")})
+                if log_filter.matches(entry):
+                    await websocket.send_json({"type": "log", "entry": entry, "backlog": True})
+        
+        while not receiver.done():
+            getter = asyncio.create_task(subscriber.queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                break
+            if subscriber.dropped:
+                await websocket.send_json({"type": "dropped", "count": subscriber.dropped})
+                subscriber.dropped = 0
+            await websocket.send_json({"type": "log", "entry": getter.result()})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error tailing logs: {str(e)}")
+    finally:
+        receiver.cancel()
+        tailer.unsubscribe(subscriber)
+
 @router.get("/conversations", summary="Get conversation history")
 async def get_conversations(
-    max_conversations: Optional[int] = Query(10, description="Maximum number of conversations to return")
+    max_conversations: int = Query(10, ge=1, le=1000, description="Maximum number of messages to return"),
+    offset: int = Query(0, ge=0, description="Number of newer messages to skip"),
+    task_id: Optional[str] = Query(None, description="Only return messages of this task"),
+    model: Optional[str] = Query(None, description="Only return messages produced by this model"),
+    start: Optional[datetime.datetime] = Query(None, description="Only return messages at or after this time"),
+    end: Optional[datetime.datetime] = Query(None, description="Only return messages at or before this time")
 ) -> List[Dict[str, Any]]:
-    """Get conversation history from logs
+    """Get agent messages from the conversation store, oldest first within the page
     
     Args:
-        max_conversations: Maximum number of conversations to return
+        max_conversations: Maximum number of messages to return
+        offset: Number of newer messages to skip
+        task_id: Only return messages of this task
+        model: Only return messages produced by this model
+        start: Only return messages at or after this time
+        end: Only return messages at or before this time
         
     Returns:
         List[Dict[str, Any]]: List of conversation records
     """
     try:
-        conversations = get_conversation_history(max_conversations)
-        return conversations
+        page = await asyncio.to_thread(
+            get_conversation_store().list_messages,
+            task_id=task_id, model=model,
+            start=start.timestamp() if start else None,
+            end=end.timestamp() if end else None,
+            limit=max_conversations, offset=offset
+        )
+        return page["messages"]
     except Exception as e:
         logger.error(f"Error retrieving conversation history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving conversation history: {str(e)}")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, Any
+import asyncio
+import logging
+
+from owl_api.services.process_pool import get_process_pool, get_browser_process_pool
+from owl_api.services.capabilities import get_capabilities, init_capabilities
+from owl_api.services.admission import get_admission_controller
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+@router.get("/pools", summary="Get process pool utilization")
+async def get_pool_stats() -> Dict[str, Any]:
+    """Get utilization of the worker pools
+    
+    Returns:
+        Dict[str, Any]: Regular process pool stats, and browser pool stats
+            including per-worker utilization and recent scaling events
+    """
+    try:
+        return {
+            "process_pool": get_process_pool().stats(),
+            "browser_pool": get_browser_process_pool().stats()
+        }
+    except Exception as e:
+        logger.error(f"Error retrieving pool stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving pool stats: {str(e)}")
+
+@router.get("/admission", summary="Get admission budgets and usage")
+async def get_admission_stats() -> Dict[str, Any]:
+    """Get the admission budgets and what is charged against them
+    
+    Returns:
+        Dict[str, Any]: Budgets, running and waiting queries, in-flight
+            estimated tokens and last-minute usage per provider key and
+            client, and the learned per-module estimates
+    """
+    try:
+        return get_admission_controller().stats()
+    except Exception as e:
+        logger.error(f"Error retrieving admission stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving admission stats: {str(e)}")
+
+@router.get("/capabilities", summary="Get host capabilities")
+async def get_host_capabilities(
+    refresh: bool = Query(False, description="Probe the host again, e.g. after installing a browser")
+) -> Dict[str, Any]:
+    """Get the browsers, display and Playwright browsers found on the host
+    
+    The host is probed once at startup; tasks read the cached result. A
+    refreshed result is sent to running pool workers with their next task.
+    
+    Args:
+        refresh: Probe the host again, e.g. after installing a browser
+        
+    Returns:
+        Dict[str, Any]: Host capabilities
+    """
+    try:
+        if refresh:
+            return await asyncio.to_thread(init_capabilities)
+        return get_capabilities()
+    except Exception as e:
+        logger.error(f"Error retrieving capabilities: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving capabilities: {str(e)}")
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import collections
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from owl_api.services.task_store import get_task_store
+from owl_api.services.env_manager import get_env_snapshot
+from owl_api.services.module_manager import get_execution_profile, PLATFORM_ENV_VARS
+from owl_api.services.scheduler import PRIORITY_WEIGHTS, DEFAULT_PRIORITY
+
+logger = logging.getLogger(__name__)
+
+# Estimate for a module until it has finished tasks to learn from
+DEFAULT_TASK_TOKENS = 60000
+DEFAULT_TASK_MINUTES = 3.0
+# Weight of the newest finished task in the per-module moving averages
+HISTORY_WEIGHT = 0.3
+# Measured usage is summed over this many seconds
+USAGE_WINDOW = 60.0
+
+class AdmissionRejected(Exception):
+    """Raised when a query can neither start nor wait within the admission budgets"""
+
+    def __init__(self, message: str, retry_after: int = 10):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(slots=True)
+class _Lease:
+    """Budget held by a query from admission until its task finishes"""
+    task_id: str
+    client: str
+    module_name: str
+    providers: Tuple[str, ...]
+    estimated_tokens: float
+    estimated_seconds: float
+    rate: float  # estimated tokens per minute
+    priority: str = DEFAULT_PRIORITY
+    admitted_at: float = 0.0
+    used_tokens: int = 0
+
+
+@dataclass(slots=True)
+class _Ticket:
+    """A query waiting for budget"""
+    lease: _Lease
+    start: Callable[[], Any]
+    loop: Optional[asyncio.AbstractEventLoop]
+    queued_at: float
+
+
+class AdmissionController:
+    """Token- and concurrency-aware admission of queries
+
+    Each query is charged to the provider keys of its module (the model
+    platform plus a fingerprint of its API key, e.g. ``OPENAI:1a2b3c4d``)
+    and to the client that sent it. Its cost is estimated from the
+    ``token_info`` of the module's finished tasks: moving averages of the
+    tokens a task used and of how long it ran give an expected rate in
+    tokens per minute.
+
+    A query starts when, for each of its provider keys and for its client,
+    the concurrency limit has room and the expected rate of the running
+    queries plus its own fits the tokens-per-minute budget. A provider key
+    whose measured usage over the last minute (from the round usage the
+    workers stream) has reached its budget takes no new work. Other
+    queries wait in a bounded queue, interactive ones ahead of batch ones
+    and FIFO otherwise, and start as budget frees up; once the queue is
+    full, AdmissionRejected is raised.
+    """
+
+    def __init__(self, provider_tpm=200000, provider_max_concurrent=4, client_tpm=100000,
+                 client_max_concurrent=2, max_waiting=32, max_waiting_per_client=8,
+                 provider_tpm_overrides: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            provider_tpm: Tokens per minute each provider key may be charged
+            provider_max_concurrent: Queries that may run at once per provider key
+            client_tpm: Tokens per minute each client may be charged
+            client_max_concurrent: Queries that may run at once per client
+            max_waiting: Queries that may wait for budget in total
+            max_waiting_per_client: Queries that may wait for budget per client
+            provider_tpm_overrides: Tokens per minute by platform, e.g. {"QWEN": 50000}
+        """
+        self.provider_tpm = provider_tpm
+        self.provider_max_concurrent = provider_max_concurrent
+        self.client_tpm = client_tpm
+        self.client_max_concurrent = client_max_concurrent
+        self.max_waiting = max_waiting
+        self.max_waiting_per_client = max_waiting_per_client
+        self.provider_tpm_overrides = dict(provider_tpm_overrides or {})
+
+        self._lock = threading.RLock()
+        self._leases: Dict[str, _Lease] = {}
+        self._waiting: Dict[str, _Ticket] = {}  # task_id -> ticket, in arrival order
+        self._usage: Dict[str, collections.deque] = {}  # provider -> (time, tokens)
+        self._history: Dict[str, Tuple[float, float]] = {}  # module -> (tokens, seconds)
+        self._recheck_timer: Optional[threading.Timer] = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+        self._seed_history()
+        get_task_store().add_terminal_listener(self._task_finished)
+
+    def _seed_history(self):
+        """Learn from the finished tasks recovered from the task journal"""
+        learned = 0
+        for task in get_task_store().list(limit=500, status="completed"):
+            token_info = (task.get("result") or {}).get("token_info") or {}
+            tokens = (token_info.get("prompt_token_count") or 0) + (token_info.get("completion_token_count") or 0)
+            if tokens and task.get("module"):
+                self._learn(task["module"], tokens, task["updated_at"] - task["created_at"])
+                learned += 1
+        if learned:
+            logger.info(f"Admission estimates learned from {learned} finished tasks")
+
+    def _learn(self, module_name: str, tokens: float, seconds: float):
+        seconds = max(seconds, 1.0)
+        previous = self._history.get(module_name)
+        if previous is None:
+            self._history[module_name] = (tokens, seconds)
+        else:
+            self._history[module_name] = (
+                previous[0] + HISTORY_WEIGHT * (tokens - previous[0]),
+                previous[1] + HISTORY_WEIGHT * (seconds - previous[1]),
+            )
+
+    def estimate(self, module_name: str) -> Tuple[float, float]:
+        """Expected tokens and run time of a query
+
+        Args:
+            module_name: Example module name
+
+        Returns:
+            Tuple[float, float]: Tokens and seconds
+        """
+        with self._lock:
+            return self._history.get(module_name, (DEFAULT_TASK_TOKENS, DEFAULT_TASK_MINUTES * 60))
+
+    def _providers(self, module_name: str) -> Tuple[str, ...]:
+        profile = get_execution_profile(module_name)
+        platforms = profile.platforms if profile is not None and profile.platforms else ("DEFAULT",)
+        env_vars = get_env_snapshot().vars
+        providers = []
+        for platform in platforms:
+            api_key = env_vars.get(PLATFORM_ENV_VARS.get(platform, ""), ("",))[0]
+            # A rotated key gets its own budget
+            fingerprint = hashlib.sha256(api_key.encode()).hexdigest()[:8] if api_key else "nokey"
+            providers.append(f"{platform}:{fingerprint}")
+        return tuple(providers)
+
+    def _tpm_budget(self, provider: str) -> int:
+        return self.provider_tpm_overrides.get(provider.split(":", 1)[0], self.provider_tpm)
+
+    def _window_tokens(self, provider: str, now: float) -> int:
+        usage = self._usage.get(provider)
+        if not usage:
+            return 0
+        while usage and usage[0][0] < now - USAGE_WINDOW:
+            usage.popleft()
+        return sum(tokens for _, tokens in usage)
+
+    def _blocked_by(self, lease: _Lease, now: float) -> Optional[Tuple[str, str]]:
+        """The provider key or client keeping a query from starting now, and why
+
+        Must hold the lock.
+
+        Returns:
+            Optional[Tuple[str, str]]: Blocking key and reason, or None if the query can start
+        """
+        for provider in lease.providers:
+            running = [other for other in self._leases.values() if provider in other.providers]
+            budget = self._tpm_budget(provider)
+            if len(running) >= self.provider_max_concurrent:
+                return provider, f"{provider} is running {len(running)} queries"
+            if running and sum(other.rate for other in running) + lease.rate > budget:
+                return provider, f"{provider} token budget of {budget}/min is committed"
+            if self._window_tokens(provider, now) >= budget:
+                return provider, f"{provider} used its token budget of {budget}/min"
+        client = f"client:{lease.client}"
+        running = [other for other in self._leases.values() if other.client == lease.client]
+        if len(running) >= self.client_max_concurrent:
+            return client, f"client is running {len(running)} queries"
+        if running and sum(other.rate for other in running) + lease.rate > self.client_tpm:
+            return client, f"client token budget of {self.client_tpm}/min is committed"
+        return None
+
+    def _select(self, now: float) -> Tuple[List[_Ticket], bool]:
+        """Admit the waiting queries that fit, by priority then age; must hold the lock
+
+        A query that does not fit holds back later queries sharing the
+        provider key or client that blocks it, so none of them overtakes it.
+
+        Returns:
+            Tuple[List[_Ticket], bool]: Admitted tickets, and whether any
+                query waits on measured usage, which frees up without a task finishing
+        """
+        admitted, held_back, waits_on_usage = [], set(), False
+        position = 0
+        waiting = sorted(self._waiting.items(), key=lambda item: -PRIORITY_WEIGHTS.get(item[1].lease.priority, 1))
+        for task_id, ticket in waiting:
+            lease = ticket.lease
+            keys = set(lease.providers) | {f"client:{lease.client}"}
+            if keys & held_back:
+                blocked = None, "waiting behind earlier queries"
+            else:
+                blocked = self._blocked_by(lease, now)
+            if blocked is None:
+                del self._waiting[task_id]
+                lease.admitted_at = now
+                self._leases[task_id] = lease
+                self.admitted += 1
+                admitted.append(ticket)
+                continue
+            key, reason = blocked
+            if key is not None:
+                held_back.add(key)
+            waits_on_usage = waits_on_usage or "used its token budget" in reason
+            position += 1
+            get_task_store().update(task_id, {
+                "process_status": "waiting_for_capacity",
+                "admission_position": position,
+                "admission_reason": reason
+            })
+        return admitted, waits_on_usage
+
+    def admit(self, task_id: str, client: str, module_name: str, start: Callable[[], Any]) -> bool:
+        """Start a query now if it fits the budgets, or queue it until it does
+
+        Must be called from the event loop; ``start`` always runs on it.
+
+        Args:
+            task_id: Task identifier
+            client: Client the query is charged to
+            module_name: Example module name
+            start: Starts the task; called once the query is admitted
+
+        Returns:
+            bool: Whether the query started now
+
+        Raises:
+            AdmissionRejected: If the query does not fit and the wait queue is full
+        """
+        tokens, seconds = self.estimate(module_name)
+        lease = _Lease(
+            task_id=task_id,
+            client=client,
+            module_name=module_name,
+            providers=self._providers(module_name),
+            estimated_tokens=tokens,
+            estimated_seconds=seconds,
+            rate=tokens / max(seconds / 60, 1.0),
+            priority=(get_task_store().get(task_id) or {}).get("priority", DEFAULT_PRIORITY),
+        )
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        now = time.time()
+        with self._lock:
+            self._waiting[task_id] = _Ticket(lease=lease, start=start, loop=loop, queued_at=now)
+            admitted, waits_on_usage = self._select(now)
+            started = task_id in self._leases
+            # Counted after _select, which may have admitted some of the client's waiting queries
+            client_waiting = sum(1 for ticket in self._waiting.values()
+                                 if ticket.lease.client == client and ticket.lease.task_id != task_id)
+            if not started and (len(self._waiting) > self.max_waiting
+                                or client_waiting >= self.max_waiting_per_client):
+                del self._waiting[task_id]
+                self.rejected += 1
+                retry_after = self._retry_after(now)
+            elif not started:
+                self.queued += 1
+        if waits_on_usage:
+            self._schedule_recheck()
+
+        # Queries admitted by _select hold leases, so they start even if this one is rejected
+        for ticket in admitted:
+            self._start(ticket, inline=ticket.lease.task_id == task_id)
+        if not started and task_id not in self._waiting:
+            raise AdmissionRejected("Too many queries are waiting for model capacity, please retry later",
+                                    retry_after)
+        if not started:
+            logger.info(f"Task {task_id} is waiting for capacity ({self._waiting_reason(task_id)})")
+        return started
+
+    def _waiting_reason(self, task_id: str) -> str:
+        return (get_task_store().get(task_id) or {}).get("admission_reason", "")
+
+    def _retry_after(self, now: float) -> int:
+        """Seconds until the first running query is expected to finish; must hold the lock"""
+        remaining = [lease.admitted_at + lease.estimated_seconds - now for lease in self._leases.values()]
+        return int(min(max(min(remaining, default=10), 5), 120))
+
+    def _start(self, ticket: _Ticket, inline: bool = False):
+        lease = ticket.lease
+        get_task_store().update(lease.task_id, {
+            "admission_position": 0,
+            "admission_wait": round(lease.admitted_at - ticket.queued_at, 3),
+            "estimated_tokens": int(lease.estimated_tokens)
+        })
+        if inline or ticket.loop is None or ticket.loop.is_closed():
+            ticket.start()
+        else:
+            ticket.loop.call_soon_threadsafe(ticket.start)
+
+    def _pump(self):
+        with self._lock:
+            self._recheck_timer = None
+            admitted, waits_on_usage = self._select(time.time())
+        if waits_on_usage:
+            self._schedule_recheck()
+        for ticket in admitted:
+            self._start(ticket)
+
+    def _schedule_recheck(self):
+        """Look at the queue again once measured usage has aged out of the window"""
+        with self._lock:
+            if self._recheck_timer is not None:
+                return
+            now = time.time()
+            oldest = min((usage[0][0] for usage in self._usage.values() if usage), default=now)
+            self._recheck_timer = threading.Timer(max(oldest + USAGE_WINDOW - now, 1.0), self._pump)
+            self._recheck_timer.daemon = True
+            self._recheck_timer.start()
+
+    def record_usage(self, task_id: str, usage: Dict[str, Any]):
+        """Charge the tokens of one streamed round to the task's provider keys
+
+        Args:
+            task_id: Task the round belongs to
+            usage: Round usage with prompt_tokens and completion_tokens
+        """
+        tokens = (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+        if not tokens:
+            return
+        with self._lock:
+            lease = self._leases.get(task_id)
+            if lease is None:
+                return
+            lease.used_tokens += tokens
+            now = time.time()
+            for provider in lease.providers:
+                self._usage.setdefault(provider, collections.deque()).append((now, tokens))
+
+    def _task_finished(self, task_id: str, status: str):
+        """Release a finished task's budget and learn from its token_info"""
+        with self._lock:
+            ticket = self._waiting.pop(task_id, None)
+            lease = self._leases.pop(task_id, None)
+        if ticket is not None:
+            logger.info(f"Task {task_id} {status} while waiting for capacity")
+        if lease is None:
+            if ticket is not None:
+                self._pump()
+            return
+
+        if status == "completed":
+            token_info = ((get_task_store().get(task_id) or {}).get("result") or {}).get("token_info") or {}
+            tokens = (token_info.get("prompt_token_count") or 0) + (token_info.get("completion_token_count") or 0)
+            tokens = tokens or lease.used_tokens
+            if tokens:
+                with self._lock:
+                    self._learn(lease.module_name, tokens, time.time() - lease.admitted_at)
+        self._pump()
+
+    def stats(self) -> Dict[str, Any]:
+        """In-flight estimated tokens and measured usage per provider key and client"""
+        with self._lock:
+            now = time.time()
+            providers: Dict[str, Dict[str, Any]] = {}
+            clients: Dict[str, Dict[str, Any]] = {}
+            for lease in self._leases.values():
+                for provider in lease.providers:
+                    entry = providers.setdefault(provider, {"running": 0, "inflight_tokens": 0, "committed_tpm": 0})
+                    entry["running"] += 1
+                    entry["inflight_tokens"] += int(max(lease.estimated_tokens - lease.used_tokens, 0))
+                    entry["committed_tpm"] += int(lease.rate)
+                entry = clients.setdefault(lease.client, {"running": 0, "inflight_tokens": 0, "committed_tpm": 0})
+                entry["running"] += 1
+                entry["inflight_tokens"] += int(max(lease.estimated_tokens - lease.used_tokens, 0))
+                entry["committed_tpm"] += int(lease.rate)
+            for provider in self._usage:
+                entry = providers.setdefault(provider, {"running": 0, "inflight_tokens": 0, "committed_tpm": 0})
+                entry["tokens_last_minute"] = self._window_tokens(provider, now)
+                entry["tpm_budget"] = self._tpm_budget(provider)
+            return {
+                "provider_tpm": self.provider_tpm,
+                "provider_tpm_overrides": self.provider_tpm_overrides,
+                "provider_max_concurrent": self.provider_max_concurrent,
+                "client_tpm": self.client_tpm,
+                "client_max_concurrent": self.client_max_concurrent,
+                "max_waiting": self.max_waiting,
+                "waiting": len(self._waiting),
+                "running": len(self._leases),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "providers": providers,
+                "clients": clients,
+                "estimates": {module: {"tokens": int(tokens), "seconds": round(seconds, 1)}
+                              for module, (tokens, seconds) in self._history.items()}
+            }
+
+
+def _env_int(env_vars: Dict[str, Tuple[str, str]], name: str, default: int) -> int:
+    value = env_vars.get(name, (None,))[0]
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Ignoring {name}={value!r}: not an integer")
+        return default
+
+
+_admission_controller: Optional[AdmissionController] = None
+_admission_controller_lock = threading.Lock()
+
+def get_admission_controller() -> AdmissionController:
+    """Get the admission controller, configured from OWL_ADMISSION_* variables
+
+    OWL_ADMISSION_TPM, OWL_ADMISSION_MAX_CONCURRENT, OWL_ADMISSION_CLIENT_TPM,
+    OWL_ADMISSION_CLIENT_MAX_CONCURRENT and OWL_ADMISSION_MAX_WAITING set the
+    budgets; OWL_ADMISSION_TPM_<PLATFORM> (e.g. OWL_ADMISSION_TPM_QWEN)
+    overrides the tokens per minute of one platform.
+    """
+    global _admission_controller
+    with _admission_controller_lock:
+        if _admission_controller is None:
+            env_vars = get_env_snapshot().vars
+            prefix = "OWL_ADMISSION_TPM_"
+            overrides = {name[len(prefix):]: _env_int(env_vars, name, 0)
+                         for name in env_vars if name.startswith(prefix)}
+            _admission_controller = AdmissionController(
+                provider_tpm=_env_int(env_vars, "OWL_ADMISSION_TPM", 200000),
+                provider_max_concurrent=_env_int(env_vars, "OWL_ADMISSION_MAX_CONCURRENT", 4),
+                client_tpm=_env_int(env_vars, "OWL_ADMISSION_CLIENT_TPM", 100000),
+                client_max_concurrent=_env_int(env_vars, "OWL_ADMISSION_CLIENT_MAX_CONCURRENT", 2),
+                max_waiting=_env_int(env_vars, "OWL_ADMISSION_MAX_WAITING", 32),
+                provider_tpm_overrides={platform: tpm for platform, tpm in overrides.items() if tpm > 0},
+            )
+        return _admission_controller
@@ -17,36 +17,83 @@ import os
 import sys
 import time
 import json
+import queue
 import traceback
 import multiprocessing
+import multiprocessing.connection
 from typing import Dict, Any, Optional
 
-# Configure logging
 import logging
-logging.basicConfig(level=logging.INFO)
+
+from owl_api.services.structured_logging import configure_worker_logging
+
 logger = logging.getLogger("browser_process")
 
-def browser_worker(input_queue, output_queue, env_vars=None):
+class _CancelMessages:
+    """Cancel token of the current task, fed by the pool's control messages
+    
+    Cancel messages for other task ids are stale (their task already
+    finished) and are dropped. A stop message asks this worker to exit
+    once it is idle.
+    """
+    
+    def __init__(self, control_queue):
+        self._control_queue = control_queue
+        self._task_id: Optional[str] = None
+        self._cancelled = False
+        self._stop_requested = False
+    
+    def start(self, task_id: str):
+        self.is_set()  # drain stale messages
+        self._task_id = task_id
+        self._cancelled = False
+    
+    def is_set(self) -> bool:
+        if self._control_queue is None:
+            return False
+        while True:
+            try:
+                action, task_id = self._control_queue.get_nowait()
+            except queue.Empty:
+                break
+            except (EOFError, OSError):
+                break
+            if action == "cancel" and task_id == self._task_id:
+                self._cancelled = True
+            elif action == "stop":
+                self._stop_requested = True
+        return self._cancelled
+    
+    def stop_requested(self) -> bool:
+        self.is_set()
+        return self._stop_requested
+
+def browser_worker(input_queue, output_queue, env_config=None, log_queue=None, control_queue=None):
     """
     Worker function that runs in a separate process to handle browser operations
     
     Args:
         input_queue: Queue for receiving tasks
         output_queue: Queue for sending results
-        env_vars: Environment variables to set in the worker process
+        env_config: Environment version and values from get_worker_env_config()
+        log_queue: Queue of the API's structured log listener
+        control_queue: Queue of cancel and stop messages for this worker
     """
+    configure_worker_logging(log_queue, "browser")
     logger.info("Browser worker process started with PID: %s", os.getpid())
     
+    def send(message: Dict[str, Any]):
+        # Tag every message so the pool knows which worker is busy
+        message["worker_pid"] = os.getpid()
+        output_queue.put(message)
+    
     # Set environment variables if provided
-    if env_vars:
-        for key, value in env_vars.items():
-            os.environ[key] = value
+    from owl_api.services.env_manager import apply_env_config
+    if env_config:
+        apply_env_config(*env_config)
             
     # Import modules here to ensure they're loaded in the worker process
     try:
-        from dotenv import load_dotenv
-        load_dotenv()  # Load environment variables
-        
         # Import CAMEL modules inside the process
         from camel.models import ModelFactory
         from camel.toolkits import BrowserToolkit
@@ -54,7 +101,7 @@ def browser_worker(input_queue, output_queue, env_vars=None):
         from camel.societies import RolePlaying
         
         # Import OWL utilities
-        from owl.utils import run_society
+        from owl.utils import run_society, TaskCancelled
         
         # Import example modules
         sys.path.insert(0, ".")  # Ensure imports work from the project root
@@ -63,14 +110,40 @@ def browser_worker(input_queue, output_queue, env_vars=None):
     except ImportError as e:
         error_msg = f"Failed to import required modules in browser worker: {str(e)}"
         logger.error(error_msg)
-        output_queue.put({"status": "error", "error": error_msg})
+        send({"status": "error", "error": error_msg})
         return
     
+    # Keep the Playwright driver, browsers and model clients alive across tasks
+    from owl_api.services.warm_browser import WarmBrowserHost, ModelBackendCache
+    from owl_api.services.task_events import json_safe
+    browser_host = WarmBrowserHost()
+    model_cache = ModelBackendCache()
+    model_cache.install()
+    if browser_host.install():
+        try:
+            browser_host.playwright()
+        except Exception as e:
+            logger.warning(f"Could not start Playwright driver ahead of the first task: {str(e)}")
+    tasks_served = 0
+    cancel_token = _CancelMessages(control_queue)
+    
     # Main worker loop
     while True:
         try:
-            # Get task from queue
-            task = input_queue.get()
+            # Get task from queue, unless the pool stops this worker while it waits
+            if control_queue is not None:
+                # The private readers are the queues' pipes; the result collector waits on them the same way
+                multiprocessing.connection.wait([input_queue._reader, control_queue._reader])
+                if cancel_token.stop_requested():
+                    logger.info("Received stop request, shutting down browser worker")
+                    break
+                try:
+                    task = input_queue.get_nowait()
+                except queue.Empty:
+                    # Another worker took it
+                    continue
+            else:
+                task = input_queue.get()
             
             # Check for termination signal
             if task == "STOP":
@@ -81,14 +154,24 @@ def browser_worker(input_queue, output_queue, env_vars=None):
             task_id = task.get("task_id")
             query = task.get("query")
             module_name = task.get("module")
+            cancel_token.start(task_id)
             
             logger.info(f"Processing task {task_id} with query: {query[:50]}...")
             
+            # Apply environment changes made since the last task, rebuilding only affected models
+            if task.get("env"):
+                model_cache.invalidate_env(apply_env_config(*task["env"]))
+            
             # Send initial status update
-            output_queue.put({
+            browser_stats = browser_host.stats()
+            if browser_stats["browsers"]:
+                message = f"Reusing warm browser in worker {os.getpid()} ({tasks_served} tasks served)"
+            else:
+                message = f"Browser process started (PID: {os.getpid()})"
+            send({
                 "task_id": task_id,
                 "status": "processing",
-                "message": f"Browser process started (PID: {os.getpid()})"
+                "message": message
             })
             
             # Load the specified module
@@ -105,14 +188,18 @@ def browser_worker(input_queue, output_queue, env_vars=None):
                     raise ImportError(f"Module {module_name} does not have construct_society function")
                 
                 # Send status update about module loading
-                output_queue.put({
+                send({
                     "task_id": task_id,
                     "status": "processing",
                     "message": f"Loaded module {module_name}, initializing browser"
                 })
                 
-                # Create society using the module
-                society = module.construct_society(query)
+                if cancel_token.is_set():
+                    raise TaskCancelled("Task cancelled before it started")
+                
+                # Create society using the module, reusing this module's model backends
+                with model_cache.scope(module_name):
+                    society = module.construct_society(query)
                 
                 # Send status update about browser mode
                 browser_mode = "visible"  # Default to visible for now
@@ -127,7 +214,7 @@ def browser_worker(input_queue, output_queue, env_vars=None):
                 except Exception as e:
                     logger.warning(f"Could not detect browser mode: {e}")
                 
-                output_queue.put({
+                send({
                     "task_id": task_id,
                     "status": "processing",
                     "message": f"Creating society with {browser_mode} browser mode",
@@ -136,11 +223,20 @@ def browser_worker(input_queue, output_queue, env_vars=None):
                 
                 # Run society
                 logger.info(f"Running society for task {task_id}...")
-                answer, chat_history, token_info = run_society(society)
+                def on_round(round_index, data):
+                    send({
+                        "task_id": task_id,
+                        "status": "round",
+                        "round": json_safe({"round": round_index, **data})
+                    })
+                
+                answer, chat_history, token_info = run_society(
+                    society, on_round=on_round, cancel_token=cancel_token
+                )
                 
                 # Send success result
                 logger.info(f"Task {task_id} completed successfully")
-                output_queue.put({
+                send({
                     "task_id": task_id,
                     "status": "completed",
                     "result": {
@@ -150,23 +246,37 @@ def browser_worker(input_queue, output_queue, env_vars=None):
                     }
                 })
                 
+            except TaskCancelled as e:
+                logger.info(f"Task {task_id}: {str(e)}")
+                send({
+                    "task_id": task_id,
+                    "status": "cancelled",
+                    "message": str(e)
+                })
             except Exception as e:
                 error_msg = f"Error in browser worker: {str(e)}\n{traceback.format_exc()}"
                 logger.error(error_msg)
-                output_queue.put({
+                send({
                     "task_id": task_id,
                     "status": "error",
                     "error": error_msg
                 })
+            finally:
+                # Drop the task's pages, cookies and storage but keep the browser running
+                closed = browser_host.release_contexts()
+                tasks_served += 1
+                logger.info(f"Task {task_id} released {closed} browser contexts; "
+                            f"browser {browser_host.stats()}, models {model_cache.stats()}")
                 
         except Exception as e:
             # Handle any exceptions in the worker loop
             logger.error(f"Unhandled exception in browser worker: {str(e)}\n{traceback.format_exc()}")
             if 'task_id' in locals():
-                output_queue.put({
+                send({
                     "task_id": task_id,
                     "status": "error",
                     "error": f"Unhandled exception in browser worker: {str(e)}"
                 })
     
+    browser_host.shutdown()
     logger.info("Browser worker process shutting down")
\ No newline at end of file
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import os
+import glob
+import json
+import time
+import shutil
+import logging
+import platform
+import threading
+import subprocess
+import importlib.util
+from typing import Dict, List, Any, Optional
+
+from owl_api.services.log_manager import LOG_DIRECTORY
+
+logger = logging.getLogger(__name__)
+
+# Written by the API process at startup and read by worker processes
+CAPABILITIES_PATH = os.path.join(LOG_DIRECTORY, "capabilities.json")
+
+BROWSER_PATHS = [
+    # Chrome paths
+    ("Chrome", "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"),  # macOS
+    ("Chrome", "/Applications/Google Chrome.app/Contents/MacOS/chrome"),  # Alternative macOS path
+    ("Chrome", "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"),  # Windows
+    ("Chrome", "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe"),
+    ("Chrome", "/usr/bin/google-chrome"),  # Linux
+    ("Chrome", "/usr/bin/chromium-browser"),
+    # Firefox paths
+    ("Firefox", "/Applications/Firefox.app/Contents/MacOS/firefox"),  # macOS
+    ("Firefox", "C:\\Program Files\\Mozilla Firefox\\firefox.exe"),  # Windows
+    ("Firefox", "/usr/bin/firefox"),  # Linux
+    # Safari path (macOS only)
+    ("Safari", "/Applications/Safari.app/Contents/MacOS/Safari"),  # macOS
+]
+
+# Executables looked up on PATH in addition to the fixed paths
+BROWSER_COMMANDS = [
+    ("Chrome", "google-chrome"),
+    ("Chrome", "chromium"),
+    ("Chrome", "chromium-browser"),
+    ("Firefox", "firefox"),
+]
+
+# macOS bundle identifiers looked up with mdfind when no fixed path exists
+MAC_BUNDLES = [
+    ("Chrome", "com.google.Chrome", "Contents/MacOS/Google Chrome"),
+    ("Firefox", "org.mozilla.firefox", "Contents/MacOS/firefox"),
+    ("Safari", "com.apple.Safari", "Contents/MacOS/Safari"),
+]
+
+_capabilities: Optional[Dict[str, Any]] = None
+_lock = threading.Lock()
+
+def _find_browsers(system: str) -> List[Dict[str, str]]:
+    found, seen = [], set()
+    for name, path in BROWSER_PATHS:
+        if os.path.exists(path) and os.access(path, os.X_OK) and os.path.realpath(path) not in seen:
+            found.append({"name": name, "path": path})
+            seen.add(os.path.realpath(path))
+    for name, command in BROWSER_COMMANDS:
+        path = shutil.which(command)
+        if path and os.path.realpath(path) not in seen:
+            found.append({"name": name, "path": path})
+            seen.add(os.path.realpath(path))
+
+    if not found and system == "Darwin":
+        for name, bundle_id, executable in MAC_BUNDLES:
+            try:
+                result = subprocess.run(["mdfind", f"kMDItemCFBundleIdentifier == '{bundle_id}'"],
+                                        capture_output=True, text=True, timeout=5)
+            except Exception as e:
+                logger.debug(f"Error checking for {name} via mdfind: {str(e)}")
+                continue
+            for app_path in result.stdout.strip().split("\n"):
+                path = os.path.join(app_path, executable) if app_path else ""
+                if path and os.path.exists(path):
+                    found.append({"name": name, "path": path})
+                    break
+    return found
+
+def _playwright_browsers_directory(system: str) -> str:
+    custom = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    if custom and custom != "0":
+        return custom
+    if system == "Darwin":
+        return os.path.expanduser("~/Library/Caches/ms-playwright")
+    if system == "Windows":
+        return os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "ms-playwright")
+    return os.path.expanduser("~/.cache/ms-playwright")
+
+def _probe_playwright(system: str) -> Dict[str, Any]:
+    installed = importlib.util.find_spec("playwright") is not None
+    directory = _playwright_browsers_directory(system)
+    browsers = sorted(os.path.basename(path) for path in glob.glob(os.path.join(directory, "*"))
+                      if os.path.isdir(path) and not os.path.basename(path).startswith("."))
+    return {
+        "installed": installed,
+        "browsers_path": directory,
+        "browsers": browsers,
+        "chromium": any(name.startswith("chromium") for name in browsers),
+    }
+
+def _probe_display(system: str) -> Dict[str, Any]:
+    ssh_session = "SSH_CLIENT" in os.environ or "SSH_TTY" in os.environ
+    display = os.environ.get("DISPLAY")
+    wayland_display = os.environ.get("WAYLAND_DISPLAY")
+    if system == "Linux":
+        available = bool(display or wayland_display)
+    else:
+        # macOS and Windows sessions have a display unless reached over SSH
+        available = not ssh_session
+    return {
+        "available": available,
+        "display": display,
+        "wayland_display": wayland_display,
+        "ssh_session": ssh_session,
+    }
+
+def probe_capabilities() -> Dict[str, Any]:
+    """Check which browsers, display and Playwright browsers this host has
+
+    Only cheap checks are made (file and PATH lookups, plus mdfind on macOS
+    when no browser is at a known path); nothing is installed.
+
+    Returns:
+        Dict[str, Any]: Capabilities, with ``browser_available`` summarizing
+            whether a browser module can run
+    """
+    started = time.perf_counter()
+    system = platform.system()
+    browsers = _find_browsers(system)
+    playwright = _probe_playwright(system)
+    display = _probe_display(system)
+    capabilities = {
+        "platform": platform.platform(),
+        "system": system,
+        "browsers": browsers,
+        "playwright": playwright,
+        "display": display,
+        "browser_available": bool(browsers) or playwright["chromium"],
+        "visible_browser_available": (bool(browsers) or playwright["chromium"]) and display["available"],
+        "probed_at": time.time(),
+        "probe_seconds": round(time.perf_counter() - started, 4),
+    }
+    if not capabilities["browser_available"]:
+        capabilities["install_hint"] = (
+            "No browser found. Install Google Chrome (https://www.google.com/chrome/) "
+            "or run: python -m playwright install chromium"
+        )
+    return capabilities
+
+def init_capabilities() -> Dict[str, Any]:
+    """Probe the host once in the API process and share the result with workers
+
+    Returns:
+        Dict[str, Any]: Capabilities from probe_capabilities()
+    """
+    global _capabilities
+    capabilities = probe_capabilities()
+    with _lock:
+        _capabilities = capabilities
+    try:
+        os.makedirs(os.path.dirname(CAPABILITIES_PATH), exist_ok=True)
+        temp_path = f"{CAPABILITIES_PATH}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(capabilities, f)
+        os.replace(temp_path, CAPABILITIES_PATH)
+    except OSError as e:
+        logger.warning(f"Could not save capabilities to {CAPABILITIES_PATH}: {str(e)}")
+
+    browser_names = ", ".join(browser["name"] for browser in capabilities["browsers"]) or "none"
+    logger.info(f"Host capabilities: browsers {browser_names}, "
+                f"Playwright chromium {capabilities['playwright']['chromium']}, "
+                f"display {capabilities['display']['available']} "
+                f"(probed in {capabilities['probe_seconds']}s)")
+    if not capabilities["browser_available"]:
+        logger.warning(capabilities["install_hint"])
+    return capabilities
+
+def get_capabilities() -> Dict[str, Any]:
+    """Get the cached host capabilities
+
+    Worker processes read the file written by init_capabilities(); the host
+    is only probed here if neither the cache nor the file exists.
+
+    Returns:
+        Dict[str, Any]: Capabilities from probe_capabilities()
+    """
+    global _capabilities
+    if _capabilities is not None:
+        return _capabilities
+    with _lock:
+        if _capabilities is None:
+            try:
+                with open(CAPABILITIES_PATH, "r", encoding="utf-8") as f:
+                    _capabilities = json.load(f)
+            except (OSError, ValueError):
+                _capabilities = probe_capabilities()
+        return _capabilities
+
+def apply_capabilities(capabilities: Optional[Dict[str, Any]]):
+    """Use capabilities sent with a task in a worker process
+
+    The pool sends the API process's capabilities with every task, so a
+    refresh reaches running workers with their next task. Results of an
+    older probe than the cached one are ignored.
+
+    Args:
+        capabilities: Capabilities from get_capabilities() in the API process
+    """
+    global _capabilities
+    if not capabilities:
+        return
+    with _lock:
+        if _capabilities is None or capabilities.get("probed_at", 0) > _capabilities.get("probed_at", 0):
+            _capabilities = capabilities
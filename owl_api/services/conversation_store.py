@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import datetime
+import threading
+from typing import Dict, List, Any, Optional
+
+from owl_api.services.log_manager import LOG_DIRECTORY
+from owl_api.services.task_store import get_task_store
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversation_messages (
+    id INTEGER PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    module TEXT,
+    round INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    model TEXT,
+    content TEXT,
+    tool_calls TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversation_messages_task ON conversation_messages (task_id, round);
+CREATE INDEX IF NOT EXISTS conversation_messages_model_ts ON conversation_messages (model, ts);
+CREATE INDEX IF NOT EXISTS conversation_messages_ts ON conversation_messages (ts);
+"""
+
+
+class ConversationStore:
+    """SQLite store of the agent rounds of every task
+
+    The process pools and the in-process runner hand each round reported
+    by run_society's on_round callback to record_round() in the API
+    process, which stores it as a user and an assistant message. Reads are
+    indexed queries by task, model and time, with no dependency on what the
+    agents log.
+
+    record_round() runs on the event loop, so it only queues the rows; a
+    writer thread inserts everything queued in one transaction per batch.
+    Reads write any rows still queued first.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(LOG_DIRECTORY, "conversations.sqlite3")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._pending: List[tuple] = []
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+
+    def record_round(self, task_id: str, data: Dict[str, Any]):
+        """Store one round reported by run_society
+
+        Args:
+            task_id: Task the round belongs to
+            data: Round record with round, user, assistant, tool_calls and,
+                when available, user_model, assistant_model and usage
+        """
+        now = time.time()
+        task_info = get_task_store().get(task_id) or {}
+        module = task_info.get("module") or None
+        usage = data.get("usage") or {}
+        tool_calls = data.get("tool_calls") or []
+        rows = [
+            (task_id, module, data.get("round", 0), "user", data.get("user_model"),
+             data.get("user", ""), None, None, None, now),
+            (task_id, module, data.get("round", 0), "assistant", data.get("assistant_model"),
+             data.get("assistant", ""), json.dumps(tool_calls, default=str) if tool_calls else None,
+             usage.get("prompt_tokens"), usage.get("completion_tokens"), now),
+        ]
+        with self._pending_lock:
+            if self._closed:
+                return
+            self._pending.extend(rows)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run_writer, daemon=True, name="conversation-writer")
+                self._writer.start()
+        self._wakeup.set()
+
+    def _run_writer(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._closed:
+                return
+            self._write_pending()
+
+    def _write_pending(self):
+        """Insert the queued rows in one transaction"""
+        # Held across the swap so batches are inserted in the order they were queued
+        with self._lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return
+            try:
+                self._conn.executemany(
+                    "INSERT INTO conversation_messages (task_id, module, round, role, model, content, "
+                    "tool_calls, prompt_tokens, completion_tokens, ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error storing {len(rows)} conversation messages: {str(e)}")
+
+    def list_messages(self, task_id: Optional[str] = None, model: Optional[str] = None,
+                      role: Optional[str] = None, start: Optional[float] = None,
+                      end: Optional[float] = None, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        """Get a page of messages, newest page first, each page in chronological order
+
+        Args:
+            task_id: Only return messages of this task
+            model: Only return messages produced by this model
+            role: Only return "user" or "assistant" messages
+            start: Only return messages at or after this unix time
+            end: Only return messages at or before this unix time
+            limit: Page size
+            offset: Number of newer messages to skip
+
+        Returns:
+            Dict[str, Any]: ``messages``, ``limit``, ``offset`` and ``has_more``
+        """
+        conditions, params = [], []
+        for column, value in (("task_id", task_id), ("model", model), ("role", role)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("ts <= ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        self._write_pending()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM conversation_messages {where} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit + 1, offset]
+            ).fetchall()
+
+        messages = [self._to_message(row) for row in rows[:limit]]
+        messages.reverse()
+        return {"messages": messages, "limit": limit, "offset": offset, "has_more": len(rows) > limit}
+
+    @staticmethod
+    def _to_message(row: sqlite3.Row) -> Dict[str, Any]:
+        message = {
+            "timestamp": datetime.datetime.fromtimestamp(row["ts"]).isoformat(),
+            "task_id": row["task_id"],
+            "module": row["module"],
+            "model": row["model"] or "unknown",
+            "index": row["round"],
+            "role": row["role"],
+            "content": row["content"],
+        }
+        if row["tool_calls"]:
+            message["tool_calls"] = json.loads(row["tool_calls"])
+        if row["prompt_tokens"] is not None:
+            message["usage"] = {
+                "prompt_tokens": row["prompt_tokens"],
+                "completion_tokens": row["completion_tokens"],
+            }
+        return message
+
+    def close(self):
+        with self._pending_lock:
+            self._closed = True
+        self._wakeup.set()
+        self._write_pending()
+        with self._lock:
+            self._conn.close()
+
+
+_conversation_store: Optional[ConversationStore] = None
+_conversation_store_lock = threading.Lock()
+
+def get_conversation_store() -> ConversationStore:
+    global _conversation_store
+    with _conversation_store_lock:
+        if _conversation_store is None:
+            _conversation_store = ConversationStore()
+        return _conversation_store
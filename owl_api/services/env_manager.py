@@ -14,9 +14,13 @@
 # ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
 
 import os
+import re
 import logging
+import tempfile
+import threading
+from dataclasses import dataclass
 from typing import Dict, Tuple, List, Optional, Any
-from dotenv import load_dotenv, find_dotenv, set_key, unset_key
+from dotenv import dotenv_values, find_dotenv, set_key, unset_key
 
 logger = logging.getLogger(__name__)
 
@@ -85,53 +89,169 @@ def init_env_file() -> str:
     
     return dotenv_path
 
-def get_env_vars() -> Dict[str, Tuple[str, str]]:
-    """Get all environment variables
+@dataclass(frozen=True)
+class EnvSnapshot:
+    """Environment configuration at one version
+    
+    ``vars`` maps each name to a (value, source) tuple, as returned by
+    get_env_vars(). Snapshots are never modified; a change produces a new
+    snapshot with a higher version.
+    """
+    version: int
+    dotenv_path: str
+    file_vars: Dict[str, str]
+    vars: Dict[str, Tuple[str, str]]
+
+
+class EnvConfigCache:
+    """Caches the merged environment configuration of this process
+    
+    The .env file is parsed and os.environ is walked only when the file's
+    mtime or size changes or after invalidate() (called by set_env_var and
+    delete_env_var). Every other call is one stat of the .env file.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dotenv_path: Optional[str] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._snapshot: Optional[EnvSnapshot] = None
+        self._dirty = True
+    
+    def _stat(self) -> Tuple[str, Tuple[int, int]]:
+        if self._dotenv_path is None or not os.path.exists(self._dotenv_path):
+            self._dotenv_path = init_env_file()
+        st = os.stat(self._dotenv_path)
+        return self._dotenv_path, (st.st_mtime_ns, st.st_size)
+    
+    def snapshot(self) -> EnvSnapshot:
+        """Get the current snapshot, rebuilding it if .env changed
+        
+        Returns:
+            EnvSnapshot: The snapshot
+        """
+        dotenv_path, stamp = self._stat()
+        snapshot = self._snapshot
+        if snapshot is not None and not self._dirty and stamp == self._stamp:
+            return snapshot
+        with self._lock:
+            dotenv_path, stamp = self._stat()
+            if self._snapshot is not None and not self._dirty and stamp == self._stamp:
+                return self._snapshot
+            self._dirty = False
+            self._stamp = stamp
+            self._snapshot = self._build(dotenv_path)
+            return self._snapshot
+    
+    def _build(self, dotenv_path: str) -> EnvSnapshot:
+        previous = self._snapshot.file_vars if self._snapshot is not None else {}
+        file_vars = {key: value or "" for key, value in dotenv_values(dotenv_path).items()}
+        
+        # Apply the file like load_dotenv(override=True), and drop keys removed from it
+        for key, value in file_vars.items():
+            os.environ[key] = value
+        for key in previous.keys() - file_vars.keys():
+            if os.environ.get(key) == previous[key] and key not in WEB_FRONTEND_ENV_VARS:
+                del os.environ[key]
+        
+        env_vars = {}
+        # System environment variables (lowest priority)
+        for key, value in os.environ.items():
+            if key not in file_vars and key not in WEB_FRONTEND_ENV_VARS:
+                env_vars[key] = (value, "System")
+        # .env file environment variables (medium priority)
+        for key, value in file_vars.items():
+            env_vars[key] = (value, ".env file")
+        # Frontend configured environment variables (highest priority)
+        for key, value in WEB_FRONTEND_ENV_VARS.items():
+            env_vars[key] = (value, "Frontend configuration")
+            os.environ[key] = value
+        
+        version = self._snapshot.version + 1 if self._snapshot is not None else 1
+        logger.debug(f"Environment snapshot version {version} built from {dotenv_path}")
+        return EnvSnapshot(version=version, dotenv_path=dotenv_path, file_vars=file_vars, vars=env_vars)
+    
+    def invalidate(self):
+        """Rebuild the snapshot on next access"""
+        self._dirty = True
+    
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+
+# Environment configuration of this process; workers have their own
+_env_cache = EnvConfigCache()
+
+def get_env_snapshot() -> EnvSnapshot:
+    """Get the current environment snapshot
+    
+    Also brings os.environ up to date with .env, so worker processes call
+    this before each task instead of load_dotenv.
     
     Returns:
-        Dict[str, Tuple[str, str]]: Dict with keys as variable names, values as (value, source) tuples
+        EnvSnapshot: The snapshot
     """
-    # Initialize .env file if it doesn't exist
-    dotenv_path = init_env_file()
-    
-    # Load environment variables
-    load_dotenv(dotenv_path, override=True)
-    
-    # Read environment variables from .env file
-    env_file_vars = {}
-    with open(dotenv_path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith("#"):
-                if "=" in line:
-                    key, value = line.split("=", 1)
-                    env_file_vars[key.strip()] = value.strip().strip("\"'")
-    
-    # Get system environment variables
-    system_env_vars = {
-        k: v
-        for k, v in os.environ.items()
-        if k not in env_file_vars and k not in WEB_FRONTEND_ENV_VARS
-    }
+    return _env_cache.snapshot()
+
+def get_env_version() -> int:
+    """Get the version of the current environment configuration
     
-    # Merge environment variables and mark sources
-    env_vars = {}
+    Returns:
+        int: Version number, increased by every change
+    """
+    return _env_cache.version
+
+def get_worker_env_config() -> Tuple[int, Dict[str, str]]:
+    """Get the configuration pushed to worker processes with each task
     
-    # Add system environment variables (lowest priority)
-    for key, value in system_env_vars.items():
-        env_vars[key] = (value, "System")
+    Returns:
+        Tuple[int, Dict[str, str]]: Snapshot version and every value set in
+            .env or from the frontend
+    """
+    snapshot = get_env_snapshot()
+    return snapshot.version, {
+        key: value for key, (value, source) in snapshot.vars.items() if source != "System"
+    }
+
+# Configuration last applied by apply_env_config() in this worker process
+_applied_env_version = 0
+_applied_env: Dict[str, str] = {}
+
+def apply_env_config(version: int, values: Dict[str, str]) -> List[str]:
+    """Apply a configuration from get_worker_env_config() in a worker process
     
-    # Add .env file environment variables (medium priority)
-    for key, value in env_file_vars.items():
-        env_vars[key] = (value, ".env file")
+    Only the difference from the previously applied configuration is
+    written to os.environ; configurations no newer than it are ignored.
     
-    # Add frontend configured environment variables (highest priority)
-    for key, value in WEB_FRONTEND_ENV_VARS.items():
-        env_vars[key] = (value, "Frontend configuration")
-        # Ensure operating system environment variables are also updated
-        os.environ[key] = value
+    Args:
+        version: Snapshot version of the configuration
+        values: Values set in .env or from the frontend
+        
+    Returns:
+        List[str]: Names of the variables that changed or were removed
+    """
+    global _applied_env_version, _applied_env
+    if version <= _applied_env_version:
+        return []
+    changed = [key for key, value in values.items() if os.environ.get(key) != value]
+    removed = [key for key in _applied_env if key not in values and key in os.environ]
+    for key in changed:
+        os.environ[key] = values[key]
+    for key in removed:
+        del os.environ[key]
+    _applied_env_version, _applied_env = version, dict(values)
+    if changed or removed:
+        logger.info(f"Applied environment version {version}: {len(changed)} changed, {len(removed)} removed")
+    return changed + removed
+
+def get_env_vars() -> Dict[str, Tuple[str, str]]:
+    """Get all environment variables
     
-    return env_vars
+    Returns:
+        Dict[str, Tuple[str, str]]: Dict with keys as variable names, values as (value, source) tuples
+    """
+    return dict(get_env_snapshot().vars)
 
 def set_env_var(key: str, value: str, from_frontend: bool = True) -> Tuple[bool, str]:
     """Add or update an environment variable
@@ -158,11 +278,9 @@ def set_env_var(key: str, value: str, from_frontend: bool = True) -> Tuple[bool,
             os.environ[key] = value
         
         # Update .env file
-        dotenv_path = init_env_file()
+        dotenv_path = get_env_snapshot().dotenv_path
         set_key(dotenv_path, key, value)
-        
-        # Reload environment variables
-        load_dotenv(dotenv_path, override=True)
+        _env_cache.invalidate()
         
         logger.info(f"Environment variable '{key}' set to '{value}'")
         return True, f"Environment variable {key} has been successfully added/updated"
@@ -187,7 +305,7 @@ def delete_env_var(key: str) -> Tuple[bool, str]:
         key = key.strip()
         
         # Delete from .env file
-        dotenv_path = init_env_file()
+        dotenv_path = get_env_snapshot().dotenv_path
         unset_key(dotenv_path, key)
         
         # Delete from frontend environment variable dictionary
@@ -197,6 +315,7 @@ def delete_env_var(key: str) -> Tuple[bool, str]:
         # Delete from process environment
         if key in os.environ:
             del os.environ[key]
+        _env_cache.invalidate()
             
         logger.info(f"Environment variable '{key}' deleted")
         return True, f"Environment variable {key} has been successfully deleted"
@@ -205,6 +324,132 @@ def delete_env_var(key: str) -> Tuple[bool, str]:
         logger.error(f"Error deleting environment variable '{key}': {str(e)}")
         return False, f"Error deleting environment variable: {str(e)}"
 
+# Names accepted by apply_env_batch
+_ENV_KEY_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+
+def _quote_env_value(value: str) -> str:
+    # Same quoting as dotenv.set_key's default quote_mode
+    return "'{}'".format(value.replace("'", "\\'"))
+
+def _env_line_key(line: str) -> Optional[str]:
+    stripped = line.strip()
+    if not stripped or stripped.startswith("#") or "=" not in stripped:
+        return None
+    key = stripped.split("=", 1)[0].strip()
+    if key.startswith("export "):
+        key = key[len("export "):].strip()
+    return key
+
+def apply_env_batch(operations: List[Dict[str, Any]], from_frontend: bool = True) -> Tuple[bool, str]:
+    """Apply many set/delete operations with one .env rewrite
+    
+    Every operation is validated before anything changes. The new .env is
+    written to a temporary file that replaces the old one in a single
+    rename, then the process environment and the snapshot are updated
+    once. If updating the process fails, the old .env is put back.
+    
+    Args:
+        operations: Dicts with ``key``, ``action`` ("set" or "delete", default
+            "set") and, for set, ``value``
+        from_frontend: Whether the values are set from the frontend
+        
+    Returns:
+        Tuple[bool, str]: Success flag and status message
+    """
+    changes: Dict[str, Optional[str]] = {}
+    for index, operation in enumerate(operations):
+        key = (operation.get("key") or "").strip()
+        action = operation.get("action") or "set"
+        if not key:
+            return False, f"Operation {index}: variable name cannot be empty"
+        if not _ENV_KEY_PATTERN.match(key):
+            return False, f"Operation {index}: invalid variable name '{key}'"
+        if action == "set":
+            value = operation.get("value")
+            if value is None:
+                return False, f"Operation {index}: a value is required to set {key}"
+            if "\n" in str(value):
+                return False, f"Operation {index}: the value of {key} cannot contain a newline"
+            changes[key] = str(value).strip()
+        elif action == "delete":
+            changes[key] = None
+        else:
+            return False, f"Operation {index}: unknown action '{action}'"
+    if not changes:
+        return True, "No environment variables to update"
+    
+    dotenv_path = get_env_snapshot().dotenv_path
+    with open(dotenv_path, "r", encoding="utf-8") as f:
+        original = f.read()
+    
+    # Rewrite existing lines in place, drop deleted keys and append new ones
+    lines, written = [], set()
+    for line in original.splitlines(keepends=True):
+        key = _env_line_key(line)
+        if key is None or key not in changes:
+            lines.append(line)
+        elif changes[key] is not None and key not in written:
+            lines.append(f"{key}={_quote_env_value(changes[key])}\n")
+            written.add(key)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    for key, value in changes.items():
+        if value is not None and key not in written:
+            lines.append(f"{key}={_quote_env_value(value)}\n")
+    
+    try:
+        _replace_file(dotenv_path, "".join(lines))
+    except OSError as e:
+        logger.error(f"Error writing {dotenv_path}: {str(e)}")
+        return False, f"Error writing environment file: {str(e)}"
+    
+    previous_frontend = dict(WEB_FRONTEND_ENV_VARS)
+    previous_environ = {key: os.environ.get(key) for key in changes}
+    try:
+        for key, value in changes.items():
+            if value is None:
+                WEB_FRONTEND_ENV_VARS.pop(key, None)
+                os.environ.pop(key, None)
+            else:
+                if from_frontend:
+                    WEB_FRONTEND_ENV_VARS[key] = value
+                os.environ[key] = value
+        _env_cache.invalidate()
+        get_env_snapshot()
+    except Exception as e:
+        logger.error(f"Error applying environment batch, restoring {dotenv_path}: {str(e)}")
+        _replace_file(dotenv_path, original)
+        WEB_FRONTEND_ENV_VARS.clear()
+        WEB_FRONTEND_ENV_VARS.update(previous_frontend)
+        for key, value in previous_environ.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        _env_cache.invalidate()
+        return False, f"Error updating environment variables: {str(e)}"
+    
+    updated = sum(1 for value in changes.values() if value is not None)
+    logger.info(f"Environment batch applied: {updated} set, {len(changes) - updated} deleted")
+    return True, f"{updated} environment variables set and {len(changes) - updated} deleted"
+
+def _replace_file(path: str, content: str):
+    """Atomically replace a file's content via a temporary file and rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".env.", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
 def check_required_env_vars() -> Dict[str, List[str]]:
     """Check if required environment variables are set
     
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import os
+import re
+import json
+import struct
+import hashlib
+import logging
+import datetime
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Matches the first line of an entry written with the API's log format
+ENTRY_HEADER = re.compile(rb"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d+) - [a-zA-Z0-9_\.]+ - ([A-Z]+) - ")
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+_LEVEL_CODES = {name: code for code, name in enumerate(LEVELS, 1)}
+
+# Header: magic, bytes of the log covered by the index, fingerprint length, fingerprint
+_HEADER = struct.Struct("<8sQQ32s")
+_MAGIC = b"OWLLIDX1"
+# One record per entry: byte offset, unix timestamp, level code
+_RECORD = struct.Struct("<QdB")
+# Bytes at the start of the log used to notice that it was truncated or replaced
+_FINGERPRINT_BYTES = 256
+# Records read from the index at a time when walking backwards
+_BATCH = 256
+
+
+class LogIndex:
+    """Sidecar index of entry offsets for one log file
+
+    The index lives next to the log as ``<log>.idx``: a small header and one
+    fixed-size record (byte offset, timestamp, level) per entry. Text logs
+    start an entry at each line matching the log format; in structured
+    ``.jsonl`` logs every line is an entry. ``refresh``
+    only reads the bytes appended since the last call, and because records
+    have a fixed size, the newest entries are found by seeking back from the
+    end of the index and reading just their byte ranges from the log.
+    """
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self.index_path = f"{log_path}.idx"
+        self._jsonl = log_path.endswith(".jsonl")
+        self._lock = threading.Lock()
+        self._indexed_bytes = 0
+        self._count = 0
+        self._fingerprint_len = 0
+        self._fingerprint = b""
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(_HEADER.size)
+                if len(header) != _HEADER.size:
+                    raise ValueError("short header")
+                magic, indexed_bytes, fingerprint_len, fingerprint = _HEADER.unpack(header)
+                if magic != _MAGIC:
+                    raise ValueError("bad magic")
+                f.seek(0, os.SEEK_END)
+                count = (f.tell() - _HEADER.size) // _RECORD.size
+                # Records appended before a crash that never made it into the header
+                while count > 0:
+                    f.seek(_HEADER.size + (count - 1) * _RECORD.size)
+                    offset, _, _ = _RECORD.unpack(f.read(_RECORD.size))
+                    if offset < indexed_bytes:
+                        break
+                    count -= 1
+        except FileNotFoundError:
+            self._reset()
+            return
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Rebuilding log index {self.index_path}: {str(e)}")
+            self._reset()
+            return
+
+        self._indexed_bytes = indexed_bytes
+        self._count = count
+        self._fingerprint_len = fingerprint_len
+        self._fingerprint = fingerprint
+        with open(self.index_path, "r+b") as f:
+            f.truncate(_HEADER.size + count * _RECORD.size)
+
+    def _reset(self):
+        self._indexed_bytes = 0
+        self._count = 0
+        self._fingerprint_len = 0
+        self._fingerprint = b""
+        with open(self.index_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, 0, 0, b""))
+
+    def _write_header(self, f):
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, self._indexed_bytes, self._fingerprint_len, self._fingerprint))
+
+    def _log_replaced(self, log, size: int) -> bool:
+        if size < self._indexed_bytes:
+            return True
+        if self._fingerprint_len:
+            log.seek(0)
+            head = log.read(self._fingerprint_len)
+            return hashlib.sha256(head).digest() != self._fingerprint
+        return False
+
+    def refresh(self):
+        """Index entries appended to the log since the last refresh"""
+        with self._lock:
+            try:
+                log = open(self.log_path, "rb")
+            except FileNotFoundError:
+                if self._count:
+                    self._reset()
+                return
+            with log:
+                size = os.fstat(log.fileno()).st_size
+                if self._log_replaced(log, size):
+                    logger.info(f"Log file {self.log_path} was truncated or replaced, rebuilding its index")
+                    self._reset()
+                if size == self._indexed_bytes:
+                    return
+
+                log.seek(self._indexed_bytes)
+                position = self._indexed_bytes
+                records = []
+                seconds_cache: Dict[bytes, float] = {}
+                for line in log:
+                    if not line.endswith(b"\n"):
+                        # Partial line still being written; index it next time
+                        break
+                    if self._jsonl:
+                        records.append(self._json_record(position, line))
+                    else:
+                        match = ENTRY_HEADER.match(line)
+                        if match:
+                            records.append(self._record(position, match, seconds_cache))
+                    position += len(line)
+
+                if position == self._indexed_bytes:
+                    return
+                if not self._fingerprint_len:
+                    log.seek(0)
+                    head = log.read(min(position, _FINGERPRINT_BYTES))
+                    self._fingerprint_len = len(head)
+                    self._fingerprint = hashlib.sha256(head).digest()
+
+            with open(self.index_path, "r+b") as f:
+                f.seek(_HEADER.size + self._count * _RECORD.size)
+                f.write(b"".join(records))
+                self._count += len(records)
+                self._indexed_bytes = position
+                # The header is written last, so a crash leaves records it does not cover
+                self._write_header(f)
+
+    @staticmethod
+    def _record(offset: int, match, seconds_cache: Dict[bytes, float]) -> bytes:
+        stamp = match.group(1)
+        # Consecutive entries mostly share the same second; parse each second once
+        seconds = seconds_cache.get(stamp[:19])
+        if seconds is None:
+            try:
+                seconds = datetime.datetime.strptime(stamp[:19].decode("ascii"), "%Y-%m-%d %H:%M:%S").timestamp()
+            except ValueError:
+                seconds = 0.0
+            if len(seconds_cache) > 4096:
+                seconds_cache.clear()
+            seconds_cache[stamp[:19]] = seconds
+        timestamp = seconds + int(stamp[20:23]) / 1000 if seconds else 0.0
+        level = _LEVEL_CODES.get(match.group(2).decode("ascii"), 0)
+        return _RECORD.pack(offset, timestamp, level)
+
+    @staticmethod
+    def _json_record(offset: int, line: bytes) -> bytes:
+        try:
+            data = json.loads(line)
+            timestamp = float(data.get("ts", 0.0))
+            level = _LEVEL_CODES.get(data.get("level"), 0)
+        except (ValueError, TypeError, AttributeError):
+            timestamp, level = 0.0, 0
+        return _RECORD.pack(offset, timestamp, level)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _read_records(self, f, start: int, stop: int) -> List[Tuple[int, float, int]]:
+        f.seek(_HEADER.size + start * _RECORD.size)
+        data = f.read((stop - start) * _RECORD.size)
+        return list(_RECORD.iter_unpack(data))
+
+    def iter_latest(self, level: Optional[str] = None) -> Iterator[str]:
+        """Yield the raw text of entries, newest first
+
+        Each batch costs one read from the index and one read of the log
+        covering just the entries in that batch.
+
+        Args:
+            level: Only yield entries with this level
+
+        Yields:
+            str: Entry text, including continuation lines
+        """
+        self.refresh()
+        with self._lock:
+            count = self._count
+            end = self._indexed_bytes
+        level_code = _LEVEL_CODES.get(level.upper()) if level else None
+        if level and level_code is None:
+            return
+
+        with open(self.index_path, "rb") as index, open(self.log_path, "rb") as log:
+            stop = count
+            while stop > 0:
+                start = max(0, stop - _BATCH)
+                records = self._read_records(index, start, stop)
+                span_start = records[0][0]
+                log.seek(span_start)
+                span = log.read(end - span_start)
+                for i in range(len(records) - 1, -1, -1):
+                    offset, _, code = records[i]
+                    if level_code is not None and code != level_code:
+                        continue
+                    entry_end = records[i + 1][0] if i + 1 < len(records) else end
+                    yield span[offset - span_start:entry_end - span_start].decode("utf-8", errors="replace")
+                end = span_start
+                stop = start
+
+    def stats(self) -> Dict[str, int]:
+        """Number of indexed entries and bytes"""
+        with self._lock:
+            return {"entries": self._count, "indexed_bytes": self._indexed_bytes}
+
+
+_indexes: Dict[str, LogIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_log_index(log_path: str) -> LogIndex:
+    """Get the index for a log file, loading it on first use
+
+    Args:
+        log_path: Path to the log file
+
+    Returns:
+        LogIndex: Index kept up to date for the rest of the process
+    """
+    log_path = os.path.abspath(log_path)
+    with _indexes_lock:
+        index = _indexes.get(log_path)
+        if index is None:
+            index = LogIndex(log_path)
+            _indexes[log_path] = index
+        return index
+
+def drop_log_index(log_path: str):
+    """Forget and delete the index for a log file
+
+    Args:
+        log_path: Path to the log file
+    """
+    log_path = os.path.abspath(log_path)
+    with _indexes_lock:
+        _indexes.pop(log_path, None)
+    try:
+        os.remove(f"{log_path}.idx")
+    except OSError:
+        pass
@@ -21,37 +21,44 @@ import logging
 import datetime
 from typing import List, Dict, Any, Optional
 
+from owl_api.services.log_index import get_log_index, drop_log_index
+from owl_api.services.structured_logging import JSON_LOG_FILENAME, start_log_listener
+
 logger = logging.getLogger(__name__)
 
 # Global variables
 LOG_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs")
 
 def setup_logging() -> str:
-    """Set up logging configuration
+    """Set up structured logging for the API process
+    
+    Records from the API and from every worker process are written by one
+    listener to a rotated, compressed JSONL file in the log directory.
     
     Returns:
         str: Path to the log file
     """
-    # Create logs directory if it doesn't exist
-    os.makedirs(LOG_DIRECTORY, exist_ok=True)
-    
-    # Generate current date for log filename
-    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-    log_file = os.path.join(LOG_DIRECTORY, f"owl_api_{current_date}.log")
-    
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-    
+    log_file = start_log_listener(LOG_DIRECTORY)
     logger.info(f"Logging initialized, log file: {log_file}")
     return log_file
 
+def get_log_type(filename: str) -> str:
+    """Classify a log file by its name
+    
+    Args:
+        filename: Log file name
+        
+    Returns:
+        str: "structured", "browser", "process_pool" or "regular"
+    """
+    if filename.endswith(".jsonl"):
+        return "structured"
+    if "browser_process" in filename:
+        return "browser"
+    if "process_pool" in filename:
+        return "process_pool"
+    return "regular"
+
 def get_log_files(include_browser_logs: bool = True) -> List[Dict[str, Any]]:
     """Get a list of available log files
     
@@ -67,18 +74,14 @@ def get_log_files(include_browser_logs: bool = True) -> List[Dict[str, Any]]:
     
     log_files = []
     
-    # Get regular log files
-    for filename in glob.glob(os.path.join(LOG_DIRECTORY, "*.log")):
+    # Structured log plus text logs written before it existed
+    paths = glob.glob(os.path.join(LOG_DIRECTORY, "*.jsonl")) + glob.glob(os.path.join(LOG_DIRECTORY, "*.log"))
+    for filename in paths:
         basename = os.path.basename(filename)
         file_size = os.path.getsize(filename)
         mod_time = os.path.getmtime(filename)
         
-        # Determine log type
-        log_type = "regular"
-        if "browser_process" in basename:
-            log_type = "browser"
-        elif "process_pool" in basename:
-            log_type = "process_pool"
+        log_type = get_log_type(basename)
         
         log_files.append({
             "filename": basename,
@@ -95,7 +98,7 @@ def get_log_files(include_browser_logs: bool = True) -> List[Dict[str, Any]]:
     
     # Filter browser logs if requested
     if not include_browser_logs:
-        log_files = [log for log in log_files if log["type"] == "regular"]
+        log_files = [log for log in log_files if log["type"] in ("structured", "regular")]
         
     return log_files
 
@@ -105,8 +108,7 @@ def get_current_log_file() -> str:
     Returns:
         str: Path to the current log file
     """
-    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-    return os.path.join(LOG_DIRECTORY, f"owl_api_{current_date}.log")
+    return os.path.join(LOG_DIRECTORY, JSON_LOG_FILENAME)
 
 def get_latest_log_file() -> Optional[str]:
     """Get the path to the most recent log file
@@ -147,81 +149,72 @@ def parse_log_line(line: str) -> Optional[Dict[str, Any]]:
     
     return None
 
-def extract_conversation_records(logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Extract conversation records from logs
+def parse_json_record(line: str) -> Optional[Dict[str, Any]]:
+    """Convert a structured log record into a log entry
     
     Args:
-        logs: List of parsed log entries
+        line: One line of the JSONL log
         
     Returns:
-        List[Dict[str, Any]]: List of conversation records
+        Optional[Dict[str, Any]]: Log entry or None if the line is not a record
     """
-    conversation_records = []
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    entry = {
+        "timestamp": record.get("time", ""),
+        "timestamp_raw": record.get("time", ""),
+        "module": record.get("logger", ""),
+        "level": record.get("level", ""),
+        "message": record.get("message", ""),
+        "source": record.get("source", "api"),
+        "pid": record.get("pid"),
+    }
+    for key in ("task_id", "exception", "stack"):
+        if key in record:
+            entry[key] = record[key]
+    return entry
+
+def parse_log_entry(text: str, structured: bool = False) -> Optional[Dict[str, Any]]:
+    """Parse an entry's first line and its continuation lines
     
-    for log in logs:
-        # Only process logs from chat agents
-        if "camel.agents.chat_agent" not in log.get("module", ""):
-            continue
-            
-        message = log.get("message", "")
-        
-        # Try to extract messages array
-        messages_match = re.search(r"Model (.*?), index (\d+), processed these messages: (\[.*\])", message)
-        
-        if messages_match:
-            try:
-                # Extract model name, conversation index, and messages
-                model_name = messages_match.group(1)
-                index = int(messages_match.group(2))
-                messages = json.loads(messages_match.group(3))
-                
-                # Extract user and assistant messages
-                for msg in messages:
-                    if msg.get("role") in ["user", "assistant"]:
-                        conversation_records.append({
-                            "timestamp": log.get("timestamp", ""),
-                            "model": model_name,
-                            "index": index,
-                            "role": msg.get("role"),
-                            "content": msg.get("content", "")
-                        })
-            except json.JSONDecodeError:
-                pass
+    Args:
+        text: Raw entry text as stored in the log file
+        structured: Whether the entry is a JSONL record
         
-        # If JSON parsing fails or no message array is found, try to extract conversation directly
-        if not messages_match:
-            user_pattern = re.compile(r"\{'role': 'user', 'content': '(.*?)'\}")
-            assistant_pattern = re.compile(r"\{'role': 'assistant', 'content': '(.*?)'\}")
-            
-            for content in user_pattern.findall(message):
-                conversation_records.append({
-                    "timestamp": log.get("timestamp", ""),
-                    "model": "unknown",
-                    "index": -1,
-                    "role": "user",
-                    "content": content
-                })
-                
-            for content in assistant_pattern.findall(message):
-                conversation_records.append({
-                    "timestamp": log.get("timestamp", ""),
-                    "model": "unknown",
-                    "index": -1,
-                    "role": "assistant",
-                    "content": content
-                })
-                
-    return conversation_records
+    Returns:
+        Optional[Dict[str, Any]]: Structured log entry or None if couldn't parse
+    """
+    if structured:
+        return parse_json_record(text)
+    lines = text.rstrip("\n").split("\n")
+    entry = parse_log_line(lines[0].rstrip())
+    if entry is not None:
+        for line in lines[1:]:
+            entry["message"] += "\n" + line.rstrip()
+    return entry
 
 def get_log_entries(max_entries: int = 100, 
                    filter_text: Optional[str] = None,
-                   log_file: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Get log entries from the system
+                   log_file: Optional[str] = None,
+                   level: Optional[str] = None,
+                   sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Get the newest log entries, newest first
+    
+    Entries are read backwards through the log's sidecar index, so only the
+    returned entries (and any skipped by the filters) are read and parsed.
+    Text filters are answered by the full-text search index.
     
     Args:
         max_entries: Maximum number of log entries to return
         filter_text: Text to filter logs by
         log_file: Specific log file to read from
+        level: Only return entries with this level
+        sources: Only return structured entries from these sources
+            ("api", "process_pool", "browser")
         
     Returns:
         List[Dict[str, Any]]: List of log entries
@@ -246,62 +239,29 @@ def get_log_entries(max_entries: int = 100,
         logger.warning(f"Log file not found: {file_path}")
         return []
         
+    if filter_text:
+        # Text search goes through the full-text index instead of scanning entries
+        from owl_api.services.log_search import get_log_search_index
+        return get_log_search_index().search(
+            text=filter_text, level=level, sources=sources, log_file=file_path, limit=max_entries
+        )["entries"]
+        
     entries = []
+    structured = file_path.endswith(".jsonl")
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            current_entry = None
-            
-            for line in f:
-                line = line.rstrip()
-                
-                # Try to parse as a new log entry
-                parsed = parse_log_line(line)
-                
-                if parsed:
-                    # This is a new log entry
-                    if current_entry and (not filter_text or 
-                                        filter_text.lower() in str(current_entry).lower()):
-                        entries.append(current_entry)
-                        if len(entries) >= max_entries:
-                            break
-                            
-                    # Start new entry
-                    current_entry = parsed
-                elif current_entry:
-                    # This is a continuation of the previous entry
-                    current_entry["message"] += "\n" + line
-                    
-            # Add the last entry if there is one
-            if current_entry and (not filter_text or 
-                                filter_text.lower() in str(current_entry).lower()):
-                entries.append(current_entry)
-                
+        for text in get_log_index(file_path).iter_latest(level=level):
+            entry = parse_log_entry(text, structured)
+            if entry is None:
+                continue
+            if sources and entry.get("source") not in sources:
+                continue
+            entries.append(entry)
+            if len(entries) >= max_entries:
+                break
     except Exception as e:
         logger.error(f"Error reading log file {file_path}: {str(e)}")
         
-    # Reverse to get newest entries first and apply limit
-    return list(reversed(entries))[:max_entries]
-
-def get_conversation_history(max_conversations: int = 10) -> List[Dict[str, Any]]:
-    """Get the most recent conversation history from logs
-    
-    Args:
-        max_conversations: Maximum number of conversations to return
-        
-    Returns:
-        List[Dict[str, Any]]: List of conversation records
-    """
-    # Get raw logs (more lines to ensure we capture full conversations)
-    raw_logs = get_log_entries(max_entries=1000)
-    
-    # Extract conversation records
-    conversation_records = extract_conversation_records(raw_logs)
-    
-    # Keep only the most recent conversations
-    if len(conversation_records) > max_conversations:
-        conversation_records = conversation_records[-max_conversations:]
-        
-    return conversation_records
+    return entries
 
 def clear_log_file(log_file: Optional[str] = None) -> str:
     """Clear the specified log file or the current log file
@@ -336,6 +296,7 @@ def clear_log_file(log_file: Optional[str] = None) -> str:
         # Clear the file contents
         with open(file_path, "w") as f:
             pass
+        drop_log_index(file_path)
             
         logger.info(f"Cleared log file: {file_path}")
         return f"Successfully cleared log file: {os.path.basename(file_path)}"
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import os
+import glob
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+import datetime
+import threading
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from owl_api.services.log_manager import LOG_DIRECTORY, parse_json_record, parse_log_line, get_log_type
+
+logger = logging.getLogger(__name__)
+
+# Bytes at the start of a log used to notice that it was rotated or replaced
+_FINGERPRINT_BYTES = 256
+# Entries inserted per transaction while catching up on a large file
+_BATCH_SIZE = 5000
+# Source recorded for entries of pre-structured text logs, by log type
+_TEXT_LOG_SOURCES = {"regular": "api", "browser": "browser", "process_pool": "process_pool"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_files (
+    path TEXT PRIMARY KEY,
+    indexed_bytes INTEGER NOT NULL,
+    fingerprint BLOB
+);
+CREATE TABLE IF NOT EXISTS log_entries (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    ts REAL NOT NULL,
+    timestamp TEXT,
+    level TEXT,
+    source TEXT,
+    module TEXT,
+    pid INTEGER,
+    task_id TEXT
+);
+CREATE INDEX IF NOT EXISTS log_entries_ts ON log_entries (ts);
+CREATE INDEX IF NOT EXISTS log_entries_file_ts ON log_entries (file, ts);
+"""
+
+
+class LogSearchIndex:
+    """Incremental SQLite FTS5 index over every log file
+
+    Entries of the structured log and of older per-process text logs are
+    copied into a SQLite database with an FTS5 table over their message,
+    logger name and traceback. Each refresh reads only the bytes appended
+    since the last one; when the structured log is rotated, the unread tail
+    is taken from the compressed ``.1.gz`` file first. Because entries are
+    stored in the database, rotated and compressed logs stay searchable
+    until they are older than ``max_age_days``.
+
+    With SQLite 3.34 or later the trigram tokenizer is used, so a search
+    matches any substring of at least three characters, like the old
+    ``filter_text in entry`` check did.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, log_directory: str = LOG_DIRECTORY,
+                 max_age_days: float = 14, refresh_interval: float = 5.0):
+        self.log_directory = log_directory
+        self.db_path = db_path or os.path.join(log_directory, "log_search.sqlite3")
+        self.max_age_days = max_age_days
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.trigram = sqlite3.sqlite_version_info >= (3, 34, 0)
+        tokenizer = "trigram" if self.trigram else "unicode61"
+        self._conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5(message, module, exception, tokenize='{tokenizer}')"
+        )
+        self._conn.commit()
+
+    def start(self):
+        """Refresh the index in a background thread every refresh_interval seconds"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="log-search-indexer")
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and close the database"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval + 1)
+            self._thread = None
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing log search index: {str(e)}")
+
+    def refresh(self) -> int:
+        """Index entries appended to any log file since the last refresh
+
+        Returns:
+            int: Number of entries added
+        """
+        paths = glob.glob(os.path.join(self.log_directory, "*.jsonl"))
+        paths += glob.glob(os.path.join(self.log_directory, "*.log"))
+        added = 0
+        with self._lock:
+            for path in paths:
+                try:
+                    added += self._refresh_file(path)
+                except OSError as e:
+                    logger.debug(f"Skipping {path} in log search index: {str(e)}")
+            if time.time() - self._last_prune > 3600:
+                self._prune()
+                self._last_prune = time.time()
+        return added
+
+    def _refresh_file(self, path: str) -> int:
+        row = self._conn.execute(
+            "SELECT indexed_bytes, fingerprint FROM log_files WHERE path = ?", (path,)
+        ).fetchone()
+        indexed_bytes, fingerprint = (row["indexed_bytes"], row["fingerprint"]) if row else (0, None)
+        added = 0
+
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(min(indexed_bytes, _FINGERPRINT_BYTES))
+        if fingerprint is not None and (size < indexed_bytes or hashlib.sha256(head).digest() != fingerprint):
+            # Rotated or replaced: finish the old file from its rotated copy, then start over
+            added += self._index_rotated_tail(path, indexed_bytes, fingerprint)
+            indexed_bytes, fingerprint = 0, None
+            self._save_file(path, 0, None)
+        if size == indexed_bytes:
+            self._conn.commit()
+            return added
+
+        with open(path, "rb") as f:
+            f.seek(indexed_bytes)
+            for position, entries in self._read_entries(f, indexed_bytes, path.endswith(".jsonl"), path):
+                self._insert(path, entries)
+                added += len(entries)
+                # The fingerprint always covers the first min(indexed_bytes, 256) bytes
+                if fingerprint is None or indexed_bytes < _FINGERPRINT_BYTES:
+                    fingerprint = self._fingerprint(path, position)
+                indexed_bytes = position
+                self._save_file(path, indexed_bytes, fingerprint)
+        return added
+
+    @staticmethod
+    def _fingerprint(path: str, position: int) -> bytes:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read(min(position, _FINGERPRINT_BYTES))).digest()
+
+    def _index_rotated_tail(self, path: str, indexed_bytes: int, fingerprint: bytes) -> int:
+        rotated = f"{path}.1.gz"
+        if not os.path.exists(rotated):
+            return 0
+        try:
+            with gzip.open(rotated, "rb") as f:
+                if hashlib.sha256(f.read(min(indexed_bytes, _FINGERPRINT_BYTES))).digest() != fingerprint:
+                    return 0
+                f.seek(indexed_bytes)
+                added = 0
+                for _, entries in self._read_entries(f, indexed_bytes, True, path):
+                    self._insert(path, entries)
+                    added += len(entries)
+                return added
+        except (OSError, EOFError) as e:
+            logger.warning(f"Could not index the end of rotated log {rotated}: {str(e)}")
+            return 0
+
+    def _read_entries(self, f, position: int, structured: bool,
+                      path: str) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """Yield batches of entries with the offset up to which they cover the file"""
+        source = _TEXT_LOG_SOURCES.get(get_log_type(os.path.basename(path)), "api")
+        batch: List[Dict[str, Any]] = []
+        pending: Optional[Dict[str, Any]] = None
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Partial line still being written
+                break
+            text = line.decode("utf-8", errors="replace")
+            if structured:
+                position += len(line)
+                entry = parse_json_record(text)
+                if entry is not None:
+                    entry["ts"] = self._timestamp(entry)
+                    batch.append(entry)
+                if len(batch) >= _BATCH_SIZE:
+                    yield position, batch
+                    batch = []
+                continue
+
+            # Text logs: an entry runs until the next line in the log format
+            parsed = parse_log_line(text.rstrip())
+            if parsed:
+                if pending is not None:
+                    batch.append(pending)
+                    if len(batch) >= _BATCH_SIZE:
+                        # position is where the new entry starts
+                        yield position, batch
+                        batch = []
+                parsed["source"] = source
+                parsed["ts"] = self._timestamp(parsed)
+                pending = parsed
+            elif pending is not None:
+                pending["message"] += "\n" + text.rstrip()
+            position += len(line)
+        if pending is not None:
+            batch.append(pending)
+        yield position, batch
+
+    @staticmethod
+    def _timestamp(entry: Dict[str, Any]) -> float:
+        try:
+            return datetime.datetime.fromisoformat(entry["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+
+    def _insert(self, path: str, entries: List[Dict[str, Any]]):
+        for entry in entries:
+            cursor = self._conn.execute(
+                "INSERT INTO log_entries (file, ts, timestamp, level, source, module, pid, task_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.basename(path), entry["ts"], entry.get("timestamp"), entry.get("level"),
+                 entry.get("source"), entry.get("module"), entry.get("pid"), entry.get("task_id"))
+            )
+            self._conn.execute(
+                "INSERT INTO log_fts (rowid, message, module, exception) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, entry.get("message", ""), entry.get("module", ""), entry.get("exception"))
+            )
+
+    def _save_file(self, path: str, indexed_bytes: int, fingerprint: Optional[bytes]):
+        self._conn.execute(
+            "INSERT INTO log_files (path, indexed_bytes, fingerprint) VALUES (?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET indexed_bytes = excluded.indexed_bytes, "
+            "fingerprint = excluded.fingerprint",
+            (path, indexed_bytes, fingerprint)
+        )
+        self._conn.commit()
+
+    def _prune(self):
+        cutoff = time.time() - self.max_age_days * 86400
+        self._conn.execute(
+            "DELETE FROM log_fts WHERE rowid IN (SELECT id FROM log_entries WHERE ts < ?)", (cutoff,)
+        )
+        deleted = self._conn.execute("DELETE FROM log_entries WHERE ts < ?", (cutoff,)).rowcount
+        self._conn.commit()
+        if deleted:
+            logger.info(f"Pruned {deleted} log entries older than {self.max_age_days} days from the search index")
+
+    def search(self, text: Optional[str] = None, level: Optional[str] = None,
+               sources: Optional[List[str]] = None, log_file: Optional[str] = None,
+               start: Optional[float] = None, end: Optional[float] = None,
+               limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Search indexed log entries, newest first
+
+        While the background indexer runs, entries written since its last
+        refresh (at most ``refresh_interval`` seconds ago) are not found
+        yet; without it, the index is refreshed first.
+
+        Args:
+            text: Case-insensitive text the message, logger or traceback must contain
+            level: Only return entries with this level
+            sources: Only return entries from these sources
+            log_file: Only return entries from this log file name
+            start: Only return entries at or after this unix time
+            end: Only return entries at or before this unix time
+            limit: Page size
+            offset: Number of matching entries to skip
+
+        Returns:
+            Dict[str, Any]: ``entries``, ``limit``, ``offset`` and ``has_more``
+        """
+        if self._thread is None:
+            self.refresh()
+
+        conditions, params = [], []
+        if text:
+            if self.trigram and len(text) < 3:
+                # Trigrams cannot match shorter strings; scan instead
+                conditions.append("(f.message LIKE ? OR f.module LIKE ? OR f.exception LIKE ?)")
+                params += [f"%{text}%"] * 3
+            else:
+                conditions.append("log_fts MATCH ?")
+                params.append('"' + text.replace('"', '""') + '"')
+        if level:
+            conditions.append("e.level = ?")
+            params.append(level.upper())
+        if sources:
+            conditions.append(f"e.source IN ({', '.join('?' for _ in sources)})")
+            params += list(sources)
+        if log_file:
+            conditions.append("e.file = ?")
+            params.append(os.path.basename(log_file))
+        if start is not None:
+            conditions.append("e.ts >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("e.ts <= ?")
+            params.append(end)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = (
+            "SELECT e.*, f.message, f.exception FROM log_entries e "
+            "JOIN log_fts f ON f.rowid = e.id "
+            f"{where} ORDER BY e.ts DESC, e.id DESC LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(query, params + [limit + 1, offset]).fetchall()
+
+        entries = []
+        for row in rows[:limit]:
+            entry = {
+                "timestamp": row["timestamp"],
+                "timestamp_raw": row["timestamp"],
+                "module": row["module"],
+                "level": row["level"],
+                "message": row["message"],
+                "source": row["source"],
+                "pid": row["pid"],
+                "file": row["file"],
+            }
+            if row["task_id"]:
+                entry["task_id"] = row["task_id"]
+            if row["exception"]:
+                entry["exception"] = row["exception"]
+            entries.append(entry)
+        return {"entries": entries, "limit": limit, "offset": offset, "has_more": len(rows) > limit}
+
+
+_log_search_index: Optional[LogSearchIndex] = None
+_log_search_lock = threading.Lock()
+
+def get_log_search_index() -> LogSearchIndex:
+    global _log_search_index
+    with _log_search_lock:
+        if _log_search_index is None:
+            _log_search_index = LogSearchIndex()
+        return _log_search_index
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import os
+import glob
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Set
+
+from owl_api.services.log_manager import LOG_DIRECTORY, parse_log_line, parse_json_record, get_log_type
+
+logger = logging.getLogger(__name__)
+
+# Entry type for each source of the structured log, matching the text log types
+SOURCE_TYPES = {"api": "regular", "process_pool": "process_pool", "browser": "browser"}
+
+# Largest chunk read from one file per poll, so a burst cannot stall the event loop
+_MAX_READ_BYTES = 1024 * 1024
+
+@dataclass(slots=True)
+class LogFilter:
+    """Server-side filter for tailed log entries
+
+    Empty fields match everything.
+    """
+    levels: Set[str] = field(default_factory=set)
+    module: Optional[str] = None
+    text: Optional[str] = None
+    types: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_params(cls, level: Optional[str] = None, module: Optional[str] = None,
+                    filter_text: Optional[str] = None, types: Optional[str] = None) -> "LogFilter":
+        """Build a filter from comma-separated query parameters
+
+        Args:
+            level: Levels to include, e.g. "WARNING,ERROR"
+            module: Logger name prefix
+            filter_text: Case-insensitive text to look for
+            types: Log file types to include ("regular", "browser", "process_pool")
+
+        Returns:
+            LogFilter: The filter
+        """
+        def split(value: Optional[str]) -> Set[str]:
+            return {part.strip() for part in value.split(",") if part.strip()} if value else set()
+
+        return cls(
+            levels={level.upper() for level in split(level)},
+            module=module or None,
+            text=filter_text.lower() if filter_text else None,
+            types=split(types),
+        )
+
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        if self.types and entry["type"] not in self.types:
+            return False
+        if self.levels and entry["level"] not in self.levels:
+            return False
+        if self.module and not entry["module"].startswith(self.module):
+            return False
+        if self.text and self.text not in entry["message"].lower():
+            return False
+        return True
+
+
+class _FileFollower:
+    """Follows one log file from a byte offset and assembles entries"""
+
+    def __init__(self, path: str, offset: int):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.type = get_log_type(self.filename)
+        self.structured = path.endswith(".jsonl")
+        self.offset = offset
+        self._partial = b""
+        self._pending: Optional[Dict[str, Any]] = None
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Read whatever was appended since the last poll
+
+        The newest entry is held back until the next entry starts or a poll
+        finds no new data, so its continuation lines are included.
+
+        Returns:
+            List[Dict[str, Any]]: Completed entries
+        """
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            # Truncated, e.g. by DELETE /api/logs/clear
+            self.offset = 0
+            self._partial = b""
+            self._pending = None
+        if size == self.offset:
+            return self.flush()
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, _MAX_READ_BYTES))
+        self.offset += len(data)
+
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        entries = []
+        if self.structured:
+            # One record per line, so there is nothing to hold back
+            for raw in lines:
+                entry = parse_json_record(raw.decode("utf-8", errors="replace"))
+                if entry is not None:
+                    entry["file"] = self.filename
+                    entry["type"] = SOURCE_TYPES.get(entry["source"], "regular")
+                    entries.append(entry)
+            return entries
+        for raw in lines:
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            parsed = parse_log_line(line)
+            if parsed:
+                if self._pending is not None:
+                    entries.append(self._pending)
+                parsed["file"] = self.filename
+                parsed["type"] = self.type
+                self._pending = parsed
+            elif self._pending is not None:
+                self._pending["message"] += "\n" + line
+        return entries
+
+    def flush(self) -> List[Dict[str, Any]]:
+        if self._pending is None:
+            return []
+        entry, self._pending = self._pending, None
+        return [entry]
+
+
+class _Subscriber:
+    __slots__ = ("filter", "queue", "dropped")
+
+    def __init__(self, log_filter: LogFilter, max_queue: int):
+        self.filter = log_filter
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+
+class LogTailer:
+    """Follows the log directory and pushes new entries to subscribers
+
+    Both the structured ``.jsonl`` log and older per-process text logs are
+    followed.
+
+    A single polling task runs only while someone is subscribed. Each poll
+    stats the followed files and reads only the bytes appended since the
+    previous poll, so an idle log costs one stat per file, and each new
+    line is parsed once no matter how many clients are watching. The
+    directory is rescanned every ``rescan_interval`` seconds to pick up
+    new per-process log files and the next day's log.
+    """
+
+    def __init__(self, directory: str = LOG_DIRECTORY, poll_interval: float = 0.5,
+                 rescan_interval: float = 5.0, max_queue: int = 1000):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.max_queue = max_queue
+        self._followers: Dict[str, _FileFollower] = {}
+        self._subscribers: List[_Subscriber] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, log_filter: LogFilter) -> _Subscriber:
+        """Start receiving entries that match a filter
+
+        Args:
+            log_filter: Filter to apply
+
+        Returns:
+            _Subscriber: Subscription whose ``queue`` receives the entries
+        """
+        subscriber = _Subscriber(log_filter, self.max_queue)
+        self._subscribers.append(subscriber)
+        if self._task is None or self._task.done():
+            self._scan(start_at_end=True)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        """Stop a subscription; the polling task stops with the last one
+
+        Args:
+            subscriber: Subscription returned by subscribe()
+        """
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._followers.clear()
+
+    def _scan(self, start_at_end: bool = False):
+        paths = set(glob.glob(os.path.join(self.directory, "*.log")))
+        paths.update(glob.glob(os.path.join(self.directory, "*.jsonl")))
+        for path in list(self._followers):
+            if path not in paths:
+                del self._followers[path]
+        for path in paths - self._followers.keys():
+            try:
+                # Files that appear while tailing are new, so read them from the start
+                offset = os.path.getsize(path) if start_at_end else 0
+            except OSError:
+                continue
+            self._followers[path] = _FileFollower(path, offset)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_scan = loop.time() + self.rescan_interval
+        while self._subscribers:
+            if loop.time() >= next_scan:
+                self._scan()
+                next_scan = loop.time() + self.rescan_interval
+            for path, follower in list(self._followers.items()):
+                try:
+                    entries = follower.poll()
+                except OSError:
+                    del self._followers[path]
+                    continue
+                for entry in entries:
+                    self._dispatch(entry)
+            await asyncio.sleep(self.poll_interval)
+
+    def _dispatch(self, entry: Dict[str, Any]):
+        for subscriber in self._subscribers:
+            if not subscriber.filter.matches(entry):
+                continue
+            try:
+                subscriber.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                # A slow client loses entries rather than holding up everyone else
+                subscriber.dropped += 1
+
+
+_log_tailer: Optional[LogTailer] = None
+
+def get_log_tailer() -> LogTailer:
+    global _log_tailer
+    if _log_tailer is None:
+        _log_tailer = LogTailer()
+    return _log_tailer
@@ -14,13 +14,13 @@
 # ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
 
 import os
-import sys
-import importlib
-import inspect
+import ast
+import time
 import logging
-import re
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, Any, Tuple, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +37,35 @@ DEFAULT_MODULE_DESCRIPTIONS = {
     "run_groq": "Using groq model to process tasks",
 }
 
+# API key each model platform reads from the environment
+PLATFORM_ENV_VARS = {
+    "OPENAI": "OPENAI_API_KEY",
+    "AZURE": "AZURE_OPENAI_API_KEY",
+    "DEEPSEEK": "DEEPSEEK_API_KEY",
+    "GROQ": "GROQ_API_KEY",
+    "QWEN": "QWEN_API_KEY",
+    "ANTHROPIC": "ANTHROPIC_API_KEY",
+    "GEMINI": "GEMINI_API_KEY",
+    "MISTRAL": "MISTRAL_API_KEY",
+}
+
+@dataclass(frozen=True, slots=True)
+class ExecutionProfile:
+    """What run_owl_query needs to know to route a module, without importing it"""
+    module_name: str
+    has_construct_society: bool
+    async_construct_society: bool
+    uses_browser: bool
+    headless: Optional[bool]
+    required_env: Tuple[str, ...]
+    default_task: Optional[str]
+    platforms: Tuple[str, ...] = ()
+
+    @property
+    def visible_browser(self) -> bool:
+        """Whether construct_society creates a BrowserToolkit with headless=False"""
+        return self.uses_browser and self.headless is False
+
 def get_examples_directory() -> str:
     """Get the path to the examples directory
     
@@ -49,37 +78,238 @@ def get_examples_directory() -> str:
     
     return examples_dir
 
-def extract_docstring_description(module_path: str) -> Optional[str]:
-    """Extract description from module docstring
+def _description_of(docstring: str) -> str:
+    return docstring.strip().split('\n\n')[0].strip()
+
+def _call_name(node: ast.Call) -> Optional[str]:
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+def _env_var_name(node: ast.AST) -> Optional[str]:
+    """Name read by os.getenv("X"), os.environ.get("X") or os.environ["X"]"""
+    if isinstance(node, ast.Call) and node.args and isinstance(node.args[0], ast.Constant):
+        func = node.func
+        is_getenv = (isinstance(func, ast.Attribute) and func.attr == "getenv") or \
+            (isinstance(func, ast.Name) and func.id == "getenv")
+        is_environ_get = isinstance(func, ast.Attribute) and func.attr == "get" and \
+            isinstance(func.value, ast.Attribute) and func.value.attr == "environ"
+        if is_getenv or is_environ_get:
+            return node.args[0].value if isinstance(node.args[0].value, str) else None
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Attribute) and \
+            node.value.attr == "environ" and isinstance(node.slice, ast.Constant):
+        return node.slice.value if isinstance(node.slice.value, str) else None
+    return None
+
+def analyze_module_source(module_name: str, file_path: str) -> Dict[str, Any]:
+    """Extract module metadata from its source without importing it
+    
+    Models, platforms and toolkits are read from construct_society, like
+    the ``ModelType.X``/``ModelPlatformType.X`` references and ``...Toolkit(...)``
+    calls it contains. Required environment variables are the API keys of
+    those platforms plus every literal os.getenv/os.environ lookup in the
+    module.
     
     Args:
-        module_path: Import path to the module
+        module_name: Name of the module, e.g. "run_mini"
+        file_path: Path to the module's source file
         
     Returns:
-        Optional[str]: Description extracted from docstring, or None if no docstring is found
+        Dict[str, Any]: Module metadata
     """
-    try:
-        # Import the module
-        module = importlib.import_module(module_path)
+    with open(file_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=file_path)
+    
+    construct = next(
+        (node for node in tree.body
+         if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "construct_society"),
+        None
+    )
+    metadata: Dict[str, Any] = {
+        "name": module_name,
+        "fullpath": f"examples.{module_name}",
+        "has_construct_society": construct is not None,
+    }
+    
+    docstring = ast.get_docstring(tree) or (ast.get_docstring(construct) if construct else None)
+    metadata["description"] = docstring.strip() if docstring else DEFAULT_MODULE_DESCRIPTIONS.get(
+        module_name, f"Module for {module_name.replace('_', ' ')}"
+    )
+    metadata["summary"] = _description_of(docstring) if docstring else None
+    metadata["async_construct_society"] = isinstance(construct, ast.AsyncFunctionDef)
+    
+    env_vars = {name for name in map(_env_var_name, ast.walk(tree)) if name}
+    # Only a module-level default_task is visible to callers, as in main.__globals__
+    metadata["default_task"] = next(
+        (node.value.value for node in tree.body
+         if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant)
+         and isinstance(node.value.value, str)
+         and any(isinstance(target, ast.Name) and target.id == "default_task" for target in node.targets)),
+        None
+    )
+    if construct is None:
+        metadata["required_env"] = sorted(env_vars)
+        return metadata
+    
+    models, platforms, toolkits = set(), set(), set()
+    headless: Optional[bool] = None
+    for node in ast.walk(construct):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            if node.value.id == "ModelType":
+                models.add(node.attr)
+            elif node.value.id == "ModelPlatformType":
+                platforms.add(node.attr)
+        elif isinstance(node, ast.Call):
+            name = _call_name(node)
+            if not name or not name.endswith("Toolkit"):
+                continue
+            toolkits.add(name)
+            if name == "BrowserToolkit":
+                for keyword in node.keywords:
+                    if keyword.arg == "headless" and isinstance(keyword.value, ast.Constant):
+                        headless = bool(keyword.value.value)
+    
+    if models:
+        metadata["models"] = sorted(models)
+    if platforms:
+        metadata["platforms"] = sorted(platforms)
+    env_vars.update(PLATFORM_ENV_VARS[platform] for platform in platforms if platform in PLATFORM_ENV_VARS)
+    metadata["required_env"] = sorted(env_vars)
+    metadata["toolkits"] = sorted(toolkits)
+    metadata["uses_browser"] = "BrowserToolkit" in toolkits
+    # None when the browser is not used or headless is not a literal
+    metadata["headless"] = headless
+    return metadata
+
+
+class ModuleCatalog:
+    """Metadata of the example modules, parsed from source and cached
+    
+    Modules are never imported: each ``examples/run*.py`` is parsed with
+    ast once and re-parsed only when its mtime changes. The directory is
+    re-checked at most every ``check_interval`` seconds, so lookups in
+    between are dictionary reads. Each module also gets an
+    ExecutionProfile used to route its queries.
+    """
+    
+    def __init__(self, examples_dir: Optional[str] = None, check_interval: float = 2.0):
+        self.examples_dir = examples_dir or get_examples_directory()
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._profiles: Dict[str, ExecutionProfile] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._checked_at = 0.0
+    
+    def refresh(self, force: bool = False):
+        """Re-parse modules whose files were added or changed
         
-        # Check if the module has a docstring
-        if module.__doc__:
-            # Extract the first line or paragraph from the docstring
-            docstring = module.__doc__.strip()
-            description = docstring.split('\n\n')[0].strip()
-            return description
+        Args:
+            force: Check the directory even if it was checked recently
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if not force and now - self._checked_at < self.check_interval:
+                return
+            seen = set()
+            changed = False
+            for entry in os.scandir(self.examples_dir):
+                module_name, ext = os.path.splitext(entry.name)
+                if ext != ".py" or not (module_name == "run" or module_name.startswith("run_")):
+                    continue
+                seen.add(module_name)
+                mtime = entry.stat().st_mtime_ns
+                cached = self._entries.get(module_name)
+                if cached is not None and cached[0] == mtime:
+                    continue
+                metadata = self._analyze(module_name, entry.path)
+                self._entries[module_name] = (mtime, metadata)
+                self._profiles[module_name] = ExecutionProfile(
+                    module_name=module_name,
+                    has_construct_society=metadata["has_construct_society"],
+                    async_construct_society=metadata.get("async_construct_society", False),
+                    uses_browser=metadata.get("uses_browser", False),
+                    headless=metadata.get("headless"),
+                    required_env=tuple(metadata.get("required_env", ())),
+                    default_task=metadata.pop("default_task", None),
+                    platforms=tuple(metadata.get("platforms", ())),
+                )
+                changed = True
+            for module_name in set(self._entries) - seen:
+                del self._entries[module_name]
+                del self._profiles[module_name]
+                changed = True
+            if changed:
+                self._descriptions = {
+                    name: metadata["summary"] or DEFAULT_MODULE_DESCRIPTIONS.get(
+                        name, f"Module for {name.replace('_', ' ')}"
+                    )
+                    for name, (_, metadata) in sorted(self._entries.items())
+                }
+            self._checked_at = now
+    
+    @staticmethod
+    def _analyze(module_name: str, file_path: str) -> Dict[str, Any]:
+        try:
+            return analyze_module_source(module_name, file_path)
+        except (OSError, SyntaxError, ValueError) as e:
+            logger.error(f"Error extracting metadata from examples.{module_name}: {str(e)}")
+            return {
+                "name": module_name,
+                "fullpath": f"examples.{module_name}",
+                "has_construct_society": False,
+                "description": f"Error extracting metadata: {str(e)}",
+                "summary": None,
+            }
+    
+    def list_modules(self) -> Dict[str, str]:
+        """Get module names and one-line descriptions
+        
+        Returns:
+            Dict[str, str]: Dictionary of module names and descriptions
+        """
+        self.refresh()
+        return dict(self._descriptions)
+    
+    def get(self, module_name: str) -> Optional[Dict[str, Any]]:
+        """Get the metadata of a module
         
-        # Check if construct_society function has a docstring
-        if hasattr(module, 'construct_society') and module.construct_society.__doc__:
-            docstring = module.construct_society.__doc__.strip()
-            description = docstring.split('\n\n')[0].strip()
-            return description
+        Args:
+            module_name: Name of the module
             
-        return None
+        Returns:
+            Optional[Dict[str, Any]]: Module metadata, or None if there is no such module
+        """
+        self.refresh()
+        cached = self._entries.get(module_name)
+        return dict(cached[1]) if cached else None
+    
+    def profile(self, module_name: str) -> Optional[ExecutionProfile]:
+        """Get the execution profile of a module
         
-    except Exception as e:
-        logger.error(f"Error extracting docstring from {module_path}: {str(e)}")
-        return None
+        Args:
+            module_name: Name of the module
+            
+        Returns:
+            Optional[ExecutionProfile]: The profile, or None if there is no such module
+        """
+        self.refresh()
+        return self._profiles.get(module_name)
+
+
+_module_catalog: Optional[ModuleCatalog] = None
+_module_catalog_lock = threading.Lock()
+
+def get_module_catalog() -> ModuleCatalog:
+    global _module_catalog
+    with _module_catalog_lock:
+        if _module_catalog is None:
+            _module_catalog = ModuleCatalog()
+        return _module_catalog
 
 def discover_modules() -> Dict[str, str]:
     """Discover available modules in examples directory
@@ -88,92 +318,22 @@ def discover_modules() -> Dict[str, str]:
         Dict[str, str]: Dictionary of module names and descriptions
     """
     try:
-        examples_dir = get_examples_directory()
-        modules = {}
-        
-        # Find all Python files in the examples directory
-        for filename in os.listdir(examples_dir):
-            if filename.endswith('.py') and filename != '__init__.py':
-                module_name = filename[:-3]  # Remove .py extension
-                
-                # Skip if module does not match run_* or run pattern
-                if not (module_name == 'run' or module_name.startswith('run_')):
-                    continue
-                    
-                # Try to get description from docstring
-                module_path = f"examples.{module_name}"
-                description = extract_docstring_description(module_path)
-                
-                # If no docstring description, use default description or generic one
-                if not description:
-                    description = DEFAULT_MODULE_DESCRIPTIONS.get(
-                        module_name, f"Module for {module_name.replace('_', ' ')}"
-                    )
-                    
-                modules[module_name] = description
-        
-        return modules
-        
+        return get_module_catalog().list_modules()
     except Exception as e:
         logger.error(f"Error discovering modules: {str(e)}")
         # Fall back to default module descriptions
         return DEFAULT_MODULE_DESCRIPTIONS
 
-def extract_module_metadata(module_path: str) -> Dict[str, Any]:
-    """Extract metadata from a module
+def get_execution_profile(module_name: str) -> Optional[ExecutionProfile]:
+    """Get the execution profile run_owl_query routes a module by
     
     Args:
-        module_path: Import path to the module
+        module_name: Name of the module
         
     Returns:
-        Dict[str, Any]: Module metadata
+        Optional[ExecutionProfile]: The profile, or None if there is no such module
     """
-    try:
-        # Import the module
-        module = importlib.import_module(module_path)
-        
-        # Basic metadata
-        metadata = {
-            "name": module_path.split('.')[-1],
-            "fullpath": module_path,
-            "has_construct_society": hasattr(module, 'construct_society'),
-        }
-        
-        # Description from docstring
-        if module.__doc__:
-            metadata["description"] = module.__doc__.strip()
-        elif hasattr(module, 'construct_society') and module.construct_society.__doc__:
-            metadata["description"] = module.construct_society.__doc__.strip()
-        else:
-            metadata["description"] = DEFAULT_MODULE_DESCRIPTIONS.get(
-                metadata["name"], f"Module for {metadata['name'].replace('_', ' ')}"
-            )
-            
-        # Check for model information in construct_society function
-        if hasattr(module, 'construct_society'):
-            func = module.construct_society
-            source = inspect.getsource(func)
-            
-            # Extract model information using regex
-            model_matches = re.findall(r"ModelType\.([A-Z0-9_]+)", source)
-            if model_matches:
-                metadata["models"] = list(set(model_matches))
-                
-            # Extract platform information
-            platform_matches = re.findall(r"ModelPlatformType\.([A-Z0-9_]+)", source)
-            if platform_matches:
-                metadata["platforms"] = list(set(platform_matches))
-                
-        return metadata
-        
-    except Exception as e:
-        logger.error(f"Error extracting metadata from {module_path}: {str(e)}")
-        return {
-            "name": module_path.split('.')[-1],
-            "fullpath": module_path,
-            "has_construct_society": False,
-            "description": f"Error extracting metadata: {str(e)}"
-        }
+    return get_module_catalog().profile(module_name)
 
 def get_module_info(module_name: str) -> Dict[str, Any]:
     """Get detailed information about a specific module
@@ -184,8 +344,15 @@ def get_module_info(module_name: str) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Detailed module information
     """
-    module_path = f"examples.{module_name}"
-    return extract_module_metadata(module_path)
+    metadata = get_module_catalog().get(module_name)
+    if metadata is None:
+        return {
+            "name": module_name,
+            "fullpath": f"examples.{module_name}",
+            "has_construct_society": False,
+            "description": f"Module {module_name} not found"
+        }
+    return metadata
 
 def get_available_modules() -> Dict[str, str]:
     """Get a dictionary of available modules and their descriptions
@@ -193,4 +360,4 @@ def get_available_modules() -> Dict[str, str]:
     Returns:
         Dict[str, str]: Dictionary of module names and descriptions
     """
-    return discover_modules()
\ No newline at end of file
+    return discover_modules()
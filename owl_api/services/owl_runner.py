@@ -22,92 +22,54 @@ import threading
 import time
 import inspect
 import queue
+import functools
+import multiprocessing
 from typing import Dict, Tuple, Any, Optional, Callable
 
-from dotenv import load_dotenv
-from owl.utils import run_society
+from owl_api.services.task_store import get_task_store
+from owl_api.services.task_journal import TaskJournal
+from owl_api.services.module_manager import get_execution_profile
+from owl_api.services.capabilities import get_capabilities
+from owl_api.services.log_manager import LOG_DIRECTORY
+from owl_api.services.result_collector import get_result_collector
 
 logger = logging.getLogger(__name__)
 
-# Task tracking dictionary for async operations
-TASK_REGISTRY: Dict[str, Dict[str, Any]] = {}
+# Task store shared by the routers, the WebSocket handler and both process pools
+task_store = get_task_store()
 
-# Process synchronization utilities
-def save_registry_snapshot():
-    """Save current task registry to disk as backup for recovery"""
-    import json
-    import os
-    try:
-        # Ensure logs directory exists
-        log_dir = "/Users/smill/code/owl/logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir, exist_ok=True)
-            
-        # Create serializable copy of registry (some objects may not be JSON serializable)
-        serializable_registry = {}
-        for task_id, task_data in TASK_REGISTRY.items():
-            try:
-                # Create shallow copy and remove potentially non-serializable elements
-                safe_task = task_data.copy()
-                for key in list(safe_task.keys()):
-                    if not isinstance(safe_task[key], (str, int, float, bool, list, dict, type(None))):
-                        safe_task[key] = str(safe_task[key])
-                serializable_registry[task_id] = safe_task
-            except Exception as e:
-                print(f"Error serializing task {task_id}: {str(e)}")
-                
-        # Save to file with timestamp
-        import time
-        snapshot_path = os.path.join(log_dir, f"registry_snapshot.json")
-        with open(snapshot_path, 'w') as f:
-            json.dump(serializable_registry, f)
-            
-        # Log success
-        print(f"Task registry snapshot saved to {snapshot_path} with {len(serializable_registry)} tasks")
-    except Exception as e:
-        print(f"Error saving registry snapshot: {str(e)}")
+# Task persistence: every change is appended to a journal, which is replayed at startup
+TASK_JOURNAL_PATH = os.path.join(LOG_DIRECTORY, "task_journal.jsonl")
+JOURNAL_COMPACTION_INTERVAL = 60
+
+task_journal = TaskJournal(TASK_JOURNAL_PATH)
 
-def load_registry_snapshot():
-    """Load task registry from disk if available"""
-    import json
-    import os
+def load_task_journal():
+    """Rebuild the task store from the journal and start journaling changes"""
     try:
-        # Check if snapshot file exists
-        log_dir = "/Users/smill/code/owl/logs"
-        snapshot_path = os.path.join(log_dir, f"registry_snapshot.json")
-        if not os.path.exists(snapshot_path):
-            print("No registry snapshot found")
-            return
-            
-        # Load from file
-        with open(snapshot_path, 'r') as f:
-            loaded_registry = json.load(f)
-            
-        # Only use if current registry is empty
-        if not TASK_REGISTRY and loaded_registry:
-            print(f"Loading {len(loaded_registry)} tasks from snapshot")
-            TASK_REGISTRY.update(loaded_registry)
-            print(f"Registry now has {len(TASK_REGISTRY)} tasks")
+        tasks = task_journal.replay()
+        if tasks and not len(task_store):
+            task_store.load(tasks)
+            logger.info(f"Recovered {len(task_store)} tasks from {TASK_JOURNAL_PATH}")
     except Exception as e:
-        print(f"Error loading registry snapshot: {str(e)}")
+        logger.error(f"Error replaying task journal: {str(e)}")
+    task_store.attach_journal(task_journal)
 
-# Try to load backup registry at module import time
-load_registry_snapshot()
-
-# Set up automatic snapshot saving
-import threading
-import time
-
-def registry_snapshot_thread():
-    """Thread function to periodically save registry snapshots"""
+def journal_compaction_thread():
+    """Thread function to periodically compact the task journal"""
     while True:
-        time.sleep(10)  # Save every 10 seconds
-        if TASK_REGISTRY:  # Only save if not empty
-            save_registry_snapshot()
+        time.sleep(JOURNAL_COMPACTION_INTERVAL)
+        try:
+            task_store.compact_journal()
+        except Exception as e:
+            logger.error(f"Error compacting task journal: {str(e)}")
+
+# Recover tasks at module import time; pool workers import this module too but keep no tasks
+if multiprocessing.parent_process() is None:
+    load_task_journal()
 
-# Start snapshot thread
-snapshot_thread = threading.Thread(target=registry_snapshot_thread, daemon=True)
-snapshot_thread.start()
+    compaction_thread = threading.Thread(target=journal_compaction_thread, daemon=True)
+    compaction_thread.start()
 
 def validate_input(question: str) -> bool:
     """Validate if user input is valid
@@ -123,42 +85,24 @@ def validate_input(question: str) -> bool:
         return False
     return True
 
-def load_module(module_name: str) -> Tuple[bool, Any, str]:
-    """Dynamically load a module from examples directory
+def uses_browser_pool(module_name: str) -> bool:
+    """Whether run_owl_query sends a module's queries to the browser pool
+    
+    Visible browsers run in the browser pool, everything else in the
+    regular pool.
     
     Args:
-        module_name: Name of the module to import
+        module_name: Example module name
         
     Returns:
-        Tuple[bool, Any, str]: Success flag, module object if successful, error message if failed
+        bool: True for the browser pool, False for the regular pool
     """
-    # Ensure environment variables are loaded
-    load_dotenv()
-    
-    try:
-        # Dynamically import target module
-        module_path = f"examples.{module_name}"
-        logger.info(f"Importing module: {module_path}")
-        module = importlib.import_module(module_path)
-
-        # Check if it contains the construct_society function
-        if not hasattr(module, "construct_society"):
-            error_msg = f"construct_society function not found in module {module_path}"
-            logger.error(error_msg)
-            return False, None, error_msg
-        
-        return True, module, ""
-        
-    except ImportError as ie:
-        error_msg = f"Unable to import module {module_name}: {str(ie)}"
-        logger.error(error_msg)
-        return False, None, error_msg
-    except Exception as e:
-        error_msg = f"Error occurred while importing module {module_name}: {str(e)}"
-        logger.error(error_msg)
-        return False, None, error_msg
+    if module_name in ("run_mini", "run_test_browser"):
+        return True
+    profile = get_execution_profile(module_name)
+    return profile is not None and profile.visible_browser
 
-def run_owl_query(task_id: str, question: str, module_name: str = "run", task_registry: Dict = None) -> None:
+def run_owl_query(task_id: str, question: str, module_name: str = "run") -> None:
     """Run a query through the OWL system
     
     This function is designed to be run asynchronously in a background task.
@@ -167,52 +111,55 @@ def run_owl_query(task_id: str, question: str, module_name: str = "run", task_re
         task_id: Unique identifier for the task
         question: User question
         module_name: Example module name to import
-        task_registry: Dictionary to store task status and results
     """
-    # Use global registry to ensure consistency across all processes
-    registry = TASK_REGISTRY
-    
-    # Log debug info about registry usage
-    logger.info(f"run_owl_query using global registry ID={id(TASK_REGISTRY)}")
-    if task_registry is not None and task_registry is not TASK_REGISTRY:
-        logger.warning(f"Ignoring passed registry ID={id(task_registry)} in favor of global registry")
-        # Copy any existing task data to ensure we don't lose information
-        if task_id in task_registry and task_id not in TASK_REGISTRY:
-            TASK_REGISTRY[task_id] = task_registry[task_id]
-            logger.info(f"Copied task {task_id} data from passed registry to global registry")
-    
     try:
+        # Cancelled before the background task got to it; create() would revive it
+        if task_store.get_status(task_id) == "cancelled":
+            logger.info(f"Task {task_id} was cancelled before it started")
+            return
+        
         # Initialize task status
-        registry[task_id] = {
-            "status": "processing",
-            "query": question, 
-            "module": module_name
-        }
+        task_store.create(task_id, question, module_name)
         
         # Validate input
         if not validate_input(question):
-            registry[task_id].update({
+            task_store.update(task_id, {
                 "status": "error",
                 "error": "Invalid input question"
             })
             return
         
-        # First, check if the module contains browser operations
-        success, module, error_msg = load_module(module_name)
-        if not success:
-            registry[task_id].update({
+        # Route by the module's static profile; the module itself is only imported by the worker
+        profile = get_execution_profile(module_name)
+        if profile is None or not profile.has_construct_society:
+            error_msg = (f"Module {module_name} not found" if profile is None
+                         else f"construct_society function not found in module examples.{module_name}")
+            logger.error(error_msg)
+            task_store.update(task_id, {
+                "status": "error",
+                "error": error_msg
+            })
+            return
+        if profile.async_construct_society:
+            error_msg = f"Module {module_name} has an async construct_society, which the API cannot run yet"
+            logger.error(error_msg)
+            task_store.update(task_id, {
                 "status": "error",
                 "error": error_msg
             })
             return
+        missing_env = [name for name in profile.required_env if not os.environ.get(name)]
+        if missing_env:
+            # Workers load owl/.env themselves, so this is only a hint
+            logger.info(f"Module {module_name} reads {', '.join(missing_env)}, not set in the API process")
         
         # Check if the module has a main() function with a default_task
         # If so, use that instead of the user's query for browser modules
         actual_query = question
         is_browser_module = "browser" in module_name.lower() or module_name == "run_mini"
         
-        if hasattr(module, "main") and hasattr(module.main, "__globals__") and "default_task" in module.main.__globals__:
-            default_task = module.main.__globals__["default_task"]
+        if profile.default_task is not None:
+            default_task = profile.default_task
             logger.info(f"Module {module_name} has default_task: {default_task[:50]}...")
             
             # Only use default_task for browser-related modules if user's query doesn't contain browser keywords
@@ -238,109 +185,40 @@ def run_owl_query(task_id: str, question: str, module_name: str = "run", task_re
                     logger.info(f"Using default_task instead of user query for browser module")
                     actual_query = default_task
         
-        # Check if the module uses BrowserToolkit with headless=False
-        needs_process_pool = _module_uses_visible_browser(module)
-        logger.info(f"Module {module_name} needs process pool: {needs_process_pool}")
+        needs_browser_pool = uses_browser_pool(module_name)
+        logger.info(f"Module {module_name} needs browser pool: {needs_browser_pool}")
         
-        # For run_mini module, always use process pool since we know it uses visible browser
-        if module_name == "run_mini":
-            logger.info("Forcing run_mini to use process pool as it's known to use visible browser")
-            needs_process_pool = True
-        
-        if needs_process_pool:
-            # Run in separate process for browser operations
-            logger.info(f"Using process pool for task {task_id} with module {module_name}")
+        if needs_browser_pool:
+            logger.info(f"Using browser process pool for task {task_id} with module {module_name}")
             logger.info(f"Using query: {actual_query[:50]}...")
-            registry[task_id]["browser_mode"] = "visible"  # Add info to registry for frontend
-            _run_in_process_pool(task_id, actual_query, module_name, registry)
+            task_store.update(task_id, {"browser_mode": "visible"})  # Add info to registry for frontend
         else:
-            # Run normally for non-browser operations
-            logger.info(f"Using current process for task {task_id} with module {module_name}")
-            registry[task_id]["browser_mode"] = "headless"  # Add info to registry for frontend
-            _run_in_current_process(task_id, actual_query, module, registry)
+            logger.info(f"Using process pool for task {task_id} with module {module_name}")
+            task_store.update(task_id, {"browser_mode": "headless"})  # Add info to registry for frontend
+        _run_in_process_pool(task_id, actual_query, module_name, needs_browser_pool)
             
     except Exception as e:
         error_msg = f"Uncaught error processing task: {str(e)}"
         logger.error(f"{error_msg}\n{traceback.format_exc()}")
-        registry[task_id].update({
+        task_store.update(task_id, {
             "status": "error",
             "error": error_msg
         })
 
-def _module_uses_visible_browser(module) -> bool:
-    """Check if a module uses BrowserToolkit with headless=False"""
-    # Examine the module source code
-    try:
-        source = inspect.getsource(module.construct_society)
-        
-        # Log the source code for debugging
-        logger.info(f"Module source code for detection:\n{source[:200]}...")
-        
-        has_browser_toolkit = "BrowserToolkit" in source
-        has_headless_false = "headless=False" in source
-        
-        logger.info(f"Module {module.__name__} detection:")
-        logger.info(f"  - Has BrowserToolkit: {has_browser_toolkit}")
-        logger.info(f"  - Has headless=False: {has_headless_false}")
-        
-        # Special handling for test modules
-        if module.__name__ == "examples.run_test_browser":
-            logger.info("Detected test browser module - forcing process pool usage")
-            return True
-            
-        result = has_browser_toolkit and has_headless_false
-        logger.info(f"Module {module.__name__} uses visible browser: {result}")
-        return result
-    except Exception as e:
-        logger.error(f"Could not determine if module uses visible browser: {str(e)}")
-        logger.error(f"Exception details: {traceback.format_exc()}")
-        # If we can't determine, assume it might need process pool
-        return True
-
-def _run_in_current_process(task_id: str, question: str, module, registry: Dict):
-    """Run the query in the current process (for non-browser operations)"""
+def _run_in_process_pool(task_id: str, question: str, module_name: str, use_browser_pool: bool):
+    """Run the query in a separate process via the browser or the regular process pool"""
     try:
-        # Build society simulation
-        logger.info("Building society simulation...")
-        society = module.construct_society(question)
-        
-        # Run society simulation
-        logger.info("Running society simulation...")
-        answer, chat_history, token_info = run_society(society)
-        logger.info("Society simulation completed")
-        
-        # Update task with results
-        registry[task_id].update({
-            "status": "completed",
-            "result": {
-                "answer": answer,
-                "chat_history": chat_history,
-                "token_info": token_info
-            }
-        })
-    except Exception as e:
-        error_msg = f"Error in current process: {str(e)}"
-        logger.error(f"{error_msg}\n{traceback.format_exc()}")
-        registry[task_id].update({
-            "status": "error",
-            "error": error_msg
-        })
-
-def _run_in_process_pool(task_id: str, question: str, module_name: str, registry: Dict):
-    """Run the query in a separate process via the process pool"""
-    try:
-        # First check if we should use the specialized browser process pool
-        use_browser_pool = module_name == "run_mini" or module_name == "run_test_browser" or "browser" in module_name.lower()
-        
         # Update registry with processing info
-        registry[task_id].update({
+        # browser_pool is set before submitting so cancel_task() knows which pool to ask
+        task_store.update(task_id, {
             "process_status": "submitting",
             "module_name": module_name,
+            "browser_pool": use_browser_pool,
         })
         
         if use_browser_pool:
             # Use the specialized browser process pool for browser operations
-            from .process_pool import get_browser_process_pool
+            from .process_pool import get_browser_process_pool, PoolSaturatedError
             browser_pool = get_browser_process_pool()
             
             # Log the browser pool operation
@@ -348,124 +226,180 @@ def _run_in_process_pool(task_id: str, question: str, module_name: str, registry
             logger.info(f"Question: {question[:100]}...")
             
             # Submit task to browser process pool - this will be processed asynchronously
-            browser_pool.submit_task(task_id, question, module_name, registry)
+            try:
+                browser_pool.submit_task(task_id, question, module_name)
+            except PoolSaturatedError as e:
+                logger.warning(f"Rejecting task {task_id}: {str(e)}")
+                task_store.update(task_id, {
+                    "status": "error",
+                    "error": "The server is busy, please try again shortly.",
+                    "process_status": "rejected",
+                })
+                return
+            if task_store.get_status(task_id) == "cancelled":
+                # Cancelled while it was being submitted
+                browser_pool.cancel_task(task_id)
+                return
             
-            # Update registry
-            registry[task_id].update({
-                "process_status": "running",
-                "submitted_at": time.time(),
-                "browser_pool": True
+            # The pool sets process_status to queued or submitted, and the worker to processing
+            task_store.update(task_id, {
+                "submitted_at": time.time()
             })
             
             logger.info(f"Task {task_id} submitted to browser process pool")
         else:
             # Use the regular process pool for non-browser operations
-            from .process_pool import get_process_pool
+            from .process_pool import get_process_pool, PoolSaturatedError
             pool = get_process_pool()
             
             # Log the process pool operation for debugging
             logger.info(f"Submitting task {task_id} to regular process pool with module {module_name}")
             logger.info(f"Question: {question[:100]}...")
             
+            # Registered first: a fast worker can deliver the result before submit_task returns
+            _watch_process_result(task_id)
+            
             # Submit task to process pool
-            result_queue = pool.submit_task(
-                task_id,
-                _execute_owl_in_process,
-                (question, module_name)
-            )
+            try:
+                pool.submit_task(
+                    task_id,
+                    _execute_owl_in_process,
+                    (question, module_name),
+                    functools.partial(_on_process_result, task_id)
+                )
+            except PoolSaturatedError as e:
+                _awaiting_results.pop(task_id, None)
+                logger.warning(f"Rejecting task {task_id}: {str(e)}")
+                task_store.update(task_id, {
+                    "status": "error",
+                    "error": "The server is busy, please try again shortly.",
+                    "process_status": "rejected",
+                })
+                return
             
-            # Update registry
-            registry[task_id].update({
-                "process_status": "running",
-                "submitted_at": time.time(),
-                "browser_pool": False
-            })
+            if task_store.get_status(task_id) == "cancelled":
+                # Cancelled while it was being submitted
+                pool.terminate_task(task_id)
             
-            # Start a thread to monitor the result queue
-            monitoring_thread = threading.Thread(
-                target=_monitor_process_result,
-                args=(result_queue, task_id, registry),
-                daemon=True
-            )
-            monitoring_thread.start()
+            # The pool sets process_status to queued or running
+            task_store.update(task_id, {
+                "submitted_at": time.time()
+            })
             
-            logger.info(f"Started monitoring thread for task {task_id}")
+            logger.info(f"Task {task_id} submitted to process pool")
         
     except Exception as e:
         error_msg = f"Error submitting to process pool: {str(e)}"
         logger.error(f"{error_msg}\n{traceback.format_exc()}")
-        registry[task_id].update({
+        task_store.update(task_id, {
             "status": "error",
             "error": error_msg,
             "process_status": "failed",
         })
 
-def _monitor_process_result(result_queue, task_id: str, registry: Dict):
-    """Monitor the result queue from a process and update the task registry"""
+def cancel_owl_task(task_id: str, reason: str = "cancelled by user") -> bool:
+    """Cancel a task and stop the society running it
+    
+    The task is marked cancelled if it is still processing, and the pool it
+    was submitted to is asked to stop it: run_society stops at its next
+    round or tool call, and a worker that does not stop in time is
+    terminated.
+    
+    Args:
+        task_id: Task identifier
+        reason: Why the task was cancelled, stored on the task
+        
+    Returns:
+        bool: Whether the task was cancelled; False if it had already finished
+    """
+    if not task_store.transition(task_id, "cancelled", ("processing",), {
+        "cancel_reason": reason,
+        "cancelled_at": time.time(),
+    }):
+        return False
+    
+    # Not submitted yet: run_owl_query and _run_in_process_pool check the status themselves
+    browser_pool = (task_store.get(task_id) or {}).get("browser_pool")
+    try:
+        if browser_pool is True:
+            from .process_pool import get_browser_process_pool
+            get_browser_process_pool().cancel_task(task_id)
+        elif browser_pool is False:
+            from .process_pool import get_process_pool
+            get_process_pool().terminate_task(task_id)
+    except Exception as e:
+        logger.error(f"Error stopping cancelled task {task_id}: {str(e)}")
+    logger.info(f"Task {task_id} cancelled ({reason})")
+    return True
+
+# Tasks in the regular pool whose result has not arrived -> time monitoring started
+_awaiting_results: Dict[str, float] = {}
+RESULT_HEARTBEAT_INTERVAL = 30  # seconds
+RESULT_MAX_WAIT = 3600  # seconds
+
+def _watch_process_result(task_id: str):
+    """Start heartbeats and the timeout for a task whose result comes from the process pool"""
     logger.info(f"Starting to monitor process result for task {task_id}")
+    _awaiting_results[task_id] = time.time()
     
     # Update registry with monitoring status
-    if task_id in registry:
-        registry[task_id].update({
+    if task_id in task_store:
+        task_store.update(task_id, {
             "monitor_status": "waiting_for_result",
             "monitor_started_at": time.time(),
         })
+    get_result_collector().call_later(RESULT_HEARTBEAT_INTERVAL, _result_heartbeat, task_id)
+
+def _result_heartbeat(task_id: str):
+    """Result collector timer recording that a task is still running, or timing it out"""
+    start_time = _awaiting_results.get(task_id)
+    if start_time is None:
+        return
+    
+    # No result yet, check if we've exceeded the max wait time
+    elapsed_time = time.time() - start_time
+    if elapsed_time >= RESULT_MAX_WAIT:
+        _awaiting_results.pop(task_id, None)
+        logger.error(f"Timeout waiting for result from process for task {task_id}")
+        
+        # Instead of raising an exception, set error status and return a helpful message
+        task_store.update(task_id, {
+            "status": "error",
+            "process_status": "timeout",
+            "monitor_status": "timeout",
+            "completed_at": time.time(),
+            "error": f"Browser process timeout after {elapsed_time:.1f}s. The browser may be stuck or not responding.",
+            "result": {
+                "answer": "The browser operation timed out after running for too long. This could be due to a slow website, network issues, or the browser getting stuck. You may want to try again with a simpler request.",
+                "chat_history": [],
+                "token_info": {}
+            }
+        })
+        logger.info(f"Task {task_id} marked as error due to timeout")
+        return
+    
+    # Log a heartbeat and continue waiting
+    if elapsed_time % 60 < RESULT_HEARTBEAT_INTERVAL:  # Log approximately every minute
+        logger.info(f"Still waiting for process to complete task {task_id} "
+                  f"(elapsed: {elapsed_time:.1f}s, max: {RESULT_MAX_WAIT}s)")
+    
+    # Update registry with heartbeat
+    task_store.update(task_id, {
+        "monitor_status": "waiting_for_result",
+        "monitor_last_heartbeat": time.time(),
+        "monitor_elapsed_time": elapsed_time,
+        "percent_complete": min(int(elapsed_time / RESULT_MAX_WAIT * 100), 99)  # Never show 100% until done
+    }, event_type="heartbeat")
+    get_result_collector().call_later(RESULT_HEARTBEAT_INTERVAL, _result_heartbeat, task_id)
+
+def _on_process_result(task_id: str, result_type: str, result_data: Any):
+    """Record the result the process pool delivered for a task"""
+    if _awaiting_results.pop(task_id, None) is None:
+        logger.warning(f"Ignoring result for task {task_id}: it already has one or timed out")
+        return
+    logger.info(f"Received result from process for task {task_id}: {result_type}")
     
     try:
-        # Set a timeout for getting the result
-        # This helps us debug if the process is stuck or not responding
-        logger.info(f"Waiting for process to return result for task {task_id}...")
-        
-        # Monitor with heartbeats to detect stalled processes
-        start_time = time.time()
-        heartbeat_interval = 300  # 5 minutes
-        max_wait_time = 3600      # 1 hour timeout
-        
-        while True:
-            try:
-                # Try to get result with a shorter timeout to allow heartbeats
-                result_type, result_data = result_queue.get(block=True, timeout=heartbeat_interval)
-                logger.info(f"Received result from process for task {task_id}: {result_type}")
-                
-                # We got a result, break the loop
-                break
-            except queue.Empty:
-                # No result yet, check if we've exceeded the max wait time
-                elapsed_time = time.time() - start_time
-                if elapsed_time >= max_wait_time:
-                    logger.error(f"Timeout waiting for result from process for task {task_id}")
-                    
-                    # Instead of raising an exception, set error status and return a helpful message
-                    registry[task_id].update({
-                        "status": "error",
-                        "process_status": "timeout",
-                        "monitor_status": "timeout",
-                        "completed_at": time.time(),
-                        "error": f"Browser process timeout after {elapsed_time:.1f}s. The browser may be stuck or not responding.",
-                        "result": {
-                            "answer": "The browser operation timed out after running for too long. This could be due to a slow website, network issues, or the browser getting stuck. You may want to try again with a simpler request.",
-                            "chat_history": [],
-                            "token_info": {}
-                        }
-                    })
-                    logger.info(f"Task {task_id} marked as error due to timeout")
-                    
-                    # Break the loop to stop waiting
-                    break
-                
-                # Log a heartbeat and continue waiting
-                if elapsed_time % 60 < 1:  # Log approximately every minute
-                    logger.info(f"Still waiting for process to complete task {task_id} "
-                              f"(elapsed: {elapsed_time:.1f}s, max: {max_wait_time}s)")
-                
-                # Update registry with heartbeat
-                registry[task_id].update({
-                    "monitor_status": "waiting_for_result",
-                    "monitor_last_heartbeat": time.time(),
-                    "monitor_elapsed_time": elapsed_time,
-                    "percent_complete": min(int(elapsed_time / max_wait_time * 100), 99)  # Never show 100% until done
-                })
-        
         # Process the result
         if result_type == "success":
             # Successful execution
@@ -493,7 +427,7 @@ def _monitor_process_result(result_queue, task_id: str, registry: Dict):
                 
                 logger.info(f"Success result for task {task_id}: answer length={len(answer) if answer else 0}")
                 
-                registry[task_id].update({
+                task_store.update(task_id, {
                     "status": "completed",
                     "process_status": "completed",
                     "monitor_status": "result_processed",
@@ -516,7 +450,7 @@ def _monitor_process_result(result_queue, task_id: str, registry: Dict):
                     if len(result_data) > 0 and result_data[0] is not None:
                         answer = str(result_data[0])
                 
-                registry[task_id].update({
+                task_store.update(task_id, {
                     "status": "completed",  # Still mark as completed, just with error message
                     "process_status": "completed_with_errors",
                     "monitor_status": "result_processing_error",
@@ -541,7 +475,7 @@ def _monitor_process_result(result_queue, task_id: str, registry: Dict):
                 elif "pickling" in error_msg.lower():
                     user_friendly_error = "Internal serialization error in browser process."
                 
-                registry[task_id].update({
+                task_store.update(task_id, {
                     "status": "error",
                     "process_status": "failed",
                     "monitor_status": "process_reported_error",
@@ -552,7 +486,7 @@ def _monitor_process_result(result_queue, task_id: str, registry: Dict):
             except Exception as error_unpacking_error:
                 # Error handling error data
                 logger.error(f"Error unpacking error data for task {task_id}: {str(error_unpacking_error)}")
-                registry[task_id].update({
+                task_store.update(task_id, {
                     "status": "error",
                     "process_status": "failed",
                     "monitor_status": "error_processing_error",
@@ -563,7 +497,7 @@ def _monitor_process_result(result_queue, task_id: str, registry: Dict):
     except Exception as e:
         error_msg = f"Error monitoring process result: {str(e)}"
         logger.error(f"{error_msg}\n{traceback.format_exc()}")
-        registry[task_id].update({
+        task_store.update(task_id, {
             "status": "error",
             "process_status": "monitor_failed",
             "monitor_status": "exception",
@@ -598,49 +532,9 @@ def _execute_owl_in_process(question: str, module_name: str):
     except ImportError:
         print("Greenlet not available, skipping thread patching")
     
-    # Create a log file specific to this process with proper directory check
-    log_dir = "/Users/smill/code/owl/logs"
-    try:
-        # Ensure directory exists and is writable
-        if not os.path.isdir(log_dir):
-            os.makedirs(log_dir, exist_ok=True)
-            print(f"Created log directory: {log_dir}")
-        
-        # Verify write permissions by testing with a small write
-        test_file = os.path.join(log_dir, f"test_write_{os.getpid()}.txt")
-        with open(test_file, 'w') as f:
-            f.write("Testing write permissions")
-        if os.path.exists(test_file):
-            os.remove(test_file)
-            print("Verified write permissions")
-            
-        process_log_file = os.path.join(log_dir, f"browser_process_{os.getpid()}.log")
-        
-        # Set up logging to both console and file
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            handlers=[
-                logging.FileHandler(process_log_file),
-                logging.StreamHandler()
-            ]
-        )
-        print(f"Logging to {process_log_file}")
-    except Exception as e:
-        print(f"Error setting up logging: {str(e)}")
-        print(f"Exception details: {traceback.format_exc()}")
-        process_log_file = None
-        # Fall back to console-only logging
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            handlers=[
-                logging.StreamHandler()
-            ]
-        )
+    # Pool workers send their logging to the API's structured log listener
     logger = logging.getLogger("owl_process")
     logger.info(f"======= BROWSER PROCESS STARTED (PID: {os.getpid()}) =======")
-    logger.info(f"Process log file: {process_log_file}")
     logger.info(f"Question: {question}")
     logger.info(f"Module name: {module_name}")
     logger.info(f"Platform: {platform.platform()}")
@@ -655,136 +549,14 @@ def _execute_owl_in_process(question: str, module_name: str):
         
         logger.info(f"Python path: {sys.path}")
         
-        # Setup environment variables
-        from dotenv import load_dotenv
-        logger.info("Loading environment variables")
-        load_dotenv()
-        
-        # Check for Chrome installation first
-        browser_available = False
-        browser_executable = None
-        browser_paths = [
-            # Chrome paths
-            "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",  # macOS
-            "/Applications/Google Chrome.app/Contents/MacOS/chrome",  # Alternative macOS path
-            "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",     # Windows
-            "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
-            "/usr/bin/google-chrome",                                        # Linux
-            "/usr/bin/chromium-browser",
-            # Firefox paths
-            "/Applications/Firefox.app/Contents/MacOS/firefox",  # macOS
-            "C:\\Program Files\\Mozilla Firefox\\firefox.exe",  # Windows
-            "/usr/bin/firefox",  # Linux
-            # Safari path (macOS only)
-            "/Applications/Safari.app/Contents/MacOS/Safari",  # macOS
-        ]
-        
-        # Log which browsers we're checking for
-        logger.info("Checking for browsers at the following paths:")
-        for path in browser_paths:
-            exists = os.path.exists(path)
-            executable = os.access(path, os.X_OK) if exists else False
-            logger.info(f" - {path} (exists: {exists}, executable: {executable})")
-            
-        # Check if any browser exists and is executable
-        for browser_path in browser_paths:
-            if os.path.exists(browser_path) and os.access(browser_path, os.X_OK):
-                browser_available = True
-                browser_executable = browser_path
-                logger.info(f"Found browser executable: {browser_path}")
-                
-                # Get browser name
-                browser_name = "Unknown"
-                if "Chrome" in browser_path or "chrome" in browser_path:
-                    browser_name = "Chrome"
-                elif "Firefox" in browser_path or "firefox" in browser_path:
-                    browser_name = "Firefox"
-                elif "Safari" in browser_path:
-                    browser_name = "Safari"
-                    
-                logger.info(f"Detected browser: {browser_name}")
-                print(f"Found browser: {browser_name} at {browser_path}")
-                break
-        
-        if not browser_available:
-            if platform.system() == "Darwin":  # macOS
-                logger.warning("No browser found at expected locations on macOS.")
-                import subprocess
-                
-                # Try to find browsers using mdfind
-                browsers_to_check = [
-                    ("Chrome", "com.google.Chrome"),
-                    ("Firefox", "org.mozilla.firefox"),
-                    ("Safari", "com.apple.Safari"),
-                ]
-                
-                for browser_name, bundle_id in browsers_to_check:
-                    try:
-                        logger.info(f"Checking for {browser_name} using mdfind...")
-                        result = subprocess.run(["mdfind", f"kMDItemCFBundleIdentifier == '{bundle_id}'"], 
-                                              capture_output=True, text=True, timeout=5)
-                        if result.stdout.strip():
-                            logger.info(f"{browser_name} application found via mdfind: {result.stdout.strip()}")
-                            print(f"Found {browser_name} via mdfind: {result.stdout.strip()}")
-                            browser_available = True
-                            # If we found it, let's try to specify the executable path
-                            app_path = result.stdout.strip().split("\n")[0]  # Take first result
-                            if browser_name == "Chrome":
-                                exec_path = os.path.join(app_path, "Contents/MacOS/Google Chrome")
-                                if os.path.exists(exec_path):
-                                    browser_executable = exec_path
-                                    logger.info(f"Found Chrome executable at: {exec_path}")
-                            elif browser_name == "Firefox":
-                                exec_path = os.path.join(app_path, "Contents/MacOS/firefox")
-                                if os.path.exists(exec_path):
-                                    browser_executable = exec_path
-                                    logger.info(f"Found Firefox executable at: {exec_path}")
-                            elif browser_name == "Safari":
-                                exec_path = os.path.join(app_path, "Contents/MacOS/Safari")
-                                if os.path.exists(exec_path):
-                                    browser_executable = exec_path
-                                    logger.info(f"Found Safari executable at: {exec_path}")
-                        else:
-                            logger.warning(f"{browser_name} not found via mdfind")
-                    except Exception as e:
-                        logger.error(f"Error checking for {browser_name} via mdfind: {e}")
-            else:
-                logger.warning(f"No browser found on {platform.system()}")
-                
-        # If no browser is available, try to install one via playwright
+        # Browser availability was probed once at API startup
+        capabilities = get_capabilities()
+        browser_available = capabilities["browser_available"]
         if not browser_available:
-            logger.warning("No browser found! Attempting to install a browser via playwright...")
-            print("\n==== IMPORTANT: No browsers detected! ====")
-            print("Attempting to install a browser via playwright...")
-            
-            try:
-                import subprocess
-                logger.info("Running playwright install to get browsers")
-                
-                # Try to install a browser with playwright
-                install_result = subprocess.run(
-                    ["python", "-m", "playwright", "install", "chromium"],
-                    capture_output=True,
-                    text=True,
-                    timeout=300  # 5 minutes timeout
-                )
-                
-                if install_result.returncode == 0:
-                    logger.info("Successfully installed chromium via playwright")
-                    print("Successfully installed chromium browser!")
-                    browser_available = True
-                else:
-                    logger.error(f"Failed to install browser: {install_result.stderr}")
-                    print(f"Failed to install browser. Error: {install_result.stderr}")
-            except Exception as e:
-                logger.error(f"Error during browser installation: {e}")
-                print(f"Error during browser installation: {e}")
-                
-            # Also provide instructions for manual installation
-            print("\nIf automatic installation fails, please install Chrome manually:")
-            print("  - Download Chrome from https://www.google.com/chrome/")
-            print("  - Install it to the Applications folder")
-            print("  - Restart the OWL API server")
+            logger.warning(capabilities.get("install_hint", "No browser found"))
+        
+        # Static profile of the module; the same one the API routed by
+        profile = get_execution_profile(module_name)
         
         # Import module
         logger.info(f"Importing module: examples.{module_name}")
@@ -793,28 +565,14 @@ def _execute_owl_in_process(question: str, module_name: str):
         logger.info(f"Module imported successfully: {module}")
         
         # Check if default_task exists in module
-        if hasattr(module, "main") and hasattr(module.main, "__globals__") and "default_task" in module.main.__globals__:
-            default_task = module.main.__globals__["default_task"]
+        if profile is not None and profile.default_task is not None:
+            default_task = profile.default_task
             logger.info(f"Module has default_task: {default_task[:50]}...")
             if question == default_task:
                 logger.info("Using module's default_task - good!")
             else:
                 logger.warning("Not using module's default_task - this might cause issues with browser operations")
         
-        # Log browser toolkit configuration
-        try:
-            source = inspect.getsource(module.construct_society)
-            logger.info(f"Module source code contains BrowserToolkit: {'BrowserToolkit' in source}")
-            logger.info(f"Module source code contains headless=False: {'headless=False' in source}")
-            
-            # Extract and log BrowserToolkit configuration
-            import re
-            browser_config = re.search(r'BrowserToolkit\((.*?)\)', source, re.DOTALL)
-            if browser_config:
-                logger.info(f"BrowserToolkit configuration: {browser_config.group(1)}")
-        except Exception as e:
-            logger.error(f"Error inspecting source: {str(e)}")
-        
         # Check if browser is available before building society for browser modules
         if (not browser_available and 
             (module_name in ["run_mini", "run_test_browser"] or "browser" in module_name.lower())):
@@ -862,7 +620,7 @@ def _execute_owl_in_process(question: str, module_name: str):
         # Special handling for known threading issues with browser tools
         try:
             # Monkey-patch the browser toolkit if this is a known problematic module
-            if "BrowserToolkit" in source:
+            if profile is not None and profile.uses_browser:
                 logger.info("Applying BrowserToolkit threading compatibility patch")
                 # We'll set a specific environment variable that the BrowserToolkit can check
                 os.environ["BROWSER_TOOLKIT_THREAD_SAFE"] = "1"
@@ -872,48 +630,8 @@ def _execute_owl_in_process(question: str, module_name: str):
             logger.warning(f"Error during BrowserToolkit patching: {patch_error}")
             # Continue anyway, as the patch is optional
         
-        # Check for running browser processes
-        try:
-            import subprocess
-            import platform
-            
-            if platform.system() == "Darwin":  # macOS
-                # Check for common browsers
-                browsers = ["Google Chrome", "Firefox", "Safari", "Microsoft Edge"]
-                for browser in browsers:
-                    try:
-                        result = subprocess.run(["osascript", "-e", f'tell application "System Events" to count processes whose name is "{browser}"'], 
-                                               capture_output=True, text=True, timeout=5)
-                        logger.info(f"Found {result.stdout.strip()} instances of {browser}")
-                    except Exception as e:
-                        logger.error(f"Error checking for {browser}: {e}")
-                
-                # Check for X11 environment 
-                try:
-                    x11_check = subprocess.run(["ps", "-e"], capture_output=True, text=True, timeout=5)
-                    if "Xorg" in x11_check.stdout or "X11" in x11_check.stdout:
-                        logger.info("X11 environment detected")
-                    else:
-                        logger.warning("No X11 environment detected - may affect browser visibility")
-                except Exception as e:
-                    logger.error(f"Error checking X11 environment: {e}")
-                
-                # Check if in SSH session
-                if "SSH_CLIENT" in os.environ or "SSH_TTY" in os.environ:
-                    logger.warning("Running in SSH session - browser windows may not be visible")
-            elif platform.system() == "Linux":
-                # Check display variable on Linux
-                display = os.environ.get("DISPLAY")
-                logger.info(f"DISPLAY environment variable: {display}")
-                if not display:
-                    logger.warning("No DISPLAY environment variable set - browser windows will not be visible")
-        except Exception as e:
-            logger.error(f"Error checking browser environment: {e}")
-        
-        from owl.utils import run_society
-        
-        # Small delay to ensure logs are flushed
-        time.sleep(2)
+        from owl.utils import run_society, TaskCancelled
+        from owl_api.services.process_pool import emit_task_event, get_cancel_token, retire_worker
         
         logger.info("About to call run_society - browser should launch now")
         print("About to call run_society - browser should launch now")
@@ -929,12 +647,19 @@ def _execute_owl_in_process(question: str, module_name: str):
             
             # Create a queue for the result
             result_queue = queue.Queue()
+            cancel_token = get_cancel_token()
             
             # Define a function to run in a thread
             def run_with_timeout():
                 try:
-                    result = run_society(society)
+                    result = run_society(
+                        society,
+                        on_round=lambda round_index, data: emit_task_event("round", round=round_index, **data),
+                        cancel_token=cancel_token
+                    )
                     result_queue.put(("success", result))
+                except TaskCancelled as e:
+                    result_queue.put(("cancelled", (str(e), "")))
                 except Exception as e:
                     result_queue.put(("error", (str(e), traceback.format_exc())))
             
@@ -952,24 +677,15 @@ def _execute_owl_in_process(question: str, module_name: str):
                 browser_launched = True
                 logger.info("Browser appears to have launched successfully")
                 
-                # Check again for browser processes
-                try:
-                    import subprocess
-                    if platform.system() == "Darwin":  # macOS
-                        for browser in ["Google Chrome", "Firefox"]:
-                            result = subprocess.run(["osascript", "-e", f'tell application "System Events" to count processes whose name is "{browser}"'], 
-                                                capture_output=True, text=True, timeout=5)
-                            count = result.stdout.strip()
-                            if count and int(count) > 0:
-                                logger.info(f"After launch: Found {count} {browser} processes")
-                                print(f"After launch: Found {count} {browser} processes")
-                except Exception as e:
-                    logger.error(f"Error checking browser processes after launch: {e}")
-                
                 # Continue waiting for final result
                 try:
                     result_type, result_data = result_queue.get(timeout=600)  # 10 min timeout
                     
+                    if result_type == "cancelled":
+                        # The task is already cancelled in the API; free the worker quickly
+                        logger.info(f"Society stopped: {result_data[0]}")
+                        return result_data[0], [], {}
+                    
                     if result_type == "success":
                         answer, chat_history, token_info = result_data
                         logger.info(f"Society simulation completed successfully (answer length: {len(answer) if answer else 0})")
@@ -984,6 +700,11 @@ def _execute_owl_in_process(question: str, module_name: str):
                         token_info = {}
                 except queue.Empty:
                     logger.error("Timeout waiting for browser task to complete")
+                    # The society thread cannot be killed: ask it to stop, and replace this
+                    # worker so the thread does not keep running into later tasks
+                    if cancel_token is not None:
+                        cancel_token.set()
+                    retire_worker()
                     answer = "Browser process timeout - task took too long to complete. This might indicate that the browser is stuck or not responding."
                     chat_history = []
                     token_info = {}
@@ -992,6 +713,11 @@ def _execute_owl_in_process(question: str, module_name: str):
                 try:
                     result_type, result_data = result_queue.get_nowait()
                     
+                    if result_type == "cancelled":
+                        # The task is already cancelled in the API; free the worker quickly
+                        logger.info(f"Society stopped: {result_data[0]}")
+                        return result_data[0], [], {}
+                    
                     if result_type == "success":
                         answer, chat_history, token_info = result_data
                         logger.info(f"Society simulation completed successfully (fast, answer length: {len(answer) if answer else 0})")
@@ -1038,12 +764,8 @@ def _execute_owl_in_process(question: str, module_name: str):
             
         return answer, chat_history, token_info
     except Exception as e:
-        logger.error(f"===== ERROR IN BROWSER PROCESS {os.getpid()} =====")
-        logger.error(f"Error in _execute_owl_in_process: {str(e)}")
-        logger.error(traceback.format_exc())
-        print(f"\n\n===== ERROR IN BROWSER PROCESS {os.getpid()} =====")
-        print(f"Error: {str(e)}")
-        print(f"See log file for details: {process_log_file}")
+        # The traceback is kept in the entry's exception field
+        logger.exception(f"Error in _execute_owl_in_process (PID {os.getpid()}): {str(e)}")
         
         error_summary = str(e)
         if "chrome not found" in error_summary.lower() or "chrome" in error_summary.lower():
@@ -1051,11 +773,11 @@ def _execute_owl_in_process(question: str, module_name: str):
         else:
             return f"Error in browser process: {error_summary}", [], {}
 
-async def run_owl_query_async(task_id: str, question: str, module_name: str = "run", task_registry: Dict = None) -> None:
+async def run_owl_query_async(task_id: str, question: str, module_name: str = "run") -> None:
     """Async version of run_owl_query - wrapper around the sync version for now
     
     This is a separate function to allow for future async implementation.
     """
     # Just call the sync version for now
     # In the future, this can be refactored to use camel's async methods
-    run_owl_query(task_id, question, module_name, task_registry)
\ No newline at end of file
+    run_owl_query(task_id, question, module_name)
@@ -14,193 +14,619 @@
 # ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
 
 import os
+import sys
 import time
 import logging
+import importlib
+import collections
 import multiprocessing as mp
 import threading
 import queue
 import atexit
 import pickle
 import signal
-from multiprocessing import Process, Queue
+import functools
+from dataclasses import dataclass
 from typing import Dict, List, Any, Optional, Callable
 
+from owl_api.services.task_store import get_task_store
+from owl_api.services.task_events import get_task_event_bus, json_safe
+from owl_api.services.conversation_store import get_conversation_store
+from owl_api.services.admission import get_admission_controller
+from owl_api.services.scheduler import TaskScheduler
+from owl_api.services.result_collector import get_result_collector
+from owl_api.services.env_manager import get_worker_env_config, apply_env_config
+from owl_api.services.capabilities import get_capabilities, apply_capabilities
+from owl_api.services.structured_logging import configure_worker_logging, get_log_queue
+
 logger = logging.getLogger(__name__)
 
 # Global process pool managers
 _process_pool = None
 _browser_process_pool = None
 
+class PoolSaturatedError(Exception):
+    """Raised when every worker is busy and the admission queue is full"""
+
+    def __init__(self, queued: int, max_queue_size: int):
+        super().__init__(f"Process pool is saturated ({queued}/{max_queue_size} tasks queued)")
+        self.queued = queued
+        self.max_queue_size = max_queue_size
+
+
+def _current_rss_mb() -> float:
+    """Resident set size of the current process in MB"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        # Peak rather than current RSS, but good enough to catch runaway workers
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _picklable_result(result, logger):
+    """Return the result, or a simplified copy if it cannot be pickled"""
+    try:
+        pickle.dumps(result)
+        return ("success", result)
+    except (pickle.PickleError, TypeError, AttributeError) as pickle_error:
+        # If we got a pickling error, try to extract and send basic data
+        logger.warning(f"Pickling error: {str(pickle_error)}. Attempting to extract basic data.")
+
+    # Extract answer string, chat history, and token info from the result tuple
+    if not (isinstance(result, tuple) and len(result) >= 3):
+        logger.error("Result format not as expected, cannot extract basic data")
+        return ("error", ("Pickling error: result could not be sent to the main process", ""))
+
+    answer = str(result[0]) if result[0] is not None else ""
+
+    # Handle chat history safely
+    try:
+        chat_history = []
+        if result[1]:
+            for msg in result[1]:
+                if hasattr(msg, 'to_dict'):
+                    chat_history.append(msg.to_dict())
+                elif isinstance(msg, dict):
+                    chat_history.append(msg)
+                else:
+                    chat_history.append(str(msg))
+        pickle.dumps(chat_history)
+    except Exception:
+        chat_history = []
+
+    # Handle token info safely
+    try:
+        token_info = {}
+        if result[2] and isinstance(result[2], dict):
+            for k, v in result[2].items():
+                if isinstance(v, (int, float, str, bool, type(None))):
+                    token_info[str(k)] = v
+    except Exception:
+        token_info = {}
+
+    logger.info("Sending simplified result after handling pickling error")
+    return ("success", (answer, chat_history, token_info))
+
+
+# Set inside pool worker processes so running tasks can stream events to the parent
+_worker_outbox = None
+_worker_id: Optional[int] = None
+_worker_task_id: Optional[str] = None
+_worker_cancel_event = None
+_worker_retire_requested = False
+
+def get_cancel_token():
+    """Cancel token of the task running in this pool worker
+
+    Pass it to run_society so a cancelled task stops at its next round or
+    tool call.
+
+    Returns:
+        The worker's multiprocessing.Event, or None outside a pool worker
+    """
+    return _worker_cancel_event if _worker_task_id is not None else None
+
+def retire_worker():
+    """Replace this pool worker once its current task returns
+
+    For a task that leaves work running in the worker, e.g. a thread it
+    timed out waiting for. Does nothing outside a pool worker.
+    """
+    global _worker_retire_requested
+    if _worker_task_id is not None:
+        _worker_retire_requested = True
+
+def emit_task_event(event_type: str, **data):
+    """Send an event for the current task from a pool worker to the main process
+
+    The main process publishes it on the task event bus. Does nothing outside
+    a pool worker.
+
+    Args:
+        event_type: Event type, e.g. "round"
+        **data: Event payload
+    """
+    if _worker_outbox is None or _worker_task_id is None:
+        return
+    _worker_outbox.put(("event", _worker_id, _worker_task_id, event_type, json_safe(data)))
+
+
+def _pool_worker(worker_id: int, inbox, outbox, max_tasks: int, max_rss_mb: float, warm_modules: tuple,
+                 log_queue=None, cancel_event=None):
+    """Long-lived worker process of the ProcessPoolManager
+
+    Imports the heavy modules once, then runs tasks from its inbox until it
+    is told to stop or has run enough tasks (or grown large enough) to be
+    recycled.
+    """
+    # Set up process-specific signal handlers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    configure_worker_logging(log_queue, "process_pool")
+
+    logger = logging.getLogger("process_pool_worker")
+    logger.info(f"Pool worker {worker_id} started with PID {os.getpid()}")
+
+    global _worker_outbox, _worker_id, _worker_task_id, _worker_cancel_event
+    _worker_outbox, _worker_id, _worker_cancel_event = outbox, worker_id, cancel_event
+
+    # Pre-warm: pay the interpreter, camel and dotenv import cost once per worker
+    for module_name in warm_modules:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Could not pre-import {module_name}: {str(e)}")
+    outbox.put(("ready", worker_id, os.getpid()))
+    logger.info(f"Pool worker {worker_id} ready")
+
+    tasks_done = 0
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+
+        task_id, target_func, args, env_config, capabilities = item
+        _worker_task_id = task_id
+        logger.info(f"Executing {target_func.__name__} for task {task_id}")
+        try:
+            # Environment changes and capability refreshes made since the previous task are applied
+            # before this one; a value that cannot be applied fails the task, not the worker
+            apply_env_config(*env_config)
+            apply_capabilities(capabilities)
+            result_type, result_data = _picklable_result(target_func(*args), logger)
+            logger.info(f"Task {task_id} finished: {result_type}")
+        except Exception as e:
+            # Capture the exception and traceback
+            import traceback
+            error_traceback = traceback.format_exc()
+            logger.error(f"Task {task_id} failed: {str(e)}\n{error_traceback}")
+            result_type, result_data = "error", (str(e), error_traceback)
+
+        _worker_task_id = None
+        tasks_done += 1
+        rss_mb = _current_rss_mb()
+        reasons = []
+        if _worker_retire_requested:
+            reasons.append("on request")
+        if tasks_done >= max_tasks:
+            reasons.append(f"after {tasks_done} tasks")
+        if max_rss_mb > 0 and rss_mb >= max_rss_mb:
+            reasons.append(f"at {rss_mb:.0f} MB RSS (limit {max_rss_mb:.0f} MB)")
+        retire = bool(reasons)
+        outbox.put(("result", worker_id, task_id, result_type, result_data, retire))
+        if retire:
+            logger.info(f"Pool worker {worker_id} retiring {', '.join(reasons)} "
+                        f"({rss_mb:.0f} MB RSS)")
+            break
+
+
+@dataclass(slots=True)
+class _PoolWorker:
+    """Parent-side handle of a pool worker process"""
+    worker_id: int
+    process: Any
+    inbox: Any
+    cancel_event: Any
+    task_id: Optional[str] = None
+    ready: bool = False
+    busy_since: Optional[float] = None
+    estimated_seconds: float = 0.0
+
+
 class ProcessPoolManager:
-    """Manages a pool of processes for executing synchronous code"""
+    """Manages a bounded pool of persistent worker processes for executing synchronous code
 
-    def __init__(self, max_workers=4):
-        self.max_workers = max_workers
-        self.tasks = {}  # task_id -> (process, result_queue)
-        self.active_processes = 0
+    Workers are started once and reused, so tasks do not pay the spawn and
+    import cost. At most ``max_workers`` tasks run at a time; up to
+    ``max_queue_size`` more wait in a fair-share queue (see TaskScheduler),
+    and further submissions are rejected with PoolSaturatedError. Workers
+    are replaced
+    after ``max_tasks_per_worker`` tasks or once their RSS exceeds
+    ``max_rss_mb``.
 
-    def submit_task(self, task_id: str, target_func: Callable, args: tuple) -> Queue:
-        """Submit a task to be executed in a separate process
-        
+    A cancelled task is first asked to stop through its worker's cancel
+    token; a worker that has not finished it ``cancel_grace`` seconds later
+    is sent SIGTERM, then SIGKILL after ``terminate_timeout`` seconds, and
+    replaced.
+
+    Worker messages and exits are handled by the result collector, on the
+    event loop once it is attached, instead of by a thread of the pool.
+    """
+
+    def __init__(self, max_workers=4, max_queue_size=16, max_tasks_per_worker=20,
+                 max_rss_mb=2048, warm_modules=("owl_api.services.owl_runner",),
+                 cancel_grace=10.0, terminate_timeout=5.0):
+        """
         Args:
-            task_id: Unique task identifier
-            target_func: Function to execute in separate process
-            args: Arguments to pass to the function
-            
-        Returns:
-            Queue: Result queue to receive results from the process
+            max_workers: Number of worker processes
+            max_queue_size: Maximum number of tasks waiting for a worker
+            max_tasks_per_worker: Recycle a worker after this many tasks
+            max_rss_mb: Recycle a worker once its RSS reaches this many MB (0 disables)
+            warm_modules: Modules each worker imports before accepting tasks
+            cancel_grace: Seconds a cancelled task has to stop before its worker is terminated
+            terminate_timeout: Seconds between SIGTERM and SIGKILL of a terminated worker
         """
-        # Create queues for communication
-        result_queue = Queue()
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_rss_mb = max_rss_mb
+        self.warm_modules = tuple(warm_modules)
+        self.cancel_grace = cancel_grace
+        self.terminate_timeout = terminate_timeout
+
+        self._lock = threading.RLock()
+        self._outbox = mp.Queue()
+        self._workers: Dict[int, _PoolWorker] = {}
+        self._pending = TaskScheduler()  # items are (target_func, args)
+        self._result_callbacks: Dict[str, Callable[[str, Any], None]] = {}
+        self._cancelling: Dict[str, threading.Event] = {}  # set once the cancelled task's worker is free
+        self._next_worker_id = 0
+        self._shutting_down = False
+        self.tasks_completed = 0
+        self.workers_replaced = 0
+        self.tasks_cancelled = 0
+        self.workers_terminated = 0
+
+        with self._lock:
+            for _ in range(max_workers):
+                self._start_worker()
+        get_result_collector().watch(self._outbox, self._drain_outbox)
+
+        logger.info(f"ProcessPoolManager started {max_workers} workers (queue size {max_queue_size})")
+
+    @property
+    def active_processes(self) -> int:
+        with self._lock:
+            return sum(1 for worker in self._workers.values() if worker.task_id is not None)
 
-        # Create and start process
-        process = Process(
-            target=self._process_wrapper,
-            args=(target_func, args, result_queue)
+    def _start_worker(self) -> _PoolWorker:
+        """Start a worker process; must hold the lock"""
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        inbox = mp.Queue()
+        cancel_event = mp.Event()
+        process = mp.Process(
+            target=_pool_worker,
+            args=(worker_id, inbox, self._outbox, self.max_tasks_per_worker,
+                  self.max_rss_mb, self.warm_modules, get_log_queue(), cancel_event),
+            daemon=True,
+            name=f"pool-worker-{worker_id}"
         )
-        process.daemon = True  # Allow process to be terminated when main process exits
         process.start()
+        worker = _PoolWorker(worker_id=worker_id, process=process, inbox=inbox, cancel_event=cancel_event)
+        self._workers[worker_id] = worker
+        get_result_collector().watch(process.sentinel, functools.partial(self._worker_exited, worker))
+        logger.info(f"Started pool worker {worker_id} with PID {process.pid}")
+        return worker
 
-        # Store process and result queue
-        self.tasks[task_id] = (process, result_queue)
-        self.active_processes += 1
+    def _idle_worker(self) -> Optional[_PoolWorker]:
+        # Prefer workers that have finished warming up
+        idle = [worker for worker in self._workers.values() if worker.task_id is None]
+        idle.sort(key=lambda worker: not worker.ready)
+        return idle[0] if idle else None
 
-        logger.info(f"Task {task_id} submitted to process pool, active processes: {self.active_processes}")
-        return result_queue
+    def _assign(self, worker: _PoolWorker, task_id: str, target_func: Callable, args: tuple,
+                estimated_seconds: float):
+        worker.task_id = task_id
+        worker.busy_since = time.time()
+        worker.estimated_seconds = estimated_seconds
+        # Cleared here rather than by the worker so a cancel sent before it picks up the task still counts
+        worker.cancel_event.clear()
+        worker.inbox.put((task_id, target_func, args, get_worker_env_config(), get_capabilities()))
+        get_task_store().update(task_id, {
+            "process_status": "running",
+            "queue_position": 0,
+            "eta_seconds": 0,
+            "worker_pid": worker.process.pid
+        })
+        logger.info(f"Task {task_id} assigned to pool worker {worker.worker_id}")
 
-    def _process_wrapper(self, target_func, args, result_queue):
-        """Wrapper function to execute in separate process and handle errors"""
-        try:
-            # Set up process-specific signal handlers
-            signal.signal(signal.SIGINT, signal.SIG_IGN)
-            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    def _dispatch(self):
+        """Hand queued tasks to idle workers in fair-share order; must hold the lock"""
+        while self._pending and not self._shutting_down:
+            worker = self._idle_worker()
+            if worker is None:
+                break
+            task = self._pending.pop()
+            self._assign(worker, task.task_id, *task.item, estimated_seconds=task.cost)
+        self._report_queue()
 
-            # Configure process-specific logging to both console and file
-            log_dir = "/Users/smill/code/owl/logs"
-            process_log_file = None
-            try:
-                # Ensure log directory exists
-                if not os.path.exists(log_dir):
-                    os.makedirs(log_dir, exist_ok=True)
-                    print(f"Created log directory: {log_dir}")
-                
-                # Create process-specific log file
-                process_log_file = os.path.join(log_dir, f"process_pool_{os.getpid()}.log")
-                logging.basicConfig(
-                    level=logging.DEBUG,
-                    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-                    handlers=[
-                        logging.FileHandler(process_log_file),
-                        logging.StreamHandler()
-                    ]
-                )
-                print(f"Process {os.getpid()}: Logging to {process_log_file}")
-            except Exception as e:
-                print(f"Error setting up logging: {str(e)}")
-                # Fall back to console-only logging
-                logging.basicConfig(level=logging.DEBUG)
-                
-            logger = logging.getLogger("process_pool_worker")
-            logger.info(f"Worker process started with PID {os.getpid()}")
-            logger.info(f"Function: {target_func.__name__}, Args: {args}")
-            
-            # Execute the target function
-            logger.info(f"Executing {target_func.__name__} with args: {args}")
-            result = target_func(*args)
-            logger.info(f"Execution completed successfully")
+    def _report_queue(self):
+        """Publish the position and ETA of each queued task; must hold the lock"""
+        if not self._pending:
+            return
+        now = time.time()
+        self._pending.report([
+            max(worker.busy_since + worker.estimated_seconds - now, 0.0) if worker.task_id is not None else 0.0
+            for worker in self._workers.values()
+        ])
+
+    def is_saturated(self) -> bool:
+        """Whether a new task would be rejected"""
+        with self._lock:
+            return self._idle_worker() is None and len(self._pending) >= self.max_queue_size
 
-            # Put the result in the queue, but handle it in a pickle-safe way
-            logger.info("Sending success result back to main process")
+    def queue_position(self, task_id: str) -> int:
+        """Position of a task in the fair-share queue (1-based), or 0 if it is not queued"""
+        with self._lock:
+            return self._pending.position(task_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current utilization of the pool"""
+        with self._lock:
+            busy = sum(1 for worker in self._workers.values() if worker.task_id is not None)
+            return {
+                "max_workers": self.max_workers,
+                "workers": len(self._workers),
+                "busy_workers": busy,
+                "idle_workers": len(self._workers) - busy,
+                "queued": len(self._pending),
+                "max_queue_size": self.max_queue_size,
+                "fair_share": self._pending.stats(),
+                "tasks_completed": self.tasks_completed,
+                "workers_replaced": self.workers_replaced,
+                "tasks_cancelled": self.tasks_cancelled,
+                "cancelling": len(self._cancelling),
+                "workers_terminated": self.workers_terminated
+            }
+
+    def submit_task(self, task_id: str, target_func: Callable, args: tuple,
+                    on_result: Callable[[str, Any], None]):
+        """Submit a task to be executed by a worker process
+
+        The task starts immediately if a worker is idle and is queued
+        otherwise.
+
+        Args:
+            task_id: Unique task identifier
+            target_func: Module-level function to execute in the worker process
+            args: Arguments to pass to the function
+            on_result: Called once with (result_type, result_data) when the task
+                finishes, normally by the result collector; must not block
+
+        Raises:
+            PoolSaturatedError: If every worker is busy and the admission queue is full
+        """
+        with self._lock:
+            if self._shutting_down:
+                raise RuntimeError("Process pool is shutting down")
+            worker = self._idle_worker()
+            if worker is None and len(self._pending) >= self.max_queue_size:
+                raise PoolSaturatedError(len(self._pending), self.max_queue_size)
+
+            self._result_callbacks[task_id] = on_result
+            # Goes through the queue even when a worker is idle so the worker learns its estimate
+            self._pending.push(task_id, (target_func, args))
+            if worker is None:
+                get_task_store().update(task_id, {"process_status": "queued"})
+            self._dispatch()
+            if worker is None:
+                logger.info(f"Task {task_id} queued at position {self._pending.position(task_id)}")
+
+    def _drain_outbox(self):
+        """Result collector callback routing every waiting worker message"""
+        while True:
             try:
-                # Try direct pickling
-                result_queue.put(("success", result))
-                logger.info("Result sent successfully via direct pickling")
-            except (pickle.PickleError, TypeError) as pickle_error:
-                # If we got a pickling error, try to extract and send basic data
-                logger.warning(f"Pickling error: {str(pickle_error)}. Attempting to extract basic data.")
-                
-                # Extract answer string, chat history, and token info from the result tuple
-                if isinstance(result, tuple) and len(result) >= 3:
-                    answer = str(result[0]) if result[0] is not None else ""
-                    
-                    # Handle chat history safely
-                    try:
-                        chat_history = []
-                        if result[1]:
-                            for msg in result[1]:
-                                if hasattr(msg, 'to_dict'):
-                                    chat_history.append(msg.to_dict())
-                                elif isinstance(msg, dict):
-                                    chat_history.append(msg)
-                                else:
-                                    chat_history.append(str(msg))
-                    except Exception:
-                        chat_history = []
-                    
-                    # Handle token info safely
-                    try:
-                        token_info = {}
-                        if result[2] and isinstance(result[2], dict):
-                            for k, v in result[2].items():
-                                if isinstance(v, (int, float, str, bool, type(None))):
-                                    token_info[str(k)] = v
-                    except Exception:
-                        token_info = {}
-                    
-                    simplified_result = (answer, chat_history, token_info)
-                    result_queue.put(("success", simplified_result))
-                    logger.info("Sent simplified result after handling pickling error")
-                else:
-                    # If it's not the expected format, send an error
-                    logger.error("Result format not as expected, cannot extract basic data")
-                    result_queue.put(("error", (f"Pickling error: {str(pickle_error)}", "")))
-        except Exception as e:
-            # Capture the exception and traceback
-            import traceback
-            error_traceback = traceback.format_exc()
-            print(f"Process {os.getpid()} error: {str(e)}\n{error_traceback}")
-            result_queue.put(("error", (str(e), error_traceback)))
+                message = self._outbox.get_nowait()
+            except queue.Empty:
+                return
+            except (EOFError, OSError):
+                return
+            self._handle_message(message)
+
+    def _handle_message(self, message: tuple):
+        kind, worker_id = message[0], message[1]
+        if kind == "event":
+            _, _, task_id, event_type, data = message
+            if event_type == "round":
+                get_conversation_store().record_round(task_id, data)
+                get_admission_controller().record_usage(task_id, data.get("usage") or {})
+            get_task_event_bus().publish(task_id, event_type, **data)
+            return
+
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if kind == "ready":
+                if worker is not None:
+                    worker.ready = True
+                logger.info(f"Pool worker {worker_id} (PID {message[2]}) is warm")
+                return
+
+            _, _, task_id, result_type, result_data, retire = message
+            on_result = self._result_callbacks.pop(task_id, None)
+            released = self._cancelling.pop(task_id, None)
+            if released is not None:
+                released.set()
+            self.tasks_completed += 1
+            if worker is not None:
+                worker.task_id = None
+                worker.busy_since = None
+                if retire:
+                    self._replace_worker(worker)
+            self._dispatch()
+
+        if on_result is not None:
+            on_result(result_type, result_data)
+
+    def _replace_worker(self, worker: _PoolWorker):
+        """Remove a worker and start a new one in its place; must hold the lock
+
+        The old process is reaped by _worker_exited once it exits; one that
+        has not exited within five seconds is terminated.
+        """
+        self._workers.pop(worker.worker_id, None)
+        self.workers_replaced += 1
+        if not self._shutting_down:
+            self._start_worker()
+        get_result_collector().call_later(5.0, self._stop_retired, worker)
+
+    def _stop_retired(self, worker: _PoolWorker):
+        if worker.process.is_alive():
+            logger.warning(f"Retired pool worker {worker.worker_id} did not exit, terminating it")
+            worker.process.terminate()
+
+    def _worker_exited(self, worker: _PoolWorker):
+        """Result collector callback for a worker process that exited
+
+        Reaps a worker that was replaced or terminated; one that exited on
+        its own fails its task and is replaced.
+        """
+        get_result_collector().unwatch(worker.process.sentinel)
+        # Reap it without blocking; the exit code can lag the sentinel by a moment, so it may still be None
+        worker.process.join(timeout=0)
+        # Its last result may still be waiting behind the exit, e.g. from a retiring worker
+        self._drain_outbox()
+        on_result = None
+        with self._lock:
+            if self._workers.get(worker.worker_id) is worker:
+                logger.error(f"Pool worker {worker.worker_id} exited unexpectedly "
+                             f"with code {worker.process.exitcode}")
+                if worker.task_id is not None:
+                    released = self._cancelling.pop(worker.task_id, None)
+                    if released is not None:
+                        released.set()
+                    on_result = self._result_callbacks.pop(worker.task_id, None)
+                self._replace_worker(worker)
+                self._dispatch()
+
+        try:
+            worker.inbox.close()
+        except Exception:
+            pass
+        if on_result is not None:
+            on_result("error", (f"Worker process exited unexpectedly with code {worker.process.exitcode}", ""))
 
     def terminate_task(self, task_id: str):
-        """Terminate a running task"""
-        if task_id in self.tasks:
-            process, _ = self.tasks[task_id]
-            if process.is_alive():
-                process.terminate()
-                logger.info(f"Task {task_id} terminated")
-            self._cleanup_task(task_id)
-
-    def _cleanup_task(self, task_id: str):
-        """Clean up resources for a completed task"""
-        if task_id in self.tasks:
-            process, result_queue = self.tasks[task_id]
-            # Close the queue if possible
-            try:
-                if hasattr(result_queue, 'close'):
-                    result_queue.close()
-            except:
-                pass
+        """Cancel a running or queued task
+
+        A queued task is dropped. A running task's cancel token is set, and
+        a result collector timer terminates its worker if the task has not
+        stopped within ``cancel_grace`` seconds, so the slot is free within
+        ``cancel_grace`` seconds either way.
+
+        Args:
+            task_id: Task identifier
+        """
+        running = released = None
+        with self._lock:
+            on_result = self._result_callbacks.pop(task_id, None)
+            if self._pending.remove(task_id) is not None:
+                logger.info(f"Task {task_id} removed from the queue")
+            else:
+                for worker in self._workers.values():
+                    if worker.task_id == task_id:
+                        worker.cancel_event.set()
+                        running = worker
+                        released = self._cancelling.setdefault(task_id, threading.Event())
+                        break
+            if on_result is not None:
+                self.tasks_cancelled += 1
+            self._dispatch()
+
+        if on_result is not None:
+            on_result("error", ("Task terminated", ""))
+        if running is not None:
+            logger.info(f"Asked pool worker {running.worker_id} to cancel task {task_id}")
+            get_result_collector().call_later(self.cancel_grace, self._escalate_cancel, running, task_id, released)
+
+    def _escalate_cancel(self, worker: _PoolWorker, task_id: str, released: threading.Event):
+        """Result collector timer that terminates a worker which ignored its cancel token"""
+        if released.is_set():
+            logger.info(f"Task {task_id} stopped on pool worker {worker.worker_id}, worker kept")
+            return
+
+        with self._lock:
+            self._cancelling.pop(task_id, None)
+            if self._workers.get(worker.worker_id) is not worker or worker.task_id != task_id:
+                return
+            # Free the slot now; the old process is stopped outside the lock
+            self._workers.pop(worker.worker_id)
+            self.workers_replaced += 1
+            self.workers_terminated += 1
+            if not self._shutting_down:
+                self._start_worker()
+            self._dispatch()
 
-            # Remove from tasks dictionary
-            del self.tasks[task_id]
-            self.active_processes -= 1
-            logger.info(f"Task {task_id} cleaned up, active processes: {self.active_processes}")
+        logger.warning(f"Task {task_id} did not stop within {self.cancel_grace}s, "
+                       f"terminating pool worker {worker.worker_id}")
+        # _worker_exited reaps the process once it is gone
+        worker.process.terminate()
+        get_result_collector().call_later(self.terminate_timeout, self._kill_terminated, worker)
+
+    def _kill_terminated(self, worker: _PoolWorker):
+        if worker.process.is_alive():
+            logger.warning(f"Pool worker {worker.worker_id} ignored SIGTERM, killing it")
+            worker.process.kill()
 
     def shutdown(self):
-        """Shutdown the process pool, terminating all running processes"""
-        for task_id in list(self.tasks.keys()):
-            self.terminate_task(task_id)
-            
-        # Force close any remaining queues
-        for task_id, (process, result_queue) in list(self.tasks.items()):
+        """Shutdown the process pool, stopping all worker processes"""
+        with self._lock:
+            self._shutting_down = True
+            workers = list(self._workers.values())
+            self._workers.clear()
+            pending = self._pending.task_ids()
+            self._pending = TaskScheduler()
+            result_callbacks = list(self._result_callbacks.values())
+            self._result_callbacks.clear()
+
+        collector = get_result_collector()
+        collector.unwatch(self._outbox)
+        for worker in workers:
+            collector.unwatch(worker.process.sentinel)
+        for on_result in result_callbacks:
+            on_result("error", ("Process pool shut down", ""))
+        if pending:
+            logger.info(f"Dropped {len(pending)} queued tasks")
+
+        # Send stop signal to all workers
+        for worker in workers:
+            try:
+                worker.inbox.put(None)
+            except Exception:
+                pass
+
+        for worker in workers:
             try:
-                if hasattr(result_queue, 'close'):
-                    logger.info(f"Closing queue for task {task_id}")
-                    result_queue.close()
-                    result_queue.join_thread()  # Wait for the background thread
+                worker.process.join(timeout=2)
+                if worker.process.is_alive():
+                    logger.warning(f"Process {worker.process.pid} did not terminate, killing it")
+                    worker.process.terminate()
+                    worker.process.join(timeout=1)
+                worker.inbox.close()
+                worker.inbox.join_thread()
             except Exception as e:
-                logger.error(f"Error closing queue for task {task_id}: {str(e)}")
-                
+                logger.error(f"Error shutting down pool worker {worker.worker_id}: {str(e)}")
+
+        try:
+            self._outbox.close()
+            self._outbox.join_thread()
+        except Exception as e:
+            logger.error(f"Error closing pool result queue: {str(e)}")
+            
         # Clean up any semaphores or other IPC resources
         try:
             import gc
@@ -212,66 +638,281 @@ class ProcessPoolManager:
         logger.info("Process pool shut down completely")
 
 
+@dataclass(slots=True)
+class _BrowserWorker:
+    """Parent-side bookkeeping for a browser worker process"""
+    process: Any
+    control_queue: Any
+    started_at: float
+    idle_since: float
+    task_id: Optional[str] = None
+    busy_since: Optional[float] = None
+    busy_seconds: float = 0.0
+    estimated_seconds: float = 0.0
+    tasks_served: int = 0
+    stopping: bool = False
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        busy_seconds = self.busy_seconds + (now - self.busy_since if self.busy_since else 0.0)
+        uptime = max(now - self.started_at, 1e-6)
+        return {
+            "pid": self.process.pid,
+            "busy": self.task_id is not None,
+            "task_id": self.task_id,
+            "tasks_served": self.tasks_served,
+            "uptime": round(uptime, 1),
+            "utilization": round(min(busy_seconds / uptime, 1.0), 3),
+            "stopping": self.stopping,
+            "rss_mb": _process_tree_rss_mb(self.process.pid)
+        }
+
+
+def _process_tree_rss_mb(pid: int) -> Optional[float]:
+    """RSS of a process and its children (e.g. Chromium) in MB, if psutil is available"""
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return round(rss / (1024 * 1024), 1)
+    except ImportError:
+        return None
+    except Exception:
+        return None
+
+
 class BrowserProcessPool:
-    """Manages a pool of browser worker processes"""
+    """Manages an autoscaling pool of browser worker processes
+
+    Submitted tasks wait in a fair-share queue (see TaskScheduler) and are
+    put on the shared input queue only when a worker is free to take them,
+    so one client's batch cannot fill the input queue ahead of everyone
+    else. An autoscaler thread adds workers while tasks are waiting and
+    every worker is busy, up to ``max_workers`` and the memory budget, and
+    stops workers that have been idle for ``idle_cooldown`` seconds, down
+    to ``min_workers``.
     
-    def __init__(self, num_workers=2, max_queue_size=100):
+    Each worker also has a control queue. Cancelling a task sends its id to
+    the owning worker, whose run_society stops at the next round or tool
+    call; a worker still busy with it ``cancel_grace`` seconds later is
+    sent SIGTERM, then SIGKILL after ``terminate_timeout`` seconds.
+    """
+    
+    def __init__(self, min_workers=1, max_workers=4, max_queue_size=100, idle_cooldown=120,
+                 memory_per_worker_mb=1024, memory_budget_mb=4096, scale_interval=2.0,
+                 cancel_grace=10.0, terminate_timeout=5.0):
         """
         Initialize the process pool
         
         Args:
-            num_workers: Number of worker processes to create
-            max_queue_size: Maximum size of task and result queues
+            min_workers: Number of workers to keep running when idle
+            max_workers: Maximum number of workers
+            max_queue_size: Maximum number of tasks waiting for a worker, and size of the result queue
+            idle_cooldown: Seconds a worker must be idle before it is stopped
+            memory_per_worker_mb: Expected memory use of one worker and its Chromium
+            memory_budget_mb: Total memory the browser workers may use
+            scale_interval: Seconds between autoscaler checks
+            cancel_grace: Seconds a cancelled task has to stop before its worker is terminated
+            terminate_timeout: Seconds between SIGTERM and SIGKILL of a terminated worker
         """
-        self.num_workers = num_workers
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.idle_cooldown = idle_cooldown
+        self.memory_per_worker_mb = memory_per_worker_mb
+        self.memory_budget_mb = memory_budget_mb
+        self.scale_interval = scale_interval
+        self.max_queue_size = max_queue_size
+        self.cancel_grace = cancel_grace
+        self.terminate_timeout = terminate_timeout
         
         # Create queues for communication
         self.input_queue = mp.Queue(maxsize=max_queue_size)
         self.output_queue = mp.Queue(maxsize=max_queue_size)
         
+        self._lock = threading.RLock()
+        self._workers: Dict[int, _BrowserWorker] = {}
+        self._pending = TaskScheduler()  # items are the task messages for the input queue
+        self._in_transit: Dict[str, float] = {}  # on the input queue, not yet picked up -> estimated seconds
+        self._cancel_on_start: Dict[str, None] = {}  # cancelled in transit; the shared queue cannot drop them
+        self._cancelling: Dict[str, threading.Event] = {}  # set once the cancelled task's worker is free
+        self.tasks_cancelled = 0
+        self.workers_terminated = 0
+        self._next_worker_index = 0
+        self._shutting_down = False
+        self._scale_wakeup = threading.Event()
+        self.events = collections.deque(maxlen=100)
+        
         # Create and start worker processes
-        self.processes = []
-        self.start_workers()
+        with self._lock:
+            self.start_workers(min_workers, reason="initial")
         
-        # Create a thread to monitor the output queue
-        self.results_thread = threading.Thread(
-            target=self._process_results,
-            daemon=True
-        )
-        self.results_thread.start()
+        # Worker updates are handled by the result collector as they arrive
+        get_result_collector().watch(self.output_queue, self._drain_results)
         
-        # Task registry for tracking status
-        self.task_registry = {}
+        self.autoscaler_thread = threading.Thread(target=self._autoscale, daemon=True)
+        self.autoscaler_thread.start()
         
         # Register cleanup function
         atexit.register(self.shutdown)
         
-        logger.info(f"BrowserProcessPool initialized with {num_workers} workers")
+        logger.info(f"BrowserProcessPool initialized with {min_workers}-{max_workers} workers")
     
-    def start_workers(self):
-        """Start worker processes"""
+    def start_workers(self, count: int, reason: str = ""):
+        """Start worker processes; must hold the lock
+        
+        Args:
+            count: Number of workers to start
+            reason: Why the workers are started, recorded in the scaling events
+        """
         # Import here to avoid circular imports
         from .browser_process import browser_worker
         
-        # Get current environment variables to pass to workers
-        env_vars = {
-            key: os.environ.get(key)
-            for key in os.environ
-            if key.startswith(("OPENAI_", "AZURE_", "GOOGLE_", "BROWSER_"))
-        }
+        # Every value from .env or the frontend; later changes travel with each task
+        env_config = get_worker_env_config()
         
-        for i in range(self.num_workers):
+        for _ in range(count):
+            i = self._next_worker_index
+            self._next_worker_index += 1
+            control_queue = mp.Queue()
             p = mp.Process(
                 target=browser_worker,
-                args=(self.input_queue, self.output_queue, env_vars),
+                args=(self.input_queue, self.output_queue, env_config, get_log_queue(), control_queue),
                 daemon=True,
                 name=f"browser-worker-{i}"
             )
             p.start()
-            self.processes.append(p)
+            now = time.time()
+            self._workers[p.pid] = _BrowserWorker(process=p, control_queue=control_queue,
+                                                  started_at=now, idle_since=now)
             logger.info(f"Started browser worker {i} with PID {p.pid}")
+        
+        if count:
+            self._record_event("scale_up", reason, count)
+    
+    def _record_event(self, action: str, reason: str, count: int = 1):
+        event = {
+            "time": time.time(),
+            "action": action,
+            "count": count,
+            "reason": reason,
+            "workers": self._active_worker_count()
+        }
+        self.events.append(event)
+        logger.info(f"Browser pool {action} by {count} ({reason}), now {event['workers']} workers")
+    
+    def _active_worker_count(self) -> int:
+        return sum(1 for worker in self._workers.values() if not worker.stopping)
     
-    def submit_task(self, task_id: str, query: str, module_name: str, registry: Dict):
+    def _memory_allows(self, additional: int) -> int:
+        """How many of the requested additional workers fit in the memory budget"""
+        allowed = (self.memory_budget_mb // self.memory_per_worker_mb) - len(self._workers)
+        try:
+            import psutil
+            available_mb = psutil.virtual_memory().available / (1024 * 1024)
+            allowed = min(allowed, int(available_mb // self.memory_per_worker_mb))
+        except ImportError:
+            pass
+        return max(0, min(additional, allowed))
+    
+    def _autoscale(self):
+        """Thread function that resizes the pool to match demand"""
+        while not self._shutting_down:
+            self._scale_wakeup.wait(timeout=self.scale_interval)
+            self._scale_wakeup.clear()
+            if self._shutting_down:
+                break
+            try:
+                self._scale_once()
+            except Exception as e:
+                logger.error(f"Error autoscaling browser pool: {str(e)}")
+    
+    def _scale_once(self):
+        failed_tasks = []
+        with self._lock:
+            now = time.time()
+            
+            # Forget workers that exited; fail the task of any that crashed mid-task
+            for pid, worker in list(self._workers.items()):
+                if worker.process.is_alive():
+                    continue
+                del self._workers[pid]
+                if worker.stopping:
+                    continue
+                self._record_event("worker_exited", f"exit code {worker.process.exitcode}")
+                if worker.task_id is not None:
+                    failed_tasks.append((worker.task_id, worker.process.exitcode))
+            
+            active = self._active_worker_count()
+            idle = [worker for worker in self._workers.values() if worker.task_id is None and not worker.stopping]
+            queued = len(self._pending) + len(self._in_transit)
+            
+            if active < self.min_workers:
+                self.start_workers(self.min_workers - active, reason="below minimum")
+            elif queued > len(idle) and active < self.max_workers:
+                wanted = min(queued - len(idle), self.max_workers - active)
+                count = self._memory_allows(wanted)
+                if count:
+                    self.start_workers(count, reason=f"{queued} queued, {len(idle)} idle")
+                elif not self.events or self.events[-1]["action"] != "memory_limited":
+                    self._record_event("memory_limited", f"{queued} queued but memory budget is exhausted", 0)
+            elif queued == 0 and active > self.min_workers:
+                surplus = active - self.min_workers
+                for worker in sorted(idle, key=lambda worker: worker.idle_since):
+                    if surplus == 0 or now - worker.idle_since < self.idle_cooldown:
+                        break
+                    # Sent to this worker only, so the worker marked stopping is the one that exits
+                    worker.control_queue.put(("stop", None))
+                    worker.stopping = True
+                    surplus -= 1
+                    self._record_event("scale_down", f"idle for {now - worker.idle_since:.0f}s")
+            self._dispatch()
+        
+        task_store = get_task_store()
+        for task_id, exitcode in failed_tasks:
+            task_store.update(task_id, {
+                "status": "error",
+                "error": f"Browser worker exited unexpectedly with code {exitcode}",
+                "process_status": "error",
+                "monitor_status": "error"
+            })
+    
+    def stats(self) -> Dict[str, Any]:
+        """Utilization of each worker and recent scaling events"""
+        with self._lock:
+            now = time.time()
+            workers = [worker.stats(now) for worker in self._workers.values()]
+            return {
+                "min_workers": self.min_workers,
+                "max_workers": self.max_workers,
+                "workers": self._active_worker_count(),
+                "busy_workers": sum(1 for worker in workers if worker["busy"]),
+                "queued": len(self._pending) + len(self._in_transit),
+                "in_transit": len(self._in_transit),
+                "fair_share": self._pending.stats(),
+                "tasks_cancelled": self.tasks_cancelled,
+                "cancelling": len(self._cancelling),
+                "workers_terminated": self.workers_terminated,
+                "memory_per_worker_mb": self.memory_per_worker_mb,
+                "memory_budget_mb": self.memory_budget_mb,
+                "worker_details": workers,
+                "events": list(self.events)
+            }
+    
+    def is_saturated(self) -> bool:
+        """Whether a new task would be rejected with PoolSaturatedError"""
+        with self._lock:
+            return len(self._pending) >= self.max_queue_size
+    
+    def queue_position(self, task_id: str) -> int:
+        """Position of a task in the fair-share queue (1-based), or 0 if it is not queued"""
+        with self._lock:
+            return self._pending.position(task_id)
+    
+    def submit_task(self, task_id: str, query: str, module_name: str):
         """
         Submit a task to the process pool
         
@@ -279,106 +920,290 @@ class BrowserProcessPool:
             task_id: Unique identifier for the task
             query: User query/task description
             module_name: Module to run (e.g., "run_mini")
-            registry: Task registry to update with status
-        """
-        # Store reference to the registry without modifying its contents
-        self.task_registry = registry
             
-        # Put task in queue
+        Raises:
+            PoolSaturatedError: If the fair-share queue is full
+        """
         task = {
             "task_id": task_id,
             "query": query,
-            "module": module_name
+            "module": module_name,
+            "env": get_worker_env_config()
         }
         
         logger.info(f"Submitting task {task_id} to browser process pool")
-        self.input_queue.put(task)
+        # Set before the task can be picked up so the worker's status updates win
+        get_task_store().update(task_id, {
+            "process_status": "submitted",
+            "monitor_status": "waiting"
+        })
+        with self._lock:
+            if len(self._pending) >= self.max_queue_size:
+                raise PoolSaturatedError(len(self._pending), self.max_queue_size)
+            self._pending.push(task_id, task)
+            self._dispatch()
+            if task_id in self._pending:
+                get_task_store().update(task_id, {"process_status": "queued"})
+                logger.info(f"Task {task_id} queued at position {self._pending.position(task_id)}")
         
-        # Update registry with initial status
-        if task_id in registry:
-            registry[task_id].update({
-                "process_status": "submitted",
-                "monitor_status": "waiting"
-            })
+        # Let the autoscaler react now rather than at its next check
+        self._scale_wakeup.set()
+    
+    def _dispatch(self):
+        """Move queued tasks to the input queue while workers are free; must hold the lock"""
+        idle = [worker for worker in self._workers.values() if worker.task_id is None and not worker.stopping]
+        while self._pending and len(idle) > len(self._in_transit) and not self._shutting_down:
+            task = self._pending.pop()
+            try:
+                self.input_queue.put_nowait(task.item)
+            except queue.Full:
+                logger.error(f"Browser input queue is full, failing task {task.task_id}")
+                get_task_store().update(task.task_id, {
+                    "status": "error",
+                    "error": "Browser input queue is full",
+                    "process_status": "error"
+                })
+                continue
+            self._in_transit[task.task_id] = task.cost
+            get_task_store().update(task.task_id, {"queue_position": 0, "eta_seconds": 0})
+        
+        if self._pending:
+            now = time.time()
+            # Tasks in transit take the idle workers first
+            free_in = [max(worker.busy_since + worker.estimated_seconds - now, 0.0)
+                       for worker in self._workers.values() if worker.task_id is not None and not worker.stopping]
+            free_in += list(self._in_transit.values())
+            free_in += [0.0] * max(len(idle) - len(self._in_transit), 0)
+            self._pending.report(free_in)
+    
+    def _task_started(self, task_id: str, worker_pid: Optional[int]):
+        """Record that a worker picked up a task"""
+        with self._lock:
+            estimated_seconds = self._in_transit.pop(task_id, None)
+            if estimated_seconds is None:
+                return
+            worker = self._workers.get(worker_pid)
+            if worker is not None:
+                worker.task_id = task_id
+                worker.busy_since = time.time()
+                worker.estimated_seconds = estimated_seconds
+            cancel = task_id in self._cancel_on_start
+            self._cancel_on_start.pop(task_id, None)
+            # A stopping worker may have taken the task, leaving an idle one free
+            self._dispatch()
+        
+        if cancel:
+            # Cancelled while it was in transit (already counted); stop it as soon as the worker has it
+            self._cancel_running(task_id)
+    
+    def _task_finished(self, worker_pid: Optional[int]):
+        with self._lock:
+            worker = self._workers.get(worker_pid)
+            if worker is None:
+                return
+            now = time.time()
+            if worker.busy_since is not None:
+                worker.busy_seconds += now - worker.busy_since
+            released = self._cancelling.pop(worker.task_id, None)
+            if released is not None:
+                released.set()
+            worker.task_id = None
+            worker.busy_since = None
+            worker.idle_since = now
+            worker.tasks_served += 1
+            self._dispatch()
+    
+    def cancel_task(self, task_id: str):
+        """Cancel a queued or running task
+        
+        A queued task is dropped, and one already on the input queue is
+        cancelled as soon as a worker picks it up. A running task is sent a
+        cancel message; its worker is terminated if the task has not stopped
+        within ``cancel_grace`` seconds.
+        
+        Args:
+            task_id: Task identifier
+        """
+        # Only a task that is actually dropped, deferred or signalled counts as
+        # cancelled; repeated cancels of the same task are ignored
+        with self._lock:
+            if self._pending.remove(task_id) is not None:
+                self.tasks_cancelled += 1
+                logger.info(f"Task {task_id} removed from the browser queue")
+                get_task_store().update(task_id, {"queue_position": 0, "eta_seconds": 0})
+                self._dispatch()
+                return
+            in_transit = task_id in self._in_transit
+            if in_transit:
+                if task_id in self._cancel_on_start:
+                    return
+                self._cancel_on_start[task_id] = None
+                self.tasks_cancelled += 1
+        
+        if in_transit:
+            logger.info(f"Task {task_id} will be skipped when a browser worker picks it up")
+            return
+        if self._cancel_running(task_id):
+            with self._lock:
+                self.tasks_cancelled += 1
+    
+    def _cancel_running(self, task_id: str) -> bool:
+        """Send a cancel message to the worker running a task
+        
+        Args:
+            task_id: Task identifier
+            
+        Returns:
+            bool: False if no worker is running the task or it is already being cancelled
+        """
+        with self._lock:
+            worker = next((worker for worker in self._workers.values() if worker.task_id == task_id), None)
+            if worker is None or task_id in self._cancelling:
+                return False
+            released = self._cancelling[task_id] = threading.Event()
+        
+        try:
+            worker.control_queue.put(("cancel", task_id))
+        except Exception as e:
+            logger.error(f"Could not send cancel message for task {task_id}: {str(e)}")
+        logger.info(f"Asked browser worker {worker.process.pid} to cancel task {task_id}")
+        get_result_collector().call_later(self.cancel_grace, self._escalate_cancel, worker, task_id, released)
+        return True
+    
+    def _escalate_cancel(self, worker: _BrowserWorker, task_id: str, released: threading.Event):
+        """Result collector timer that terminates a worker which ignored its cancel message"""
+        if released.is_set():
+            logger.info(f"Task {task_id} stopped on browser worker {worker.process.pid}, worker kept")
+            return
+        
+        with self._lock:
+            self._cancelling.pop(task_id, None)
+            if self._workers.get(worker.process.pid) is not worker or worker.task_id != task_id:
+                return
+            # Stopping workers are forgotten by the autoscaler without failing their task
+            worker.stopping = True
+            self.workers_terminated += 1
+            self._record_event("terminate", f"task {task_id} did not stop within {self.cancel_grace}s")
+        
+        worker.process.terminate()
+        get_result_collector().call_later(self.terminate_timeout, self._kill_terminated, worker)
+        # Let the autoscaler replace it now rather than at its next check
+        self._scale_wakeup.set()
     
-    def _process_results(self):
-        """Thread function to process results from output queue"""
+    def _kill_terminated(self, worker: _BrowserWorker):
+        if worker.process.is_alive():
+            logger.warning(f"Browser worker {worker.process.pid} ignored SIGTERM, killing it")
+            worker.process.kill()
+        self._scale_wakeup.set()
+    
+    def _drain_results(self):
+        """Result collector callback handling every waiting worker update"""
         while True:
             try:
-                # Get result from queue with timeout
-                result = self.output_queue.get(timeout=0.5)
-                
-                # Process the result
-                if isinstance(result, dict) and "task_id" in result:
-                    task_id = result["task_id"]
-                    
-                    # Import the global registry to ensure we're working with the latest version
-                    from owl_api.services.owl_runner import TASK_REGISTRY as global_registry
-                    
-                    # Task registry persistence is critical for WebSocket updates
-                    # Always use the global registry first, then fall back to our reference
-                    if task_id in global_registry:
-                        registry_to_use = global_registry
-                        logger.info(f"Found task {task_id} in global registry")
-                    elif self.task_registry and task_id in self.task_registry:
-                        registry_to_use = self.task_registry
-                        logger.info(f"Found task {task_id} in class registry but not global registry")
-                    else:
-                        logger.warning(f"Received result for unknown task {task_id} - not in any registry")
-                        continue
-                        
-                    logger.info(f"Got update for task {task_id}: {result.get('status')}")
-                    
-                    # Handle different status updates
-                    if result.get("status") == "processing":
-                        # Update processing status and message
-                        registry_to_use[task_id].update({
-                            "process_status": result.get("status"),
-                            "monitor_status": result.get("message", "processing")
-                        })
-                        
-                        # Add browser mode if provided
-                        if "browser_mode" in result:
-                            registry_to_use[task_id]["browser_mode"] = result["browser_mode"]
-                            
-                    elif result.get("status") == "completed":
-                        # Task completed, update with result
-                        registry_to_use[task_id].update({
-                            "status": "completed",
-                            "result": result.get("result", {}),
-                            "process_status": "completed",
-                            "monitor_status": "completed"
-                        })
-                        
-                    elif result.get("status") == "error":
-                        # Error occurred, update with error message
-                        registry_to_use[task_id].update({
-                            "status": "error",
-                            "error": result.get("error", "Unknown error in browser process"),
-                            "process_status": "error",
-                            "monitor_status": "error"
-                        })
-                
+                result = self.output_queue.get_nowait()
             except queue.Empty:
-                # No results in queue, just continue
-                continue
-                
+                return
+            except (EOFError, OSError):
+                return
+            try:
+                self._handle_result(result)
             except Exception as e:
                 logger.error(f"Error processing result: {str(e)}")
     
+    def _handle_result(self, result: Any):
+        task_store = get_task_store()
+        if not isinstance(result, dict) or "task_id" not in result:
+            return
+        task_id = result["task_id"]
+        
+        if task_id not in task_store:
+            logger.warning(f"Received result for unknown task {task_id}")
+            return
+            
+        logger.info(f"Got update for task {task_id}: {result.get('status')}")
+        worker_pid = result.get("worker_pid")
+        
+        # Handle different status updates
+        if result.get("status") == "round":
+            # Streamed agent round; kept in the conversation store, not the task record
+            get_conversation_store().record_round(task_id, result.get("round", {}))
+            get_admission_controller().record_usage(task_id, result.get("round", {}).get("usage") or {})
+            get_task_event_bus().publish(task_id, "round", **result.get("round", {}))
+            
+        elif result.get("status") == "processing":
+            self._task_started(task_id, worker_pid)
+            
+            # Update processing status and message
+            updates = {
+                "process_status": result.get("status"),
+                "monitor_status": result.get("message", "processing"),
+                "progress_message": result.get("message")
+            }
+            
+            # Add browser mode if provided
+            if "browser_mode" in result:
+                updates["browser_mode"] = result["browser_mode"]
+            
+            task_store.update(task_id, updates)
+                
+        elif result.get("status") == "completed":
+            self._task_finished(worker_pid)
+            
+            # Task completed, update with result
+            task_store.update(task_id, {
+                "status": "completed",
+                "result": result.get("result", {}),
+                "process_status": "completed",
+                "monitor_status": "completed"
+            })
+            
+        elif result.get("status") == "cancelled":
+            self._task_finished(worker_pid)
+            
+            # The task is already cancelled in the store; only record that the worker stopped
+            task_store.update(task_id, {
+                "process_status": "cancelled",
+                "monitor_status": "cancelled"
+            })
+            
+        elif result.get("status") == "error":
+            self._task_finished(worker_pid)
+            
+            # Error occurred, update with error message
+            task_store.update(task_id, {
+                "status": "error",
+                "error": result.get("error", "Unknown error in browser process"),
+                "process_status": "error",
+                "monitor_status": "error"
+            })
+    
     def shutdown(self):
         """Shutdown the process pool and clean up resources"""
+        if self._shutting_down:
+            return
         logger.info("Shutting down BrowserProcessPool")
+        self._shutting_down = True
+        self._scale_wakeup.set()
+        get_result_collector().unwatch(self.output_queue)
+        with self._lock:
+            processes = [worker.process for worker in self._workers.values()]
+            self._workers.clear()
+            if self._pending:
+                logger.info(f"Dropped {len(self._pending)} queued browser tasks")
+            self._pending = TaskScheduler()
+            for released in self._cancelling.values():
+                released.set()
+            self._cancelling.clear()
         
         # Send stop signal to all workers
-        for _ in range(len(self.processes)):
+        for _ in range(len(processes)):
             try:
                 self.input_queue.put("STOP", timeout=1)
             except queue.Full:
                 logger.warning("Could not send STOP signal, queue is full")
         
         # Wait for processes to terminate
-        for p in self.processes:
+        for p in processes:
             try:
                 p.join(timeout=2)
                 if p.is_alive():
@@ -425,41 +1250,7 @@ def get_process_pool() -> ProcessPoolManager:
 def get_browser_process_pool() -> BrowserProcessPool:
     global _browser_process_pool
     if _browser_process_pool is None:
-        # Import global registry to ensure it's initialized
-        from owl_api.services.owl_runner import TASK_REGISTRY as global_registry
-        logger.info(f"Initializing browser process pool with global registry ID={id(global_registry)}")
-        
-        # Apply spawn-mode compatibility
-        # When using spawn mode, we need to ensure the registry is serializable
-        # and properly copied to child processes
-        try:
-            # Check if we're using spawn mode
-            import multiprocessing as mp
-            if hasattr(mp, 'get_start_method') and mp.get_start_method() == 'spawn':
-                logger.info("Using spawn mode for multiprocessing - applying additional fixes")
-                
-                # Ensure registry is prepared for sharing between processes
-                import os
-                # Use a shared manager to help with registry synchronization
-                from multiprocessing import Manager
-                
-                # Create a shared process manager
-                shared_manager = Manager()
-                
-                # Create an optimized namespace for communication
-                shared_namespace = shared_manager.Namespace()
-                
-                # This helps prevent resource leaks
-                os.environ["MULTIPROCESSING_SPAWN_WARNING"] = "1"
-        except Exception as e:
-            logger.error(f"Error during spawn mode setup: {str(e)}")
-        
-        # Create the browser process pool
         _browser_process_pool = BrowserProcessPool()
-        
-        # Set an explicit reference to the global registry
-        _browser_process_pool.task_registry = global_registry
-        logger.info(f"Browser process pool initialized with task_registry ID={id(_browser_process_pool.task_registry)}")
     return _browser_process_pool
 
 # Cleanup on module unload
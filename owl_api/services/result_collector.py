@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+import multiprocessing as mp
+import multiprocessing.connection
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ResultCollector:
+    """Runs the callbacks of every worker queue and process on one thread
+
+    A source is a multiprocessing queue, connection or process sentinel;
+    its callback runs whenever the source is readable (for a sentinel:
+    once the process has exited, after which the callback must unwatch
+    it). Once attached to the API's event loop each source is a
+    loop.add_reader registration, so callbacks run on the event loop as
+    soon as a message arrives. Before that, and on Windows, where the loop
+    cannot watch pipes, one thread waits on all sources at once with
+    multiprocessing.connection.wait. Timers from call_later run in the same
+    place, so nothing needs a thread per task or a polling timeout.
+
+    Callbacks must not block: once attached, they run on the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources: Dict[Any, Tuple[int, Callable[[], Any]]] = {}  # waitable -> (fd, callback)
+        self._timers: List[Tuple[float, int, Callable, tuple]] = []  # heap of (deadline, seq, callback, args)
+        self._sequence = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup_reader, self._wakeup_writer = mp.Pipe(duplex=False)
+
+    @staticmethod
+    def _waitable(source: Any) -> Any:
+        # multiprocessing.Queue has no public handle; its pipe's read end is readable while it holds messages
+        return getattr(source, "_reader", source)
+
+    def watch(self, source: Any, callback: Callable[[], Any]):
+        """Call a function whenever a source is readable
+
+        Args:
+            source: multiprocessing Queue, Connection or process sentinel
+            callback: Called with no arguments; for a queue it should drain it with get_nowait()
+        """
+        waitable = self._waitable(source)
+        fd = waitable if isinstance(waitable, int) else waitable.fileno()
+        with self._lock:
+            self._sources[waitable] = (fd, callback)
+            loop = self._loop
+        if loop is not None:
+            self._on_loop(loop, loop.add_reader, fd, self._run, callback)
+        else:
+            self._wake()
+
+    def unwatch(self, source: Any):
+        """Stop watching a source; call before closing it
+
+        Args:
+            source: Source passed to watch()
+        """
+        with self._lock:
+            entry = self._sources.pop(self._waitable(source), None)
+            loop = self._loop
+        if entry is None:
+            return
+        if loop is not None:
+            self._on_loop(loop, loop.remove_reader, entry[0])
+        else:
+            self._wake()
+
+    def call_later(self, delay: float, callback: Callable, *args):
+        """Run a function on the collector after a delay
+
+        Args:
+            delay: Seconds to wait
+            callback: Function to call
+            *args: Arguments for the function
+        """
+        with self._lock:
+            loop = self._loop
+            if loop is None:
+                heapq.heappush(self._timers, (time.monotonic() + delay, next(self._sequence), callback, args))
+        if loop is not None:
+            self._on_loop(loop, loop.call_later, delay, self._run, callback, *args)
+        else:
+            self._wake()
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Move every source and timer onto an event loop; call from that loop
+
+        Args:
+            loop: Running event loop
+        """
+        if os.name == "nt":
+            logger.info("Result collector stays on its thread: the event loop cannot watch pipes on Windows")
+            return
+        try:
+            loop.add_reader(self._wakeup_reader.fileno(), self._drain_wakeups)
+            loop.remove_reader(self._wakeup_reader.fileno())
+        except NotImplementedError:
+            logger.info("Result collector stays on its thread: the event loop has no add_reader")
+            return
+
+        with self._lock:
+            self._loop = loop
+            thread = self._thread
+        self._wake()
+        if thread is not None:
+            thread.join(timeout=1)
+
+        with self._lock:
+            sources = list(self._sources.values())
+            timers, self._timers = self._timers, []
+        now = time.monotonic()
+        for fd, callback in sources:
+            loop.add_reader(fd, self._run, callback)
+        for deadline, _, callback, args in timers:
+            loop.call_later(max(deadline - now, 0.0), self._run, callback, *args)
+        logger.info(f"Result collector attached to the event loop with {len(sources)} sources")
+
+    def detach(self):
+        """Move the sources back to the collector thread before the event loop stops
+
+        Pending call_later timers on the loop are dropped.
+        """
+        with self._lock:
+            loop, self._loop = self._loop, None
+            fds = [fd for fd, _ in self._sources.values()]
+        if loop is None:
+            return
+        for fd in fds:
+            loop.remove_reader(fd)
+        self._wake()
+
+    def _on_loop(self, loop: asyncio.AbstractEventLoop, function: Callable, *args):
+        """Call a loop method now if on the loop's thread, otherwise schedule it there"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            function(*args)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(function, *args)
+
+    def _run(self, callback: Callable, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Error in result collector callback {getattr(callback, '__qualname__', callback)}: "
+                         f"{str(e)}", exc_info=True)
+
+    def _wake(self):
+        """Make the collector thread look at its sources and timers again, starting it if needed"""
+        with self._lock:
+            if self._thread is None:
+                if self._loop is not None or not (self._sources or self._timers):
+                    return
+                self._thread = threading.Thread(target=self._run_thread, daemon=True, name="result-collector")
+                self._thread.start()
+                return
+        try:
+            self._wakeup_writer.send_bytes(b"\0")
+        except OSError:
+            pass
+
+    def _drain_wakeups(self):
+        while self._wakeup_reader.poll():
+            self._wakeup_reader.recv_bytes()
+
+    def _run_thread(self):
+        """Thread function that waits on every source until attached to an event loop"""
+        while True:
+            with self._lock:
+                if self._loop is not None or not (self._sources or self._timers):
+                    self._thread = None
+                    return
+                sources = {waitable: callback for waitable, (_, callback) in self._sources.items()
+                           if isinstance(waitable, int) or not waitable.closed}
+                timeout = max(self._timers[0][0] - time.monotonic(), 0.0) if self._timers else None
+
+            ready = multiprocessing.connection.wait([self._wakeup_reader, *sources], timeout)
+            for waitable in ready:
+                if waitable is self._wakeup_reader:
+                    self._drain_wakeups()
+                    continue
+                with self._lock:
+                    # Skip sources unwatched by an earlier callback in this round
+                    watched = waitable in self._sources
+                if watched:
+                    self._run(sources[waitable])
+
+            due = []
+            now = time.monotonic()
+            with self._lock:
+                while self._timers and self._timers[0][0] <= now:
+                    due.append(heapq.heappop(self._timers))
+            for _, _, callback, args in due:
+                self._run(callback, *args)
+
+
+_result_collector: Optional[ResultCollector] = None
+_result_collector_lock = threading.Lock()
+
+def get_result_collector() -> ResultCollector:
+    """Get the result collector shared by the process pools and the runner"""
+    global _result_collector
+    with _result_collector_lock:
+        if _result_collector is None:
+            _result_collector = ResultCollector()
+        return _result_collector
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import time
+import heapq
+import logging
+import collections
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple, Deque
+
+from owl_api.services.task_store import get_task_store
+
+logger = logging.getLogger(__name__)
+
+# Share of the workers each client gets per priority class, relative to batch
+PRIORITY_WEIGHTS = {"interactive": 4, "batch": 1}
+DEFAULT_PRIORITY = "interactive"
+
+# Task costs are estimated run times in seconds, clamped so a huge estimate cannot stall a round
+MIN_COST = 1.0
+MAX_COST_QUANTA = 8
+
+
+@dataclass(slots=True)
+class ScheduledTask:
+    """A task waiting in a FairShareQueue"""
+    task_id: str
+    item: Any
+    cost: float
+    enqueued_at: float
+
+
+@dataclass(slots=True)
+class _Flow:
+    """The waiting tasks of one client in one priority class"""
+    weight: int
+    tasks: Deque[ScheduledTask] = field(default_factory=collections.deque)
+    deficit: float = 0.0
+
+
+class FairShareQueue:
+    """Weighted deficit round robin over clients and priority classes
+
+    Each (priority, client) pair is a flow. Flows take turns; on its turn a
+    flow is credited ``quantum * weight`` seconds and runs its oldest
+    tasks while their estimated run time fits its credit. A client
+    submitting many tasks therefore gets one share of the workers, not one
+    slot per task, and an interactive flow gets four times the share of a
+    batch flow.
+
+    Not thread-safe: the pools call it under their own lock.
+    """
+
+    def __init__(self, quantum: float = 60.0):
+        """
+        Args:
+            quantum: Seconds of estimated run time a weight-1 flow is credited per turn
+        """
+        self.quantum = quantum
+        self._flows: Dict[Tuple[str, str], _Flow] = {}
+        self._ring: Deque[Tuple[str, str]] = collections.deque()
+        self._credited: Optional[Tuple[str, str]] = None
+        self._flow_of: Dict[str, Tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._flow_of)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._flow_of
+
+    def push(self, task_id: str, item: Any, client: str, priority: str, cost: float):
+        """Add a task
+
+        Args:
+            task_id: Task identifier
+            item: What the pool needs to run the task
+            client: Client the task is shared out by
+            priority: Priority class, one of PRIORITY_WEIGHTS
+            cost: Estimated run time in seconds
+        """
+        key = (priority, client)
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = self._flows[key] = _Flow(weight=PRIORITY_WEIGHTS.get(priority, 1))
+            self._ring.append(key)
+        cost = min(max(cost, MIN_COST), self.quantum * MAX_COST_QUANTA)
+        flow.tasks.append(ScheduledTask(task_id=task_id, item=item, cost=cost, enqueued_at=time.time()))
+        self._flow_of[task_id] = key
+
+    def pop(self) -> Optional[ScheduledTask]:
+        """Take the next task to run, or None if the queue is empty"""
+        while self._ring:
+            key = self._ring[0]
+            flow = self._flows[key]
+            if self._credited != key:
+                flow.deficit += self.quantum * flow.weight
+                self._credited = key
+            task = flow.tasks[0]
+            if task.cost <= flow.deficit:
+                flow.deficit -= task.cost
+                flow.tasks.popleft()
+                del self._flow_of[task.task_id]
+                if not flow.tasks:
+                    # An idle flow keeps no credit
+                    del self._flows[key]
+                    self._ring.popleft()
+                    self._credited = None
+                return task
+            self._ring.rotate(-1)
+            self._credited = None
+        return None
+
+    def remove(self, task_id: str) -> Optional[ScheduledTask]:
+        """Remove a waiting task
+
+        Args:
+            task_id: Task identifier
+
+        Returns:
+            Optional[ScheduledTask]: The task, or None if it was not waiting
+        """
+        key = self._flow_of.pop(task_id, None)
+        if key is None:
+            return None
+        flow = self._flows[key]
+        task = next(task for task in flow.tasks if task.task_id == task_id)
+        flow.tasks.remove(task)
+        if not flow.tasks:
+            del self._flows[key]
+            self._ring.remove(key)
+            if self._credited == key:
+                self._credited = None
+        return task
+
+    def flows(self) -> List[Dict[str, Any]]:
+        """Backlog of each flow in ring order"""
+        return [{"priority": priority, "client": client, "queued": len(self._flows[(priority, client)].tasks),
+                 "deficit": round(self._flows[(priority, client)].deficit, 1)}
+                for priority, client in self._ring]
+
+    def order(self) -> List[ScheduledTask]:
+        """The waiting tasks in the order they would run if nothing else arrived"""
+        clone = FairShareQueue(self.quantum)
+        clone._flows = {key: _Flow(weight=flow.weight, tasks=collections.deque(flow.tasks), deficit=flow.deficit)
+                        for key, flow in self._flows.items()}
+        clone._ring = collections.deque(self._ring)
+        clone._credited = self._credited
+        clone._flow_of = dict(self._flow_of)
+        ordered = []
+        while True:
+            task = clone.pop()
+            if task is None:
+                return ordered
+            ordered.append(task)
+
+
+def _estimated_seconds(module_name: str) -> float:
+    # Imported here: the admission controller imports PRIORITY_WEIGHTS from this module
+    from owl_api.services.admission import get_admission_controller
+    return get_admission_controller().estimate(module_name)[1]
+
+
+class TaskScheduler:
+    """Fair-share queue of a pool's waiting tasks, with position and ETA reporting
+
+    The client and priority of a task are read from its record in the task
+    store (``requester`` or ``client_id``, and ``priority``), and its cost
+    is the admission controller's run time estimate for its module.
+    """
+
+    def __init__(self, quantum: float = 60.0):
+        """
+        Args:
+            quantum: Seconds of estimated run time a weight-1 flow is credited per turn
+        """
+        self._queue = FairShareQueue(quantum)
+        self._reported: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._queue
+
+    def push(self, task_id: str, item: Any):
+        """Add a task
+
+        Args:
+            task_id: Task identifier
+            item: What the pool needs to run the task
+        """
+        task_info = get_task_store().get(task_id) or {}
+        client = task_info.get("requester") or task_info.get("client_id") or "anonymous"
+        priority = task_info.get("priority") or DEFAULT_PRIORITY
+        self._queue.push(task_id, item, client, priority, _estimated_seconds(task_info.get("module", "")))
+
+    def pop(self) -> Optional[ScheduledTask]:
+        """Take the next task to run, or None if none is waiting"""
+        task = self._queue.pop()
+        if task is not None:
+            self._reported.pop(task.task_id, None)
+        return task
+
+    def remove(self, task_id: str) -> Optional[ScheduledTask]:
+        """Remove a waiting task
+
+        Args:
+            task_id: Task identifier
+
+        Returns:
+            Optional[ScheduledTask]: The task, or None if it was not waiting
+        """
+        self._reported.pop(task_id, None)
+        return self._queue.remove(task_id)
+
+    def task_ids(self) -> List[str]:
+        """Ids of the waiting tasks in the order they would run"""
+        return [task.task_id for task in self._queue.order()]
+
+    def position(self, task_id: str) -> int:
+        """Position of a task (1-based), or 0 if it is not waiting"""
+        for position, task in enumerate(self._queue.order(), 1):
+            if task.task_id == task_id:
+                return position
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Queued tasks per priority class and per flow"""
+        flows = self._queue.flows()
+        return {
+            "quantum": self._queue.quantum,
+            "priority_weights": PRIORITY_WEIGHTS,
+            "queued_by_priority": {priority: sum(flow["queued"] for flow in flows if flow["priority"] == priority)
+                                   for priority in PRIORITY_WEIGHTS},
+            "flows": flows
+        }
+
+    def report(self, busy_remaining: List[float]):
+        """Publish the queue position and ETA of every waiting task
+
+        The ETA assigns the tasks, in run order, to whichever worker is
+        expected to be free first. Only changed positions, or ETAs that moved
+        by more than five seconds, are published.
+
+        Args:
+            busy_remaining: Expected seconds until each worker is free (0 if idle)
+        """
+        free_at = list(busy_remaining) or [0.0]
+        heapq.heapify(free_at)
+        task_store = get_task_store()
+        for position, task in enumerate(self._queue.order(), 1):
+            start = heapq.heappop(free_at)
+            heapq.heappush(free_at, start + task.cost)
+            eta = int(start)
+            previous = self._reported.get(task.task_id)
+            if previous is not None and previous[0] == position and abs(previous[1] - eta) <= 5:
+                continue
+            self._reported[task.task_id] = (position, eta)
+            task_store.update(task.task_id, {"queue_position": position, "eta_seconds": eta})
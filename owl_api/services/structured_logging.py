@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import os
+import gzip
+import atexit
+import json
+import shutil
+import logging
+import datetime
+import threading
+import multiprocessing as mp
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+# Name of the structured log in the log directory; rotated files get .1.gz, .2.gz, ...
+JSON_LOG_FILENAME = "owl_api.jsonl"
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_log_queue = None
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+def get_log_level() -> int:
+    """Log level from OWL_LOG_LEVEL, INFO by default"""
+    level = logging.getLevelName(os.environ.get("OWL_LOG_LEVEL", "INFO").upper())
+    # getLevelName returns a "Level X" string for unknown names
+    return level if isinstance(level, int) else logging.INFO
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line
+
+    Tracebacks go into their own field, so an entry never spans lines.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": record.created,
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "source": getattr(record, "source", "api"),
+            "pid": record.process,
+        }
+        task_id = getattr(record, "task_id", None)
+        if task_id:
+            data["task_id"] = task_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _StructuredQueueHandler(QueueHandler):
+    """QueueHandler that keeps the exception separate from the message
+
+    The stock handler folds the traceback into ``msg``; this one renders the
+    message and traceback to strings (so the record pickles) but keeps them
+    apart for JsonFormatter, and stamps the process's source.
+    """
+
+    def __init__(self, log_queue, source: str):
+        super().__init__(log_queue)
+        self.source = source
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, "source"):
+            record.source = self.source
+        return record
+
+
+class _CompressedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that gzips the files it rotates out"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str):
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+def get_log_queue():
+    """Get the queue worker processes send their log records to
+
+    Returns:
+        multiprocessing.Queue: The queue, or None before start_log_listener()
+    """
+    return _log_queue
+
+def start_log_listener(log_directory: str, max_bytes: int = 50 * 1024 * 1024,
+                       backup_count: int = 20, console: bool = True) -> str:
+    """Route all logging in the API process through one listener thread
+
+    The listener writes every record, from this process and from workers
+    configured with configure_worker_logging(), to a rotated JSONL file.
+    Calling it again returns the existing log path.
+
+    Args:
+        log_directory: Directory for the JSONL log
+        max_bytes: Size at which the log is rotated and compressed
+        backup_count: Number of compressed files to keep
+        console: Whether to also print records to stderr as text
+
+    Returns:
+        str: Path to the JSONL log
+    """
+    global _log_queue, _listener
+    log_path = os.path.join(log_directory, JSON_LOG_FILENAME)
+    with _lock:
+        if _listener is not None:
+            return log_path
+
+        os.makedirs(log_directory, exist_ok=True)
+        file_handler = _CompressedRotatingFileHandler(log_path, max_bytes, backup_count)
+        file_handler.setFormatter(JsonFormatter())
+        handlers = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            handlers.append(console_handler)
+
+        # Workers are spawned, and spawned processes cannot share a queue made by a fork context
+        _log_queue = mp.get_context("spawn").Queue()
+        _listener = QueueListener(_log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_log_listener)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_StructuredQueueHandler(_log_queue, "api"))
+        root.setLevel(get_log_level())
+    return log_path
+
+def stop_log_listener():
+    """Flush queued records and stop the listener"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def configure_worker_logging(log_queue, source: str):
+    """Send this worker process's logging to the API's listener
+
+    Replaces any handlers on the root logger. Without a queue (a worker
+    started outside the API) records go to stderr as text.
+
+    Args:
+        log_queue: Queue from get_log_queue() in the parent process
+        source: Source name recorded on every entry, e.g. "browser"
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if log_queue is not None:
+        root.addHandler(_StructuredQueueHandler(log_queue, source))
+    else:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(get_log_level())
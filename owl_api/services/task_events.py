@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Task statuses after which no further updates are expected
+TERMINAL_STATUSES = ("completed", "error", "cancelled")
+
+def json_safe(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an event payload to plain JSON types
+
+    Round records carry tool call arguments and results of arbitrary types;
+    this makes them safe to pickle across processes and send to clients.
+
+    Args:
+        data: Event payload
+
+    Returns:
+        Dict[str, Any]: Payload with non-JSON values converted to strings
+    """
+    return json.loads(json.dumps(data, default=str))
+
+
+class TaskSubscription:
+    """Queue of events for a single task, bound to the subscriber's event loop"""
+
+    def __init__(self, bus: "TaskEventBus", task_id: str, loop: asyncio.AbstractEventLoop):
+        self.bus = bus
+        self.task_id = task_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next event
+
+        Args:
+            timeout: Maximum number of seconds to wait, or None to wait forever
+
+        Returns:
+            Optional[Dict[str, Any]]: The next event, or None if the timeout expired
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        """Stop receiving events for this task"""
+        self.bus.unsubscribe(self)
+
+
+class TaskEventBus:
+    """Publish/subscribe channel for task status, heartbeat and result events
+
+    Publishers may run on any thread (monitor threads, the browser results
+    thread, worker threads running societies). Events are handed to each
+    subscriber's event loop with call_soon_threadsafe, so subscribers are
+    woken only when something actually happens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[TaskSubscription]] = {}
+
+    def subscribe(self, task_id: str) -> TaskSubscription:
+        """Subscribe to events for a task
+
+        Must be called from a running event loop; events are delivered on that loop.
+
+        Args:
+            task_id: Task identifier
+
+        Returns:
+            TaskSubscription: Subscription to read events from
+        """
+        subscription = TaskSubscription(self, task_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: TaskSubscription):
+        """Remove a subscription
+
+        Args:
+            subscription: Subscription returned by subscribe()
+        """
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.task_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.task_id]
+
+    def publish(self, task_id: str, event_type: str, **data):
+        """Publish an event for a task
+
+        Args:
+            task_id: Task identifier
+            event_type: Event type ("status", "progress", "heartbeat", "round")
+            **data: Event payload, typically the task fields that changed
+        """
+        with self._lock:
+            subscriptions = list(self._subscribers.get(task_id, ()))
+        if not subscriptions:
+            return
+
+        event = {"type": event_type, "task_id": task_id, "time": time.time(), **data}
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                logger.warning(f"Dropping subscription for task {task_id}: event loop is closed")
+                self.unsubscribe(subscription)
+
+
+# Global task event bus, created eagerly so publisher threads never race to create it
+_task_event_bus = TaskEventBus()
+
+def get_task_event_bus() -> TaskEventBus:
+    return _task_event_bus
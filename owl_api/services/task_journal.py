@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import os
+import json
+import logging
+import threading
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+class TaskJournal:
+    """Append-only JSON lines journal of task state changes
+
+    Every create/update/delete is written as one compact record:
+    ``{"id": <task_id>, "u": {<changed fields>}}`` or
+    ``{"id": <task_id>, "d": 1}`` for deletions. Replaying the records in
+    order rebuilds the task store. Compaction rewrites the journal as one
+    record per live task, so the file only grows with activity between
+    compactions.
+    """
+
+    def __init__(self, path: str, min_compact_records: int = 10000, compact_ratio: int = 4):
+        """
+        Args:
+            path: Journal file path
+            min_compact_records: Never compact journals with fewer records than this
+            compact_ratio: Compact once there are this many records per live task
+        """
+        self.path = path
+        self.min_compact_records = min_compact_records
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._file = None
+        self._records = 0
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def _write(self, record: Dict[str, Any]):
+        self._open()
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+        self._file.flush()
+        self._records += 1
+
+    def append(self, task_id: str, updates: Dict[str, Any]):
+        """Append the fields changed by one state transition
+
+        Args:
+            task_id: Task identifier
+            updates: Changed task fields
+        """
+        try:
+            with self._lock:
+                self._write({"id": task_id, "u": updates})
+        except Exception as e:
+            logger.error(f"Error appending to task journal {self.path}: {str(e)}")
+
+    def append_delete(self, task_id: str):
+        """Append a deletion record
+
+        Args:
+            task_id: Task identifier
+        """
+        try:
+            with self._lock:
+                self._write({"id": task_id, "d": 1})
+        except Exception as e:
+            logger.error(f"Error appending to task journal {self.path}: {str(e)}")
+
+    def replay(self) -> Dict[str, Dict[str, Any]]:
+        """Rebuild task state from the journal
+
+        A truncated last line (from a crash mid-write) is skipped.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Task fields keyed by task id
+        """
+        tasks: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return tasks
+
+        records = 0
+        with self._lock, open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable task journal record at line {line_number}")
+                    continue
+                records += 1
+                task_id = record.get("id")
+                if record.get("d"):
+                    tasks.pop(task_id, None)
+                else:
+                    tasks.setdefault(task_id, {}).update(record.get("u", {}))
+            self._records = records
+
+        logger.info(f"Replayed {records} task journal records into {len(tasks)} tasks")
+        return tasks
+
+    def needs_compaction(self, live_tasks: int) -> bool:
+        """Whether the journal has grown enough to be worth compacting
+
+        Args:
+            live_tasks: Number of tasks currently in the store
+
+        Returns:
+            bool: True if compact() should be called
+        """
+        return (self._records >= self.min_compact_records
+                and self._records >= self.compact_ratio * max(live_tasks, 1))
+
+    def compact(self, tasks: Dict[str, Dict[str, Any]]):
+        """Rewrite the journal as one record per live task
+
+        The new journal is written to a temporary file and renamed over the
+        old one, so a crash during compaction leaves the old journal intact.
+
+        Args:
+            tasks: Current task fields keyed by task id
+        """
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for task_id, fields in tasks.items():
+                        f.write(json.dumps({"id": task_id, "u": fields}, ensure_ascii=False,
+                                           separators=(",", ":"), default=str) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                os.replace(tmp_path, self.path)
+                self._records = len(tasks)
+                logger.info(f"Compacted task journal {self.path} to {len(tasks)} records")
+            except Exception as e:
+                logger.error(f"Error compacting task journal {self.path}: {str(e)}")
+
+    def close(self):
+        """Close the journal file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
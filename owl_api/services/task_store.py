@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Iterable, Callable
+
+from owl_api.services.task_events import get_task_event_bus, TERMINAL_STATUSES
+from owl_api.services.task_journal import TaskJournal
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class TaskRecord:
+    """State of a single task
+
+    Frequently read fields are stored as attributes; everything else the
+    runner and the process pools report (process_status, monitor_status,
+    heartbeats, ...) goes into ``extra``.
+    """
+    task_id: str
+    status: str = "processing"
+    query: str = ""
+    module: str = ""
+    client_id: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    browser_mode: Optional[str] = None
+    browser_pool: Optional[bool] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the task as a plain dictionary, omitting unset fields"""
+        data = {
+            "status": self.status,
+            "query": self.query,
+            "module": self.module,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+        for name in ("client_id", "result", "error", "browser_mode", "browser_pool"):
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        data.update(self.extra)
+        return data
+
+
+# Fields stored as TaskRecord attributes rather than in TaskRecord.extra
+_RECORD_FIELDS = frozenset(
+    ("status", "query", "module", "client_id", "created_at", "updated_at",
+     "result", "error", "browser_mode", "browser_pool")
+)
+
+
+class TaskStore:
+    """Thread-safe store of task records
+
+    The uvicorn event loop, monitor threads and the browser results thread
+    all update tasks concurrently; every read and write goes through a
+    single lock. Tasks are indexed by id, status and client id so lookups
+    and filtered listings never scan the whole store. Each change is
+    published on the task event bus and, once a journal is attached,
+    appended to it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tasks: Dict[str, TaskRecord] = {}
+        # Insertion-ordered dicts used as ordered sets of task ids
+        self._by_status: Dict[str, Dict[str, None]] = {}
+        self._by_client: Dict[str, Dict[str, None]] = {}
+        self._journal: Optional[TaskJournal] = None
+        self._terminal_listeners: List[Callable[[str, str], None]] = []
+
+    def __contains__(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._tasks
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tasks)
+
+    def attach_journal(self, journal: TaskJournal):
+        """Record every subsequent change in a journal
+
+        Args:
+            journal: Journal to append changes to
+        """
+        with self._lock:
+            self._journal = journal
+
+    def compact_journal(self) -> bool:
+        """Compact the attached journal if it has grown enough
+
+        Returns:
+            bool: Whether the journal was compacted
+        """
+        with self._lock:
+            if self._journal is None or not self._journal.needs_compaction(len(self._tasks)):
+                return False
+            # Holding the store lock keeps appends out until the rewrite is done
+            self._journal.compact({task_id: record.to_dict() for task_id, record in self._tasks.items()})
+            return True
+
+    def add_terminal_listener(self, listener: Callable[[str, str], None]):
+        """Call a function whenever a task reaches a terminal status
+
+        The listener runs on the thread that made the change, after the
+        store lock is released.
+
+        Args:
+            listener: Called with the task id and its new status
+        """
+        with self._lock:
+            self._terminal_listeners.append(listener)
+
+    def _notify_terminal(self, task_id: str, status: str):
+        for listener in list(self._terminal_listeners):
+            try:
+                listener(task_id, status)
+            except Exception as e:
+                logger.error(f"Terminal status listener failed for task {task_id}: {str(e)}")
+
+    def _index(self, record: TaskRecord):
+        self._by_status.setdefault(record.status, {})[record.task_id] = None
+        if record.client_id:
+            self._by_client.setdefault(record.client_id, {})[record.task_id] = None
+
+    def _unindex(self, record: TaskRecord):
+        status_ids = self._by_status.get(record.status)
+        if status_ids is not None:
+            status_ids.pop(record.task_id, None)
+            if not status_ids:
+                del self._by_status[record.status]
+        if record.client_id:
+            client_ids = self._by_client.get(record.client_id)
+            if client_ids is not None:
+                client_ids.pop(record.task_id, None)
+                if not client_ids:
+                    del self._by_client[record.client_id]
+
+    def _apply(self, record: TaskRecord, updates: Dict[str, Any]):
+        self._unindex(record)
+        for key, value in updates.items():
+            if key == "task_id":
+                continue
+            if key in _RECORD_FIELDS:
+                setattr(record, key, value)
+            else:
+                record.extra[key] = value
+        record.updated_at = time.time()
+        self._index(record)
+
+    def create(self, task_id: str, query: str = "", module: str = "",
+               client_id: Optional[str] = None, **fields) -> Dict[str, Any]:
+        """Create a task, or restart an existing one in the processing state
+
+        Args:
+            task_id: Task identifier
+            query: User query
+            module: Example module name
+            client_id: Owning WebSocket client, if any
+            **fields: Additional task fields
+
+        Returns:
+            Dict[str, Any]: Snapshot of the task
+        """
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is None:
+                record = TaskRecord(task_id=task_id, query=query, module=module, client_id=client_id)
+                self._tasks[task_id] = record
+                self._apply(record, fields)
+            else:
+                updates = {"status": "processing", "query": query, "module": module, **fields}
+                if client_id is not None:
+                    updates["client_id"] = client_id
+                self._apply(record, updates)
+            snapshot = record.to_dict()
+            if self._journal is not None:
+                self._journal.append(task_id, snapshot)
+        get_task_event_bus().publish(task_id, "status", **snapshot)
+        return snapshot
+
+    def update(self, task_id: str, updates: Dict[str, Any], event_type: Optional[str] = None) -> bool:
+        """Update fields of a task and publish the change
+
+        A task that has reached a terminal status keeps it: updates that try
+        to move it to another status are ignored.
+
+        Args:
+            task_id: Task identifier
+            updates: Fields to set on the task
+            event_type: Event type to publish; defaults to "status" when the
+                update sets a status and "progress" otherwise
+
+        Returns:
+            bool: Whether the update was applied
+        """
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is None:
+                logger.warning(f"Ignoring update for unknown task {task_id}")
+                return False
+            new_status = updates.get("status")
+            if (new_status is not None and new_status != record.status
+                    and record.status in TERMINAL_STATUSES):
+                logger.info(f"Ignoring {new_status} update for task {task_id}: already {record.status}")
+                return False
+            finished = new_status in TERMINAL_STATUSES and new_status != record.status
+            self._apply(record, updates)
+            if self._journal is not None:
+                self._journal.append(task_id, updates)
+
+        if event_type is None:
+            event_type = "status" if "status" in updates else "progress"
+        get_task_event_bus().publish(task_id, event_type, **updates)
+        if finished:
+            self._notify_terminal(task_id, new_status)
+        return True
+
+    def transition(self, task_id: str, new_status: str, from_statuses: Iterable[str],
+                   updates: Optional[Dict[str, Any]] = None) -> bool:
+        """Atomically move a task to a new status if it is in one of the given statuses
+
+        Args:
+            task_id: Task identifier
+            new_status: Status to move to
+            from_statuses: Statuses the task must currently be in
+            updates: Additional fields to set with the transition
+
+        Returns:
+            bool: Whether the transition happened
+        """
+        updates = {**(updates or {}), "status": new_status}
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is None or record.status not in tuple(from_statuses):
+                return False
+            finished = new_status in TERMINAL_STATUSES and new_status != record.status
+            self._apply(record, updates)
+            if self._journal is not None:
+                self._journal.append(task_id, updates)
+        get_task_event_bus().publish(task_id, "status", **updates)
+        if finished:
+            self._notify_terminal(task_id, new_status)
+        return True
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of a task
+
+        Args:
+            task_id: Task identifier
+
+        Returns:
+            Optional[Dict[str, Any]]: Task fields, or None if the task does not exist
+        """
+        with self._lock:
+            record = self._tasks.get(task_id)
+            return record.to_dict() if record is not None else None
+
+    def get_status(self, task_id: str) -> Optional[str]:
+        """Get the status of a task without copying the record
+
+        Args:
+            task_id: Task identifier
+
+        Returns:
+            Optional[str]: Task status, or None if the task does not exist
+        """
+        with self._lock:
+            record = self._tasks.get(task_id)
+            return record.status if record is not None else None
+
+    def list(self, limit: int = 10, status: Optional[str] = None,
+             client_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List the most recent tasks, newest last
+
+        Args:
+            limit: Maximum number of tasks to return
+            status: Only return tasks with this status
+            client_id: Only return tasks owned by this client
+
+        Returns:
+            List[Dict[str, Any]]: Task snapshots including their task_id
+        """
+        with self._lock:
+            if status is not None and client_id is not None:
+                # Walk the smaller index and probe the other
+                status_ids = self._by_status.get(status, {})
+                client_ids = self._by_client.get(client_id, {})
+                walk, probe = (status_ids, client_ids) if len(status_ids) <= len(client_ids) else (client_ids, status_ids)
+                candidates = (task_id for task_id in reversed(walk) if task_id in probe)
+            elif status is not None:
+                candidates = reversed(self._by_status.get(status, {}))
+            elif client_id is not None:
+                candidates = reversed(self._by_client.get(client_id, {}))
+            else:
+                candidates = reversed(self._tasks)
+
+            # Status indexes are ordered by last transition; restore creation order
+            records = []
+            for task_id in candidates:
+                records.append(self._tasks[task_id])
+                if len(records) >= limit:
+                    break
+            records.sort(key=lambda record: record.created_at)
+            return [{"task_id": record.task_id, **record.to_dict()} for record in records]
+
+    def task_ids_for_client(self, client_id: str) -> List[str]:
+        """Get the ids of all tasks owned by a client
+
+        Args:
+            client_id: Client identifier
+
+        Returns:
+            List[str]: Task identifiers
+        """
+        with self._lock:
+            return list(self._by_client.get(client_id, {}))
+
+    def delete(self, task_id: str) -> bool:
+        """Remove a task from the store
+
+        Args:
+            task_id: Task identifier
+
+        Returns:
+            bool: Whether the task existed
+        """
+        with self._lock:
+            record = self._tasks.pop(task_id, None)
+            if record is None:
+                return False
+            self._unindex(record)
+            if self._journal is not None:
+                self._journal.append_delete(task_id)
+            return True
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get a copy of every task, keyed by task id"""
+        with self._lock:
+            return {task_id: record.to_dict() for task_id, record in self._tasks.items()}
+
+    def load(self, tasks: Dict[str, Dict[str, Any]]):
+        """Add tasks from a previous run without publishing or journaling them
+
+        Args:
+            tasks: Task fields keyed by task id
+        """
+        with self._lock:
+            for task_id, data in tasks.items():
+                if task_id in self._tasks:
+                    continue
+                record = TaskRecord(task_id=task_id)
+                self._tasks[task_id] = record
+                self._apply(record, data)
+                if "updated_at" in data:
+                    record.updated_at = data["updated_at"]
+
+
+# Global task store, created eagerly so worker threads never race to create it
+_task_store = TaskStore()
+
+def get_task_store() -> TaskStore:
+    return _task_store
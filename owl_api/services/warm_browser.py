@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ========= Copyright 2023-2024 @ CAMEL-AI.org. All Rights Reserved. =========
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _LeasedBrowser:
+    """A task's view of a shared browser; close() only closes its own contexts"""
+
+    def __init__(self, host: "WarmBrowserHost", browser):
+        self._host = host
+        self._browser = browser
+        self._contexts: List[Any] = []
+
+    def new_context(self, *args, **kwargs):
+        context = self._browser.new_context(*args, **kwargs)
+        self._contexts.append(context)
+        self._host._track(context)
+        return context
+
+    def new_page(self, *args, **kwargs):
+        # Browser.new_page() creates an implicit context; give it a tracked one instead
+        return self.new_context(*args, **kwargs).new_page()
+
+    def close(self, *args, **kwargs):
+        for context in self._contexts:
+            self._host._close_context(context)
+        self._contexts.clear()
+
+    def __getattr__(self, name):
+        return getattr(self._browser, name)
+
+
+class _WarmBrowserType:
+    """Proxy for playwright.chromium that reuses launched browsers"""
+
+    def __init__(self, host: "WarmBrowserHost", browser_type):
+        self._host = host
+        self._browser_type = browser_type
+
+    def launch(self, *args, **kwargs):
+        return _LeasedBrowser(self._host, self._host._get_browser(self._browser_type, args, kwargs))
+
+    def __getattr__(self, name):
+        # launch_persistent_context, connect, ... are passed through unchanged
+        return getattr(self._browser_type, name)
+
+
+class _WarmPlaywright:
+    """Proxy for a started Playwright instance whose stop() is a no-op"""
+
+    def __init__(self, host: "WarmBrowserHost", playwright):
+        self._host = host
+        self._playwright = playwright
+        self.chromium = _WarmBrowserType(host, playwright.chromium)
+
+    def stop(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._playwright, name)
+
+
+class _WarmPlaywrightContextManager:
+    """Stand-in for the object returned by sync_playwright()"""
+
+    def __init__(self, host: "WarmBrowserHost"):
+        self._host = host
+
+    def start(self):
+        return self._host.playwright()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class WarmBrowserHost:
+    """Keeps one Playwright driver and warm browsers alive in a worker process
+
+    camel's BrowserToolkit starts a Playwright driver and launches a new
+    Chromium for every society. Once installed, ``sync_playwright()`` returns
+    a proxy: the driver is started once, ``chromium.launch()`` hands out a
+    lease on an already running browser, and closing the lease only closes
+    the contexts it created. Each task gets fresh, isolated contexts on a
+    browser process that serves many tasks.
+
+    Playwright's sync API is bound to the thread that started it, so calls
+    from any other thread fall back to the original sync_playwright().
+    """
+
+    def __init__(self):
+        self._original_sync_playwright = None
+        self._thread_id: Optional[int] = None
+        self._playwright = None
+        self._proxy: Optional[_WarmPlaywright] = None
+        self._browsers: Dict[Tuple, Any] = {}
+        self._open_contexts: List[Any] = []
+        self.launches = 0
+        self.leases = 0
+
+    def install(self) -> bool:
+        """Route sync_playwright() through this host
+
+        Returns:
+            bool: Whether Playwright is available
+        """
+        try:
+            import playwright.sync_api as sync_api
+        except ImportError:
+            logger.warning("Playwright is not installed, browsers will not be kept warm")
+            return False
+
+        self._original_sync_playwright = sync_api.sync_playwright
+        self._thread_id = threading.get_ident()
+        sync_api.sync_playwright = self._sync_playwright
+
+        # Modules that imported sync_playwright at import time keep their own reference
+        try:
+            import camel.toolkits.browser_toolkit as browser_toolkit
+            if hasattr(browser_toolkit, "sync_playwright"):
+                browser_toolkit.sync_playwright = self._sync_playwright
+        except ImportError:
+            pass
+        return True
+
+    def _sync_playwright(self):
+        if self._thread_id != threading.get_ident():
+            return self._original_sync_playwright()
+        return _WarmPlaywrightContextManager(self)
+
+    def playwright(self) -> _WarmPlaywright:
+        """Start the Playwright driver if needed and return the shared instance"""
+        if self._proxy is None:
+            self._playwright = self._original_sync_playwright().start()
+            self._proxy = _WarmPlaywright(self, self._playwright)
+            logger.info("Started shared Playwright driver")
+        return self._proxy
+
+    def _get_browser(self, browser_type, args: tuple, kwargs: Dict[str, Any]):
+        key = (browser_type.name, args, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+        browser = self._browsers.get(key)
+        if browser is not None and browser.is_connected():
+            self.leases += 1
+            return browser
+
+        browser = browser_type.launch(*args, **kwargs)
+        self._browsers[key] = browser
+        self.launches += 1
+        self.leases += 1
+        logger.info(f"Launched warm {browser_type.name} browser ({kwargs})")
+        return browser
+
+    def _track(self, context):
+        self._open_contexts.append(context)
+
+    def _close_context(self, context):
+        try:
+            context.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser context: {str(e)}")
+        if context in self._open_contexts:
+            self._open_contexts.remove(context)
+
+    def release_contexts(self) -> int:
+        """Close every context opened since the last call
+
+        Called after each task so no pages, cookies or storage leak into the next one.
+
+        Returns:
+            int: Number of contexts closed
+        """
+        contexts = list(self._open_contexts)
+        for context in contexts:
+            self._close_context(context)
+        return len(contexts)
+
+    def stats(self) -> Dict[str, int]:
+        """Browser launch and reuse counters"""
+        return {
+            "browsers": len(self._browsers),
+            "launches": self.launches,
+            "leases": self.leases
+        }
+
+    def shutdown(self):
+        """Close all browsers and stop the driver"""
+        self.release_contexts()
+        for browser in self._browsers.values():
+            try:
+                browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {str(e)}")
+        self._browsers.clear()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping Playwright: {str(e)}")
+            self._playwright = None
+            self._proxy = None
+
+
+class ModelBackendCache:
+    """Memoizes ModelFactory.create per example module
+
+    Model backends only hold a client and configuration, so a module that
+    builds the same models for every society can share them across tasks.
+    """
+
+    def __init__(self):
+        self._original_create = None
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._scope: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def install(self) -> bool:
+        """Wrap ModelFactory.create
+
+        Returns:
+            bool: Whether camel is available
+        """
+        try:
+            from camel.models import ModelFactory
+        except ImportError:
+            logger.warning("camel is not installed, model backends will not be cached")
+            return False
+
+        self._original_create = ModelFactory.create
+        cache = self
+
+        def create(*args, **kwargs):
+            return cache._create(args, kwargs)
+
+        ModelFactory.create = staticmethod(create)
+        return True
+
+    def _create(self, args: tuple, kwargs: Dict[str, Any]):
+        if self._scope is None:
+            return self._original_create(*args, **kwargs)
+
+        key = repr((args, sorted(kwargs.items())))
+        module_cache = self._cache.setdefault(self._scope, {})
+        cached = module_cache.get(key)
+        if cached is None:
+            self.misses += 1
+            platform = kwargs.get("model_platform", args[0] if args else None)
+            model = self._original_create(*args, **kwargs)
+            module_cache[key] = (getattr(platform, "name", None), model)
+            return model
+        self.hits += 1
+        return cached[1]
+
+    def invalidate_env(self, changed_keys: List[str]) -> int:
+        """Drop models that may read one of the changed variables
+
+        All of a module's models are dropped when a changed variable is one
+        its execution profile reads, e.g. OPENAI_COMPATIBLE_MODEL or
+        QWEN_API_KEY for run_openai_compatible_model. A model is also dropped
+        when the variable is its platform's key in PLATFORM_ENV_VARS or
+        starts with the platform's family name, e.g. OPENAI_API_BASE_URL,
+        which camel reads on the module's behalf. Models of an unknown
+        platform or module are dropped on any change.
+
+        Args:
+            changed_keys: Names of the environment variables that changed
+
+        Returns:
+            int: Number of models dropped
+        """
+        if not changed_keys:
+            return 0
+        from owl_api.services.module_manager import PLATFORM_ENV_VARS, get_execution_profile
+
+        changed = set(changed_keys)
+        dropped = 0
+        for module_name, module_cache in self._cache.items():
+            profile = get_execution_profile(module_name)
+            module_changed = profile is None or bool(changed & set(profile.required_env))
+            for key, (platform, _) in list(module_cache.items()):
+                if (module_changed or platform is None
+                        or PLATFORM_ENV_VARS.get(platform) in changed
+                        or any(name.startswith(f"{platform.split('_')[0]}_") for name in changed)):
+                    del module_cache[key]
+                    dropped += 1
+        if dropped:
+            logger.info(f"Dropped {dropped} cached model backends after environment change")
+        return dropped
+
+    @contextmanager
+    def scope(self, module_name: str):
+        """Cache models created while constructing a society for a module
+
+        Args:
+            module_name: Example module name
+        """
+        previous, self._scope = self._scope, module_name
+        try:
+            yield
+        finally:
+            self._scope = previous
+
+    def stats(self) -> Dict[str, int]:
+        """Cache hit and miss counters"""
+        return {"hits": self.hits, "misses": self.misses}